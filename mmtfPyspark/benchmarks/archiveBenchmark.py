@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+'''
+archiveBenchmark.py: Benchmark of reading a subset of entries from an
+indexed MMTF archive compared to scanning an MMTF Hadoop Sequence File.
+
+Converts the sequence file into a temporary archive, then reads and decodes
+a random subset of entries, once through the archive index and once by
+scanning and filtering all records of the sequence file.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.archiveBenchmark -p <path_to_mmtf> -n <entries>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import gzip
+import random
+import shutil
+import tempfile
+import time
+import msgpack
+from mmtfPyspark.io import hadoopSequenceFile, mmtfArchive
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+
+
+def decode(value):
+    return mmtfStructure(msgpack.unpackb(gzip.decompress(value), raw=True))
+
+
+def benchmark(path, n, seed=1):
+    '''
+    Returns the time in seconds to read and decode n random entries from
+    an archive and by a sequence file scan
+
+    Attributes:
+        path (str): path to an MMTF Hadoop Sequence File
+        n (int): number of entries to read
+        seed (int): random seed of the subset
+    '''
+
+    archivePath = tempfile.mkdtemp()
+
+    try:
+        index = mmtfArchive.convertSequenceFile(path, archivePath)
+        keys = [entry[0] for entry in index]
+        pdbIds = set(random.Random(seed).sample(keys, min(n, len(keys))))
+
+        start = time.time()
+        entries = mmtfArchive.selectEntries(mmtfArchive.readIndex(archivePath), pdbIds)
+        archive = [decode(value) for key, value in mmtfArchive.readRecords(archivePath, entries)]
+        archiveTime = time.time() - start
+
+        start = time.time()
+        scan = [decode(value)
+                for part in hadoopSequenceFile.getPartFiles(path)
+                for key, value, offset in hadoopSequenceFile.readRecords(part)
+                if key in pdbIds]
+        scanTime = time.time() - start
+    finally:
+        shutil.rmtree(archivePath)
+
+    if len(archive) != len(scan):
+        raise Exception("archive and sequence file returned different entries")
+
+    return archiveTime, scanTime
+
+
+def main(argv):
+
+    path = "resources/mmtf_reduced_sample"
+    n = 500
+
+    try:
+        opts, args = getopt.getopt(argv, "p:n:", ["path=", "entries="])
+    except getopt.GetoptError:
+        print("archiveBenchmark.py -p <path_to_mmtf> -n <entries>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+        elif opt in ["-n", "--entries"]:
+            n = int(arg)
+
+    archiveTime, scanTime = benchmark(path, n)
+    print(f"archive: {archiveTime:.2f} s, sequence file scan: {scanTime:.2f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+'''
+codecBenchmark.py: Micro-benchmark of the MMTF codecs in mmtfCodec.
+
+Times decoding and encoding of synthetic arrays for every MMTF codec and,
+where available, compares decoding with the mmtf-python reference codecs.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.codecBenchmark -n <array_length>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import timeit
+import numpy as np
+from mmtf.codecs import default_codec
+from mmtfPyspark.utils import mmtfCodec
+
+
+def getTestData(n, seed=7):
+    '''
+    Returns a dictionary of codec -> (decoded array, parameter) with data
+    resembling the MMTF fields that use each codec
+
+    Attributes:
+        n (int): length of the arrays
+        seed (int): random seed
+    '''
+
+    rng = np.random.RandomState(seed)
+    coords = np.cumsum(rng.normal(0, 1.5, n)).round(3)
+    runs = np.repeat(rng.randint(0, 100, n // 10 + 1), 10)[:n]
+
+    return {
+        1: (rng.normal(0, 10, n).astype(np.float32), 0),
+        2: (rng.randint(-1, 8, n), 0),
+        3: (rng.randint(-1000, 1000, n), 0),
+        4: (rng.randint(0, 100000, n), 0),
+        5: (np.array(['A', 'BB', 'CCC', 'DDDD'] * (n // 4 + 1))[:n], 4),
+        6: (np.array(['\x00'] * (n - n // 20) + ['A'] * (n // 20)), 0),
+        7: (runs, 0),
+        8: (np.arange(1, n + 1), 0),
+        9: (runs / 100, 100),
+        10: (coords, 1000),
+        11: (rng.randint(-1000, 1000, n) / 100, 100),
+        12: (rng.randint(-40000, 40000, n) / 1000, 1000),
+        13: (rng.randint(-500, 500, n) / 10, 10),
+        14: (rng.randint(-40000, 40000, n), 0),
+        15: (rng.randint(-500, 500, n), 0),
+    }
+
+
+def benchmark(n=100000, repeat=5):
+    '''
+    Returns a list of (codec, encode time, decode time, reference decode time)
+    tuples with times in milliseconds per call
+
+    Attributes:
+        n (int): length of the arrays
+        repeat (int): number of calls per timing
+    '''
+
+    results = []
+
+    for codec, (array, param) in sorted(getTestData(n).items()):
+        encoded = mmtfCodec.encode_array(array, codec, param)
+
+        encodeTime = timeit.timeit(lambda: mmtfCodec.encode_array(array, codec, param),
+                                   number=repeat) / repeat * 1000
+        decodeTime = timeit.timeit(lambda: mmtfCodec.decode_array(encoded),
+                                   number=repeat) / repeat * 1000
+
+        referenceTime = None
+        if codec in default_codec.codec_dict:
+            referenceTime = timeit.timeit(lambda: default_codec.decode_array(encoded),
+                                          number=repeat) / repeat * 1000
+
+        results.append((codec, encodeTime, decodeTime, referenceTime))
+
+    return results
+
+
+def main(argv):
+
+    n = 100000
+
+    try:
+        opts, args = getopt.getopt(argv, "n:", ["length="])
+    except getopt.GetoptError:
+        print("codecBenchmark.py -n <array_length>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-n", "--length"]:
+            n = int(arg)
+
+    print(f"Array length: {n}")
+    print("codec  encode (ms)  decode (ms)  mmtf-python decode (ms)")
+
+    for codec, encodeTime, decodeTime, referenceTime in benchmark(n):
+        reference = f"{referenceTime:23.3f}" if referenceTime is not None else f"{'n/a':>23}"
+        print(f"{codec:5d}  {encodeTime:11.3f}  {decodeTime:11.3f}  {reference}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
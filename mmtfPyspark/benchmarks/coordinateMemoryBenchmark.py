@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+'''
+coordinateMemoryBenchmark.py: Memory benchmark of the coordinate storage types
+of mmtfStructure.
+
+Decodes all structures of an MMTF Hadoop Sequence File with each coordinate
+type ('float64', 'float32', 'int32') and reports the memory held by
+coordinate and B-factor arrays, the pickled size and the decoding time.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.coordinateMemoryBenchmark -p <path_to_mmtf>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import gzip
+import pickle
+import time
+import msgpack
+from mmtfPyspark.io import hadoopSequenceFile
+from mmtfPyspark.io.mmtfStructure import mmtfStructure, COORD_TYPES
+
+COORD_FIELDS = ['x_coord_list', 'y_coord_list', 'z_coord_list', 'b_factor_list']
+
+
+def getCoordinateBytes(structure):
+    '''
+    Returns the number of bytes held by the coordinate and B-factor arrays of
+    a structure, before any conversion of fixed point values
+
+    Attributes:
+        structure (mmtfStructure): decoded structure
+    '''
+
+    if structure.coord_type == 'int32':
+        return sum(structure.get_fixed_point(name)[0].nbytes for name in COORD_FIELDS)
+
+    return sum(getattr(structure, name).nbytes for name in COORD_FIELDS)
+
+
+def benchmark(path):
+    '''
+    Returns a dictionary of coordinate type -> (coordinate bytes,
+    pickled bytes, decoding time in seconds) summed over all structures
+
+    Attributes:
+        path (str): path to an MMTF Hadoop Sequence File
+    '''
+
+    records = [msgpack.unpackb(gzip.decompress(value), raw=True)
+               for part in hadoopSequenceFile.getPartFiles(path)
+               for key, value, offset in hadoopSequenceFile.readRecords(part)]
+
+    results = {}
+
+    for coordType in COORD_TYPES:
+        start = time.time()
+        structures = [mmtfStructure(data, coord_type=coordType) for data in records]
+        decodeTime = time.time() - start
+
+        coordinateBytes = sum(getCoordinateBytes(s) for s in structures)
+        pickleBytes = sum(len(pickle.dumps(s)) for s in structures)
+
+        results[coordType] = (coordinateBytes, pickleBytes, decodeTime)
+
+    return results
+
+
+def main(argv):
+
+    path = "resources/mmtf_reduced_sample"
+
+    try:
+        opts, args = getopt.getopt(argv, "p:", ["path="])
+    except getopt.GetoptError:
+        print("coordinateMemoryBenchmark.py -p <path_to_mmtf>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+
+    print("coord_type  coordinates (MB)  pickled (MB)  decode (s)")
+
+    for coordType, (coordinateBytes, pickleBytes, decodeTime) in benchmark(path).items():
+        print(f"{coordType:10}  {coordinateBytes / 1e6:16.2f}  {pickleBytes / 1e6:12.2f}  {decodeTime:10.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
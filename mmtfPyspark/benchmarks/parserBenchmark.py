@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+'''
+parserBenchmark.py: Benchmark of the column oriented mmCIF and PDB parsers
+of structureParser against the Biopython parsers used by MmtfReader.
+
+Parses all PDB and mmCIF files in a directory, optionally gzipped, and
+reports the throughput of each parser in atoms per second. The Biopython
+times only include building the Bio.PDB structure, not its conversion to
+MMTF, so they are a lower bound of the Biopython path of MmtfReader.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.parserBenchmark -p <path_to_files> -n <repeats>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import gzip
+import os
+import time
+import warnings
+from Bio.PDB import PDBParser, MMCIFParser, FastMMCIFParser
+from mmtfPyspark.io import structureParser
+
+
+def biopython(parser):
+    '''
+    Returns a parse function of a Biopython parser
+    '''
+
+    def parse(path):
+        f = gzip.open(path, 'rt') if path.endswith('.gz') else open(path)
+        with f:
+            return parser.get_structure('', f)
+
+    return parse
+
+
+PARSERS = {'.pdb': [('structureParser', structureParser.readPdb),
+                    ('PDBParser', biopython(PDBParser(QUIET=True)))],
+           '.cif': [('structureParser', structureParser.readMmcif),
+                    ('MMCIFParser', biopython(MMCIFParser(QUIET=True))),
+                    ('FastMMCIFParser', biopython(FastMMCIFParser(QUIET=True)))]}
+
+
+def benchmark(path, repeats=3):
+    '''
+    Returns a list of (format, parser, number of files, atoms, seconds)
+
+    Attributes:
+        path (str): directory of PDB and mmCIF files
+        repeats (int): number of times each file is parsed
+    '''
+
+    results = []
+
+    for fileFormat, parsers in PARSERS.items():
+        files = sorted(os.path.join(dirpath, f) for dirpath, dirnames, filenames in os.walk(path)
+                       for f in filenames if fileFormat in f)
+        if not files:
+            continue
+
+        atoms = sum(structureParser.readMmcif(f).num_atoms if fileFormat == '.cif'
+                    else structureParser.readPdb(f).num_atoms for f in files)
+
+        for name, parse in parsers:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                start = time.time()
+                for i in range(repeats):
+                    for f in files:
+                        parse(f)
+                seconds = (time.time() - start) / repeats
+
+            results.append((fileFormat, name, len(files), atoms, seconds))
+
+    return results
+
+
+def main(argv):
+
+    path = "resources/files"
+    repeats = 3
+
+    try:
+        opts, args = getopt.getopt(argv, "p:n:", ["path=", "repeats="])
+    except getopt.GetoptError:
+        print("parserBenchmark.py -p <path_to_files> -n <repeats>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+        elif opt in ["-n", "--repeats"]:
+            repeats = int(arg)
+
+    print("format  parser           files   atoms  time (s)  atoms/s")
+
+    for fileFormat, name, files, atoms, seconds in benchmark(path, repeats):
+        print(f"{fileFormat:6}  {name:15}  {files:5}  {atoms:6}  {seconds:8.3f}  {atoms / seconds:7.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+'''
+passThroughBenchmark.py: Benchmark of writing filtered structures, with and
+without passing through unmodified MMTF encoded fields.
+
+Decodes all structures of an MMTF Hadoop Sequence File, filters them by
+resolution and encodes the remaining structures to uncompressed MMTF.
+Eagerly decoded structures are fully re-encoded, lazily decoded structures
+write their undecoded fields as read.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.passThroughBenchmark -p <path_to_mmtf> -r <resolution>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import gzip
+import time
+import msgpack
+from mmtfPyspark.io import hadoopSequenceFile, MmtfWriter
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+
+
+def benchmark(path, resolution):
+    '''
+    Returns a dictionary of decoding mode -> (number of structures,
+    decoding and filtering time, encoding time in seconds)
+
+    Attributes:
+        path (str): path to an MMTF Hadoop Sequence File
+        resolution (float): maximum resolution of written structures
+    '''
+
+    records = [msgpack.unpackb(gzip.decompress(value), raw=True)
+               for part in hadoopSequenceFile.getPartFiles(path)
+               for key, value, offset in hadoopSequenceFile.readRecords(part)]
+
+    results = {}
+
+    for mode, lazy in [('eager', False), ('lazy', True)]:
+        start = time.time()
+        structures = [s for s in (mmtfStructure(data, lazy) for data in records)
+                      if s.resolution is not None and s.resolution <= resolution]
+        decodeTime = time.time() - start
+
+        start = time.time()
+        for s in structures:
+            MmtfWriter.toByteArray(s, False)
+        encodeTime = time.time() - start
+
+        results[mode] = (len(structures), decodeTime, encodeTime)
+
+    return results
+
+
+def main(argv):
+
+    path = "resources/mmtf_reduced_sample"
+    resolution = 2.5
+
+    try:
+        opts, args = getopt.getopt(argv, "p:r:", ["path=", "resolution="])
+    except getopt.GetoptError:
+        print("passThroughBenchmark.py -p <path_to_mmtf> -r <resolution>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+        elif opt in ["-r", "--resolution"]:
+            resolution = float(arg)
+
+    print("mode   structures  decode (s)  encode (s)")
+
+    for mode, (count, decodeTime, encodeTime) in benchmark(path, resolution).items():
+        print(f"{mode:5}  {count:10}  {decodeTime:10.2f}  {encodeTime:10.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+'''
+reducedBenchmark.py: Benchmark of the conversion of full structures to the
+reduced representation (see mappers.structureToReducedStructure).
+
+Reduces all MMTF files in a directory, optionally gzipped, and reports the
+time of the atom selection and of the encoding, and the size of the gzipped
+full and reduced records.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.reducedBenchmark -p <path_to_mmtf_files> -n <repeats>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import os
+import time
+import msgpack
+from mmtfPyspark.io import MmtfWriter, mmtfCompression
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.mappers.structureToReducedStructure import reduceStructure
+
+
+def benchmark(path, repeats=3):
+    '''
+    Returns (number of structures, full atoms, reduced atoms, reduction
+    seconds, encoding seconds, full bytes, reduced bytes)
+
+    Attributes:
+        path (str): directory of MMTF files
+        repeats (int): number of times each structure is reduced
+    '''
+
+    files = sorted(os.path.join(dirpath, f) for dirpath, dirnames, filenames in os.walk(path)
+                   for f in filenames if '.mmtf' in f)
+
+    records = []
+    for f in files:
+        with open(f, 'rb') as fh:
+            records.append(mmtfCompression.compress(mmtfCompression.decompress(fh.read())))
+
+    structures = [mmtfStructure(msgpack.unpackb(mmtfCompression.decompress(r), raw=True))
+                  for r in records]
+
+    start = time.time()
+    for i in range(repeats):
+        reduced = [reduceStructure(s) for s in structures]
+    reduceTime = (time.time() - start) / repeats
+
+    start = time.time()
+    for i in range(repeats):
+        encoded = [MmtfWriter.toByteArray(r, True) for r in reduced]
+    encodeTime = (time.time() - start) / repeats
+
+    return (len(structures), sum(s.num_atoms for s in structures), sum(r.num_atoms for r in reduced),
+            reduceTime, encodeTime, sum(len(r) for r in records), sum(len(e) for e in encoded))
+
+
+def main(argv):
+
+    path = "resources/files"
+    repeats = 3
+
+    try:
+        opts, args = getopt.getopt(argv, "p:n:", ["path=", "repeats="])
+    except getopt.GetoptError:
+        print("reducedBenchmark.py -p <path_to_mmtf_files> -n <repeats>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+        elif opt in ["-n", "--repeats"]:
+            repeats = int(arg)
+
+    count, atoms, reducedAtoms, reduceTime, encodeTime, fullBytes, reducedBytes = benchmark(path, repeats)
+
+    print(f"structures:      {count}")
+    print(f"atoms:           {atoms} full, {reducedAtoms} reduced")
+    print(f"reduce (s):      {reduceTime:.3f}")
+    print(f"encode (s):      {encodeTime:.3f}")
+    print(f"gzipped bytes:   {fullBytes} full, {reducedBytes} reduced")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
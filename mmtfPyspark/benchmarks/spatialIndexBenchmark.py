@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+'''
+spatialIndexBenchmark.py: Benchmark of neighbor searches with the cell list
+spatial index (see utils.spatialIndex) by structure size.
+
+Structures of each size are built by tiling copies of the atoms of an MMTF
+file side by side. For each size, reports the time to build the index, to
+find all pairs of atoms within the cutoff distance, and to find the pairs
+between the first and the second half of the atoms. For comparison, reports
+the time to add the atoms one by one to two distance boxes
+(utils.distanceBox) and intersect them, which only finds the atoms close to
+the other half, without pairs.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.spatialIndexBenchmark -p <mmtf_file> -s <sizes> -c <cutoff>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import time
+from collections import namedtuple
+import msgpack
+import numpy as np
+from mmtfPyspark.io import mmtfCompression
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.utils.spatialIndex import SpatialIndex
+from mmtfPyspark.utils.distanceBox import distanceBox
+
+Point = namedtuple('Point', ['x', 'y', 'z'])
+
+
+def getCoordinates(path, size):
+    '''
+    Returns the coordinates of size atoms, tiled from copies of the atoms of
+    an MMTF file
+
+    Attributes:
+        path (str): MMTF file, optionally gzipped
+        size (int): number of atoms
+    '''
+
+    with open(path, 'rb') as f:
+        structure = mmtfStructure(msgpack.unpackb(mmtfCompression.decompress(f.read()), raw=True))
+
+    coords = np.column_stack((structure.x_coord_list, structure.y_coord_list, structure.z_coord_list))
+    coords = coords - coords.min(axis=0)
+    extent = coords.max(axis=0) + 10.0
+
+    copies = -(-size // len(coords))
+    n = int(np.ceil(copies ** (1.0 / 3)))
+    shifts = np.stack(np.meshgrid(*[np.arange(n)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)[:copies]
+
+    return (coords[np.newaxis] + (shifts * extent)[:, np.newaxis]).reshape(-1, 3)[:size]
+
+
+def benchmark(coords, cutoff, maxBoxSize=100000):
+    '''
+    Returns (index seconds, pairs seconds, number of pairs, half pairs
+    seconds, number of half pairs, distance box seconds), the distance box
+    time is None for more than maxBoxSize atoms
+
+    Attributes:
+        coords (array): coordinates of shape (number of atoms, 3)
+        cutoff (float): cutoff distance
+        maxBoxSize (int): maximum number of atoms of the distance box benchmark
+    '''
+
+    half = len(coords) // 2
+
+    start = time.time()
+    index = SpatialIndex(coords, cutoff)
+    indexTime = time.time() - start
+
+    start = time.time()
+    pairs = index.query_pairs(cutoff)
+    pairsTime = time.time() - start
+
+    start = time.time()
+    halfPairs = SpatialIndex(coords[:half], cutoff).query_index(coords[half:], cutoff)
+    halfTime = time.time() - start
+
+    boxTime = None
+    if len(coords) <= maxBoxSize:
+        start = time.time()
+        box1, box2 = distanceBox(cutoff), distanceBox(cutoff)
+        for i in range(half):
+            box1.addPoint(Point(*coords[i]), i)
+        for i in range(half, len(coords)):
+            box2.addPoint(Point(*coords[i]), i)
+        box1.getIntersection(box2)
+        boxTime = time.time() - start
+
+    return indexTime, pairsTime, len(pairs[0]), halfTime, len(halfPairs[0]), boxTime
+
+
+def main(argv):
+
+    path = "resources/files/4HHB.mmtf.gz"
+    sizes = [1000, 10000, 100000, 1000000]
+    cutoff = 5.0
+
+    try:
+        opts, args = getopt.getopt(argv, "p:s:c:", ["path=", "sizes=", "cutoff="])
+    except getopt.GetoptError:
+        print("spatialIndexBenchmark.py -p <mmtf_file> -s <sizes> -c <cutoff>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+        elif opt in ["-s", "--sizes"]:
+            sizes = [int(s) for s in arg.split(',')]
+        elif opt in ["-c", "--cutoff"]:
+            cutoff = float(arg)
+
+    print(f"{'atoms':>10} {'index (s)':>10} {'pairs (s)':>10} {'pairs':>10} "
+          f"{'halves (s)':>11} {'pairs':>10} {'box (s)':>10}")
+
+    for size in sizes:
+        indexTime, pairsTime, numPairs, halfTime, numHalfPairs, boxTime = \
+            benchmark(getCoordinates(path, size), cutoff)
+        box = f"{boxTime:10.3f}" if boxTime is not None else f"{'-':>10}"
+
+        print(f"{size:10d} {indexTime:10.3f} {pairsTime:10.3f} {numPairs:10d} "
+              f"{halfTime:11.3f} {numHalfPairs:10d} {box}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+'''
+stringArrayBenchmark.py: Benchmark of the fixed width string arrays used by
+mmtfStructure for chain ids, chain names, insertion codes and alternative
+locations.
+
+Decodes all structures of an MMTF Hadoop Sequence File and compares the
+string arrays against lists of Python strings, the previous representation,
+by the time to decode the four fields and the memory they hold once decoded,
+measured with tracemalloc. The pickled size of a structure is about the same
+for both, it is dominated by the other fields.
+
+Usage:
+    python -m mmtfPyspark.benchmarks.stringArrayBenchmark -p <path_to_mmtf>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+'''
+
+import sys
+import getopt
+import gc
+import gzip
+import time
+import tracemalloc
+import msgpack
+import numpy as np
+from mmtfPyspark.io import hadoopSequenceFile
+from mmtfPyspark.io.mmtfStructure import stringArray
+from mmtfPyspark.utils import mmtfCodec
+
+STRING_FIELDS = {'chain_id_list': b'chainIdList',
+                 'chain_name_list': b'chainNameList',
+                 'ins_code_list': b'insCodeList',
+                 'alt_loc_list': b'altLocList'}
+
+
+def decodeArrays(data):
+    '''
+    Decodes the string fields of a structure into string arrays
+    '''
+
+    return {name: stringArray(mmtfCodec.decode_array(data[key]))
+            for name, key in STRING_FIELDS.items()}
+
+
+def decodeLists(data):
+    '''
+    Decodes the string fields of a structure into lists of strings
+    '''
+
+    lists = {}
+    for name, key in STRING_FIELDS.items():
+        array = mmtfCodec.decode_array(data[key])
+        if array.dtype.itemsize == 1:
+            lists[name] = [chr(x) for x in array.view(np.uint8)]
+        else:
+            lists[name] = [x.decode() for x in array]
+    return lists
+
+
+def benchmark(path):
+    '''
+    Returns a dictionary of representation -> (decoding time in seconds,
+    mean bytes held by the decoded fields per structure)
+
+    Attributes:
+        path (str): path to an MMTF Hadoop Sequence File
+    '''
+
+    records = [msgpack.unpackb(gzip.decompress(value), raw=True)
+               for part in hadoopSequenceFile.getPartFiles(path)
+               for key, value, offset in hadoopSequenceFile.readRecords(part)]
+
+    results = {}
+
+    for representation, decode in [('stringArray', decodeArrays), ('list', decodeLists)]:
+        start = time.time()
+        decoded = [decode(data) for data in records]
+        decodeTime = time.time() - start
+        del decoded
+
+        # Memory of the decoded fields that are still referenced
+        gc.collect()
+        tracemalloc.start()
+        decoded = [decode(data) for data in records]
+        heldBytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del decoded
+
+        results[representation] = (decodeTime, heldBytes / len(records))
+
+    return results
+
+
+def main(argv):
+
+    path = "resources/mmtf_reduced_sample"
+
+    try:
+        opts, args = getopt.getopt(argv, "p:", ["path="])
+    except getopt.GetoptError:
+        print("stringArrayBenchmark.py -p <path_to_mmtf>")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+
+    print("representation  decode (s)  memory per structure (KB)")
+
+    for representation, (decodeTime, heldBytes) in benchmark(path).items():
+        print(f"{representation:14}  {decodeTime:10.2f}  {heldBytes / 1e3:25.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -21,6 +21,7 @@ import tarfile
 from pyspark.sql import Row
 from pyspark import SparkContext
 from mmtfPyspark.ml import pythonRDDToDataset
+from pyspark.sql.types import StringType
 
 
 def getDataset():
@@ -68,5 +69,6 @@ def getDataset():
     sc = SparkContext.getOrCreate()
     data = sc.parallelize(res)
     colNames = ["scopID","sequence", "secondaryStructure", "trained"]
+    schema = pythonRDDToDataset.getSchema(colNames, [StringType()] * 4)
 
-    return pythonRDDToDataset.getDataset(data, colNames)
+    return pythonRDDToDataset.getDataset(data, colNames, schema)
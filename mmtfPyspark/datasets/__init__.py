@@ -1 +1,2 @@
 from .groupInteractionExtractor import groupInteractionExtractor
+from .residueInteractionExtractor import residueInteractionExtractor
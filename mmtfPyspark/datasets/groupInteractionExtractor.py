@@ -14,6 +14,7 @@ Authorship information:
 '''
 
 from mmtfPyspark.ml import pythonRDDToDataset
+from pyspark.sql.types import StringType, IntegerType, FloatType
 from mmtfPyspark.utils.structureToAllInteractions import *
 
 class groupInteractionExtractor(object):
@@ -37,10 +38,13 @@ class groupInteractionExtractor(object):
         Returns:
             dataset with interacting residue and atom information
         '''
-        # create a list of all residues with a threshold distance
-        rows = structures.flatMap(structureToAllInteractions(self.groupName, self.distance))
+        # create column batches of all residues with a threshold distance
+        batches = structures.flatMap(structureToAllInteractions(self.groupName, self.distance).getBatches)
 
         # convert to a dataset
         colNames = ["structureId", "residue1", "atom1", "element1", "index1",
                     "residue2", "atom2", "element2", "index2", "distance"]
-        return pythonRDDToDataset.getDataset(rows, colNames)
+        types = [StringType(), StringType(), StringType(), StringType(), IntegerType(),
+                 StringType(), StringType(), StringType(), IntegerType(), FloatType()]
+        schema = pythonRDDToDataset.getSchema(colNames, types)
+        return pythonRDDToDataset.getDatasetFromBatches(batches, schema)
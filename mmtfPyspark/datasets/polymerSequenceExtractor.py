@@ -15,6 +15,7 @@ Authorship information:
 from mmtfPyspark.ml import pythonRDDToDataset
 from mmtfPyspark.mappers import structureToPolymerSequences
 from pyspark.sql import Row
+from pyspark.sql.types import StringType
 
 
 def getDataset(structures):
@@ -33,5 +34,6 @@ def getDataset(structures):
                      .map(lambda x: Row(x[0],x[1]))
 
     colNames = ["structureChainId", "sequence"]
-    
-    return pythonRDDToDataset.getDataset(rows, colNames)
+    schema = pythonRDDToDataset.getSchema(colNames, [StringType(), StringType()])
+
+    return pythonRDDToDataset.getDataset(rows, colNames, schema)
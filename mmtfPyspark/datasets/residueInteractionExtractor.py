@@ -0,0 +1,58 @@
+#!/user/bin/env python
+'''
+residueInteractionExtractor.py:
+
+Creates a dataset of residues that interact with specified groups within
+a cutoff distance, with one row per interacting pair of residues and their
+minimum atom distance. Groups are specified by there Chemical Component
+identifier (residue name), e.g., "ZN", "ATP".
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+from mmtfPyspark.ml import pythonRDDToDataset
+from pyspark.sql.types import StringType, IntegerType, FloatType
+from mmtfPyspark.mappers.structureToInteractingResidues import structureToInteractingResidues
+
+class residueInteractionExtractor(object):
+    '''
+    Attributes:
+        groupName (str or list(str)): names of the groups to be analyzed
+        distance (float): cutoff distance
+        excludeSameResidue (bool): if true, exclude interactions between
+                                   groups with the same name, e.g. HOH-HOH
+        excludeSameChain (bool): if true, exclude interactions with groups with
+                                 the same chain name
+    '''
+
+    def __init__(self, groupName, distance, excludeSameResidue = False, excludeSameChain = False):
+        self.groupName = groupName
+        self.distance = distance
+        self.excludeSameResidue = excludeSameResidue
+        self.excludeSameChain = excludeSameChain
+
+
+    def getDataset(self, structures):
+        '''Returns a dataset of residues that interact with the specified groups
+        within a specified cutoff distance
+
+        Attributes:
+            structures (pythonRdd): a set of PDB structures
+        Returns:
+            dataset with one row per pair of interacting residues
+        '''
+        mapper = structureToInteractingResidues(self.groupName, self.distance,
+                                                self.excludeSameResidue, self.excludeSameChain)
+
+        # create column batches of all interacting residue pairs
+        batches = structures.flatMap(mapper.getBatches)
+
+        # convert to a dataset
+        colNames = ["structureId", "residue1", "index1", "residue2", "index2", "distance"]
+        types = [StringType(), StringType(), IntegerType(), StringType(), IntegerType(), FloatType()]
+        schema = pythonRDDToDataset.getSchema(colNames, types)
+        return pythonRDDToDataset.getDatasetFromBatches(batches, schema)
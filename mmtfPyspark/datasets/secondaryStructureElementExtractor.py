@@ -12,6 +12,7 @@ Authorship information:
 from mmtfPyspark.ml import pythonRDDToDataset
 from mmtfPyspark.mappers import structureToSecondaryStructureElements
 from mmtfPyspark.datasets import secondaryStructureExtractor
+from pyspark.sql.types import StringType
 
 def getDataset(structure, label, length=None):
     '''
@@ -19,16 +20,17 @@ def getDataset(structure, label, length=None):
     '''
 
     colNames = ["sequence", "label"]
+    schema = pythonRDDToDataset.getSchema(colNames, [StringType(), StringType()])
 
     if length == None:
 
         rows = secondaryStructureExtractor.getPythonRdd(structure) \
                .flatMap(structureToSecondaryStructureElements(label))
 
-        return pythonRDDToDataset.getDataset(rows, colNames)
+        return pythonRDDToDataset.getDataset(rows, colNames, schema)
     else :
 
         rows = secondaryStructureExtractor.getPythonRdd(structure) \
                .flatMap(structureToSecondaryStructureElements(label, length))
 
-        return pythonRDDToDataset.getDataset(rows, colNames)
+        return pythonRDDToDataset.getDataset(rows, colNames, schema)
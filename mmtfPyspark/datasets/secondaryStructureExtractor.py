@@ -18,6 +18,7 @@ Authorship information:
 from mmtfPyspark.ml import pythonRDDToDataset
 from mmtfPyspark.utils import dsspSecondaryStructure
 from pyspark.sql import Row
+from pyspark.sql.types import StringType, FloatType
 
 
 def getDataset(structure):
@@ -30,8 +31,11 @@ def getDataset(structure):
     # convert to dataset
     colNames = ["structureChainId", "sequence", "alpha", "beta",
                 "coil", "dsspQ8Code", "dsspQ3Code"]
+    types = [StringType(), StringType(), FloatType(), FloatType(),
+             FloatType(), StringType(), StringType()]
+    schema = pythonRDDToDataset.getSchema(colNames, types)
 
-    return pythonRDDToDataset.getDataset(rows, colNames)
+    return pythonRDDToDataset.getDataset(rows, colNames, schema)
 
 
 def getPythonRdd(structure):
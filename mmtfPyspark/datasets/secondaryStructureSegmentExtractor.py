@@ -19,6 +19,7 @@ Authorship information:
 from mmtfPyspark.datasets import secondaryStructureExtractor
 from mmtfPyspark.mappers import structureToSecondaryStructureSegments
 from mmtfPyspark.ml import pythonRDDToDataset
+from pyspark.sql.types import StringType
 
 def getDataset(structureRDD, length):
     '''
@@ -40,4 +41,5 @@ def getDataset(structureRDD, length):
             .flatMap(structureToSecondaryStructureSegments(length))
 
     colNames = ["structureChainId", "sequence", "labelQ8", "labelQ3"]
-    return pythonRDDToDataset.getDataset(rows, colNames)
+    schema = pythonRDDToDataset.getSchema(colNames, [StringType()] * 4)
+    return pythonRDDToDataset.getDataset(rows, colNames, schema)
@@ -1,2 +1,3 @@
-from .columnarStructure import ColumnarStructure
-from .columnarStructureX import ColumnarStructureX
+# ColumnarStructure moved to mmtfPyspark.utils, kept here for compatibility
+from mmtfPyspark.utils.columnarStructure import ColumnarStructure
+from mmtfPyspark.utils.columnarStructureX import ColumnarStructureX
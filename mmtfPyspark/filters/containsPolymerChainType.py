@@ -16,6 +16,9 @@ Authorship information:
     __email__ = "marshuang80@gmail.com:
     __status__ = "Done"
 '''
+import numpy as np
+from mmtfPyspark.utils.columnarStructure import getColumnarStructure
+
 
 class containsPolymerChainType(object):
     '''
@@ -54,41 +57,21 @@ class containsPolymerChainType(object):
             monomer_type = monomer_type.split(',')
 
         self.exclusive = exclusive
-        self.monomer_type = monomer_type
+        self.monomer_type = set(monomer_type)
 
 
     def __call__(self,t):
-        structure = t[1]
-        contrains_polymer = False
-        global_match = False
-        num_chains = structure.chains_per_model[0] #get number of chains in first model, nessary?
-        group_counter = 0
-
-        for i in range(num_chains):
-            match = True
-            chain_type = [chain['type'] for chain in structure.entity_list
-                         if i in chain['chainIndexList']][0]
-            polymer = chain_type == "polymer"
-
-            if polymer:
-                contains_polymer = True
-            else:
-                match = False
-
-            for j in range(structure.groups_per_chain[i]):
-                if match and polymer:
-                    group_idx = structure.group_type_list[group_counter]
-                    group_type = structure.group_list[group_idx]['chemCompType']
-                    match = (group_type in self.monomer_type)
-                group_counter += 1
-
-            if (polymer and match and not self.exclusive):
-                return True
+        cs = getColumnarStructure(t[1])
+        polymer = cs.is_polymer_chain()
 
-            if (polymer and not match and self.exclusive):
-                return False
+        # Number of groups per chain that are not one of the monomer types
+        typeMatch = np.array([group['chemCompType'] in self.monomer_type for group in t[1].group_list], dtype=bool)
+        mismatch = ~typeMatch[cs.get_group_types()]
+        mismatches = np.bincount(cs.get_group_to_chain_indices(), weights=mismatch,
+                                 minlength=cs.get_num_chains())
+        match = polymer & (mismatches == 0)
 
-            if match:
-                global_match = True
+        if self.exclusive:
+            return bool(np.any(polymer) and np.array_equal(match, polymer))
 
-        return global_match and contains_polymer
+        return bool(np.any(match))
@@ -14,7 +14,13 @@ Authorship information:
     __email__ = "marshuang80@gmail.com:
     __status__ = "Done"
 '''
+import numpy as np
 from mmtfPyspark.utils import dsspSecondaryStructure
+from mmtfPyspark.utils.columnarStructure import getColumnarStructure
+
+# Q3 code of each DSSP code
+_Q3 = np.array([dsspSecondaryStructure.getQ3Code(code).value
+                for code in range(len(dsspSecondaryStructure))], dtype=np.int64)
 
 
 class secondaryStructure(object):
@@ -38,66 +44,37 @@ class secondaryStructure(object):
 
 
     def __call__(self,t):
-        structure = t[1]
-        contains_polymer = False
-        global_match = False
-        num_chains = structure.chains_per_model[0]
-        sec_struct = structure.sec_struct_list
-        group_counter = 0
-
-        for i in range(num_chains):
-            helix = 0.0
-            sheet = 0.0
-            coil = 0.0
-            other = 0.0
-            match = True
-
-            chain_type = [chain['type'] for chain in structure.entity_list
-                          if i in chain['chainIndexList']][0]
-            polymer = chain_type == 'polymer'
-
-            if polymer:
-                contains_polymer = True
-            else:
-                match = False
-
-            for j in range(structure.groups_per_chain[i]):
-
-                if match and polymer:
-                    code = sec_struct[group_counter]
-                    secondary_structure = dsspSecondaryStructure.getQ3Code(code)
-
-                    if secondary_structure == dsspSecondaryStructure.ALPHA_HELIX:
-                        helix += 1
-                    elif secondary_structure == dsspSecondaryStructure.EXTENDED:
-                        sheet += 1
-                    elif secondary_structure == dsspSecondaryStructure.COIL:
-                        coil += 1
-                    else:
-                        other += 1
-
-                group_counter += 1
-
-            if match and polymer:
-                n = structure.groups_per_chain[i] - other
-                helix /= n
-                sheet /= n
-                coil /= n
-
-                match = helix >= self.helixFractionMin and \
-                        helix <= self.helixFractionMax and \
-                        sheet >= self.sheetFractionMin and \
-                        sheet <= self.sheetFractionMax and \
-                        coil >= self.coilFractionMin and \
-                        coil <= self.coilFractionMax
-
-            if (polymer and match and not self.exclusive):
-                return True
-
-            if (polymer and not match and self.exclusive):
-                return False
-
-            if match:
-                global_match = True
-
-        return global_match and contains_polymer
+        cs = getColumnarStructure(t[1])
+        polymer = cs.is_polymer_chain()
+        numChains = cs.get_num_chains()
+
+        # Q3 secondary structure of each group, unknown codes are coil
+        codes = np.asarray(t[1].sec_struct_list, dtype=np.int64)[:cs.get_num_groups()]
+        q3 = np.full(len(codes), dsspSecondaryStructure.COIL.value, dtype=np.int64)
+        known = (codes >= 0) & (codes < len(_Q3))
+        q3[known] = _Q3[codes[known]]
+
+        groupToChain = cs.get_group_to_chain_indices()
+        n = np.bincount(groupToChain, minlength=numChains)
+
+        def fraction(code):
+            count = np.bincount(groupToChain, weights=q3 == code.value, minlength=numChains)
+            return count / np.maximum(n, 1)
+
+        helix = fraction(dsspSecondaryStructure.ALPHA_HELIX)
+        sheet = fraction(dsspSecondaryStructure.EXTENDED)
+        coil = fraction(dsspSecondaryStructure.COIL)
+
+        # Chains without groups have no secondary structure fractions
+        match = polymer & (n > 0) & \
+                (helix >= self.helixFractionMin) & \
+                (helix <= self.helixFractionMax) & \
+                (sheet >= self.sheetFractionMin) & \
+                (sheet <= self.sheetFractionMax) & \
+                (coil >= self.coilFractionMin) & \
+                (coil <= self.coilFractionMax)
+
+        if self.exclusive:
+            return bool(np.any(polymer) and np.array_equal(match, polymer))
+
+        return bool(np.any(match))
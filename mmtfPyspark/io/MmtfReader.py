@@ -17,33 +17,42 @@ from Bio.PDB import PDBParser, MMCIFParser, FastMMCIFParser
 from mmtf import MMTFEncoder
 from mmtf.api.default_api import pass_data_on
 from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.io import mmtfArchive, mmtfCompression, hadoopSequenceFile, structureParser
+from mmtfPyspark.io.mmtfDownloader import mmtfDownloader, listAccumulatorParam, unpack
+from mmtfPyspark.io.MmtfWriter import ATOM_INDEX
+from mmtfPyspark.utils import mmtfCodec
 import msgpack
 import gzip
 import os
+import random
+import numpy as np
 from os import path, walk
 
+DEFAULT_PARTITION_BYTES = 64 * 1024 * 1024
+
 text = "org.apache.hadoop.io.Text"
 byteWritable = "org.apache.hadoop.io.BytesWritable"
 
-def call_sequence_file(t):
+def call_sequence_file(t, lazy=False, fields=None, coordType='float64'):
     '''
     Call function for hadoop sequence files
     '''
-    unpack = msgpack.unpackb(t[1])
-    decoder = mmtfStructure(unpack)
+    unpack = msgpack.unpackb(t[1], raw=True)
+    decoder = mmtfStructure(unpack, lazy, fields, coordType)
     return (str(t[0]), decoder)
 
 
-def call_sequence_file_gzip(t):
+def call_sequence_file_gzip(t, lazy=False, fields=None, coordType='float64'):
     '''
-    Call function for hadoop sequence files
+    Call function for hadoop sequence files with compressed records (gzip,
+    or zstd and lz4, see mmtfCompression)
     '''
-    data = default_api.ungzip_data(t[1])
-    unpack = msgpack.unpackb(data.read())
-    decoder = mmtfStructure(unpack)
+    data = mmtfCompression.decompress(bytes(t[1]))
+    unpack = msgpack.unpackb(data, raw=True)
+    decoder = mmtfStructure(unpack, lazy, fields, coordType)
     return (str(t[0]), decoder)
 
-def call_mmtf(f):
+def call_mmtf(f, lazy=False, fields=None, coordType='float64'):
     '''
     Call function for mmtf files
     '''
@@ -51,16 +60,17 @@ def call_mmtf(f):
     if ".mmtf.gz" in f:
         name = f.split('/')[-1].split('.')[0].upper()
 
-        data = gzip.open(f,'rb')
-        unpack = msgpack.unpack(data)
-        decoder = mmtfStructure(unpack)
+        with gzip.open(f,'rb') as data:
+            unpack = msgpack.unpack(data, raw=True)
+        decoder = mmtfStructure(unpack, lazy, fields, coordType)
         return (name, decoder)
 
     elif ".mmtf" in f:
         name = f.split('/')[-1].split('.')[0].upper()
 
-        unpack = msgpack.unpack(open(f,"rb"))
-        decoder = mmtfStructure(unpack)
+        with open(f,"rb") as data:
+            unpack = msgpack.unpack(data, raw=True)
+        decoder = mmtfStructure(unpack, lazy, fields, coordType)
         return (name, decoder)
 
 
@@ -101,6 +111,24 @@ def call_mmcif(f):
         return (name, mmtf_encoder)
 
 
+def call_pdb_columns(f, fields=None, coordType='float64'):
+    '''
+    Call function for pdb files (Using the column oriented parser)
+    '''
+
+    name = f.split('/')[-1].split('.')[0].upper()
+    return (name, structureParser.readPdb(f, name, fields, coordType))
+
+
+def call_mmcif_columns(f, fields=None, coordType='float64'):
+    '''
+    Call function for mmcif files (Using the column oriented parser)
+    '''
+
+    name = f.split('/')[-1].split('.')[0].upper()
+    return (name, structureParser.readMmcif(f, fields, coordType))
+
+
 def call_fast_mmcif(f):
     '''
     Call function for mmcifr files (Using Fast Parser)
@@ -138,48 +166,207 @@ def getFiles(user_path):
     return files
 
 
-def getStructure(pdbId):
+def listFiles(user_path, fileFilter=None):
+    '''
+    Get List of files and their sizes from path
+
+    Attributes:
+        user_path (str): File path
+        fileFilter (function): optional, keeps file paths for which it
+                               returns True
+    Return:
+        files (List((str, int))): list of file paths and sizes in bytes
+    '''
+    if path.isfile(user_path):
+        return [(user_path, path.getsize(user_path))] if fileFilter == None or fileFilter(user_path) else []
+
+    files = []
+    for dirpath, dirnames, filenames in walk(user_path):
+        for f in filenames:
+            f = dirpath + '/' + f
+            if fileFilter == None or fileFilter(f):
+                files.append((f, path.getsize(f)))
+    return sorted(files)
+
+
+def getFileSizes(user_path, sc=None, fileFilter=None):
+    '''
+    Get List of files and their sizes from path. If a Spark context is
+    given, the subdirectories of path (e.g. the hashed directories of a
+    PDB mirror) are listed in parallel
+
+    Attributes:
+        user_path (str): File path
+        sc (Spark context): optional
+        fileFilter (function): optional, keeps file paths for which it
+                               returns True
+    Return:
+        files (List((str, int))): list of file paths and sizes in bytes
+    '''
+    if sc == None or path.isfile(user_path):
+        return listFiles(user_path, fileFilter)
+
+    files, subdirs = [], []
+    for entry in os.scandir(user_path):
+        if entry.is_dir():
+            subdirs.append(user_path.rstrip('/') + '/' + entry.name)
+        elif fileFilter == None or fileFilter(entry.path):
+            files.append((user_path.rstrip('/') + '/' + entry.name, entry.stat().st_size))
+
+    if len(subdirs) > 0:
+        files += sc.parallelize(subdirs, len(subdirs)) \
+                   .flatMap(lambda d: listFiles(d, fileFilter)) \
+                   .collect()
+
+    return sorted(files)
+
+
+def parallelizeFiles(user_path, sc, fileFilter=None, partitionBytes=DEFAULT_PARTITION_BYTES):
+    '''
+    Returns an RDD of the file paths in path, partitioned into contiguous
+    ranges of about equal total file size
+
+    Attributes:
+        user_path (str): File path
+        sc (Spark context)
+        fileFilter (function): optional, keeps file paths for which it
+                               returns True
+        partitionBytes (int): target total file size of a partition. At
+                              least sc.defaultParallelism partitions are
+                              used if there are enough files
+    '''
+    files = getFileSizes(user_path, sc, fileFilter)
+    sizes = [size for f, size in files]
+
+    numPartitions = max(-(-sum(sizes) // partitionBytes), sc.defaultParallelism)
+    partitions = balancedPartitions([f for f, size in files], sizes, numPartitions)
+
+    return sc.parallelize(partitions, max(len(partitions), 1)).flatMap(lambda part: part)
+
+
+def getStructure(pdbId, lazy=False, fields=None, coordType='float64', baseUrl=None, cache=None):
     '''
     Download and decode a list of structure from a list of PDBid
 
     Attributes:
         pdbID (List(str)): List of structures to download
+        lazy (bool): if true, decode fields on first access
+        fields (list(str)): MMTF fields to decode and keep, all if None
+        coordType (str): coordinate storage, 'float64', 'float32' or 'int32'
+        baseUrl (str): URL prefix of MMTF files, MMTF web services if None
+        cache (mmtfCache): optional on-disk cache, checked before
+                           downloading. True for the default cache (see
+                           mmtfCache), which is used if $MMTF_CACHE_DIR is
+                           set and cache is None, False to always download
     Return:
         tuble of pdbID and deccoder
     '''
 
-    unpack = default_api.get_raw_data_from_url(pdbId)
-    decoder = mmtfStructure(unpack)
+    if baseUrl == None:
+        downloader = mmtfDownloader(numThreads=1, cache=cache)
+    else:
+        downloader = mmtfDownloader(baseUrl, numThreads=1, cache=cache)
+
+    pdbId, data, error = next(downloader.download([pdbId]))
+    if error != None:
+        raise Exception(f"download of {pdbId} failed: {error}")
+    unpack_data = unpack(data)
+
+    decoder = mmtfStructure(unpack_data, lazy, fields, coordType)
     return (pdbId, decoder)
 
 
-def readSequenceFile(path, sc, pdbId=None, fraction=None, seed=None, gz = True):
+def balancedPartitions(items, sizes, numPartitions):
+    '''
+    Splits a list into contiguous ranges of about equal total size
+
+    Attributes:
+        items (list): items to partition
+        sizes (list(int)): size of each item, e.g. number of atoms or bytes
+        numPartitions (int): number of partitions
+    Returns:
+        list of non-empty lists of items
+    '''
+
+    if len(items) == 0:
+        return []
+
+    # Each item is assigned to the partition containing its center
+    sizes = np.asarray(sizes, dtype=np.float64)
+    cumulative = np.cumsum(sizes)
+    bounds = cumulative[-1] * np.arange(1, numPartitions) / numPartitions
+    splits = np.unique(np.searchsorted(cumulative - sizes / 2, bounds, side='right'))
+
+    ranges = zip(np.concatenate(([0], splits)), np.concatenate((splits, [len(items)])))
+    return [items[start:end] for start, end in ranges if end > start]
+
+
+def readSequenceFile(path, sc, pdbId=None, fraction=None, seed=None, gz = True, lazy = False, fields = None, coordType = 'float64', numPartitions = None):
     '''
     Reads an MMTF Hadoop Sequence File. Can read all files from path,
     randomly rample a fraction, or a subset based on input list.
     See <a href="http://mmtf.rcsb.org/download.html"> for file download information</a>
 
+    If the sequence file has a sidecar index (see
+    hadoopSequenceFile.createIndex), subsets and samples are selected on the
+    index and only the selected records are read, in partitions of about
+    equal numbers of atoms.
+
     Attributes:
         path (str): path to file directory
         sc (Spark Context):
         pdbID (list(str)): List of structures to read
         fraction (float): fraction of structure to read
         seed (int): random seed
+        lazy (bool): if true, keep raw msgpack data and decode fields on first
+                     access. Useful when most structures are filtered out by
+                     metadata (e.g. resolution or release date). Fields that
+                     are not modified are written without re-encoding
+        fields (list(str)): MMTF fields to decode and keep, e.g.
+                            ["resolution", "releaseDate", "entityList"].
+                            All fields are kept if None
+        coordType (str): coordinate and B-factor storage, 'float64',
+                         'float32' or 'int32' (fixed point, converted on
+                         first access). Reduces the memory of persisted RDDs
+        numPartitions (int): number of partitions of indexed reads, Spark
+                             default if None
     '''
     if gz:
-        call = call_sequence_file_gzip
+        call = lambda t: call_sequence_file_gzip(t, lazy, fields, coordType)
     else:
-        call = call_sequence_file
+        call = lambda t: call_sequence_file(t, lazy, fields, coordType)
 
     if not os.path.exists(path):
         raise Exception("file path does not exist")
 
-    infiles = sc.sequenceFile(path, text, byteWritable)
-
     if (pdbId == None and fraction == None and seed == None):
-        return infiles.map(call)
+        return sc.sequenceFile(path, text, byteWritable).map(call)
+
+    index = hadoopSequenceFile.readIndex(path)
+
+    if index != None:
+        if(pdbId != None and fraction == None and seed == None):
+            pdbIdSet = set(pdbId)
+            entries = [e for e in index if e[0] in pdbIdSet]
+
+        elif (fraction != None and seed != None):
+            rng = random.Random(seed)
+            entries = [e for e in index if rng.random() < fraction]
+        else:
+            raise Exception("Inappropriate combination of parameters")
+
+        if numPartitions == None:
+            numPartitions = sc.defaultParallelism
+
+        partitions = balancedPartitions(entries, [e[4] for e in entries], numPartitions)
+
+        return sc.parallelize(partitions, max(len(partitions), 1)) \
+                 .flatMap(lambda part: hadoopSequenceFile.readIndexedRecords(path, part)) \
+                 .map(call)
+
+    infiles = sc.sequenceFile(path, text, byteWritable)
 
-    elif(pdbId != None and fraction == None and seed == None):
+    if(pdbId != None and fraction == None and seed == None):
         pdbIdSet = set(pdbId)
         return infiles.filter(lambda t: str(t[0]) in pdbIdSet).map(call)
 
@@ -189,13 +376,86 @@ def readSequenceFile(path, sc, pdbId=None, fraction=None, seed=None, gz = True):
         raise Exception("Inappropriate combination of parameters")
 
 
-def readMmtfFiles(path, sc):
+def readArchive(path, sc, pdbId=None, fraction=None, seed=None, numPartitions=None, lazy=False, fields=None, coordType='float64'):
+    '''
+    Reads an indexed MMTF archive (see mmtfArchive). Subsets and samples
+    are selected on the index, so only the requested records are read.
+    Partitions are contiguous ranges of the index
+
+    Attributes:
+        path (str): path to the archive directory, which must be accessible
+                    from all workers
+        sc (Spark Context):
+        pdbID (list(str)): List of structures to read, PDB IDs or keys
+        fraction (float): fraction of structure to read
+        seed (int): random seed
+        numPartitions (int): number of partitions, Spark default if None
+        lazy (bool): if true, decode fields on first access
+        fields (list(str)): MMTF fields to decode and keep, all if None
+        coordType (str): coordinate storage, 'float64', 'float32' or 'int32'
+    '''
+
+    entries = mmtfArchive.readIndex(path)
+
+    if pdbId != None:
+        entries = mmtfArchive.selectEntries(entries, pdbId)
+
+    if fraction != None:
+        rng = random.Random(seed)
+        entries = [e for e in entries if rng.random() < fraction]
+
+    return sc.parallelize(entries, numPartitions) \
+             .mapPartitions(lambda part: mmtfArchive.readRecords(path, part)) \
+             .map(lambda t: call_sequence_file_gzip(t, lazy, fields, coordType))
+
+
+def readAtomIndex(path, sc, pdbId=None, numPartitions=None):
+    '''
+    Reads the indices of the atoms of reduced structures in their full
+    structures, written by MmtfWriter.writeReduced. The reduced atom i of a
+    structure is the full atom indices[i]
+
+    Attributes:
+        path (str): path to the reduced output directory, which must be
+                    accessible from all workers
+        sc (Spark Context):
+        pdbID (list(str)): List of structures to read, all if None
+        numPartitions (int): number of partitions, Spark default if None
+    Returns:
+        RDD of (key, int32 array of atom indices)
+    '''
+
+    indexPath = os.path.join(path, ATOM_INDEX)
+    entries = hadoopSequenceFile.readIndex(indexPath)
+
+    if entries == None:
+        raise Exception(f"{path} has no atom index, write it with MmtfWriter.writeReduced")
+
+    if pdbId != None:
+        pdbIdSet = set(pdbId)
+        entries = [e for e in entries if e[0] in pdbIdSet]
+
+    if numPartitions == None:
+        numPartitions = sc.defaultParallelism
+
+    partitions = balancedPartitions(entries, [e[4] for e in entries], numPartitions)
+
+    return sc.parallelize(partitions, max(len(partitions), 1)) \
+             .flatMap(lambda part: hadoopSequenceFile.readIndexedRecords(indexPath, part)) \
+             .mapValues(lambda value: mmtfCodec.decode_array(mmtfCompression.decompress(bytes(value))))
+
+
+def readMmtfFiles(path, sc, lazy=False, fields=None, coordType='float64', partitionBytes=DEFAULT_PARTITION_BYTES):
     '''
     Read the specified PDB entries from a MMTF file
 
     Attributes:
         path (str): Path to MMTF files
         sc (Spark context)
+        lazy (bool): if true, decode fields on first access
+        fields (list(str)): MMTF fields to decode and keep, all if None
+        coordType (str): coordinate storage, 'float64', 'float32' or 'int32'
+        partitionBytes (int): target total file size of a partition
 
     Return:
         structure data as keywork/value pairs
@@ -204,16 +464,25 @@ def readMmtfFiles(path, sc):
     if not os.path.exists(path):
         raise Exception("file path does not exist")
 
-    return sc.parallelize(getFiles(path)).map(call_mmtf).filter(lambda t: t != None)
+    return parallelizeFiles(path, sc, lambda f: ".mmtf" in f, partitionBytes) \
+             .map(lambda f: call_mmtf(f, lazy, fields, coordType)).filter(lambda t: t != None)
 
 
-def readPDBFiles(path, sc):
+def readPDBFiles(path, sc, partitionBytes=DEFAULT_PARTITION_BYTES, biopython=True, fields=None, coordType='float64'):
     '''
     Read the specified PDB entries from a PDB file
 
     Attributes:
         path (str): Path to PDB files
         sc (Spark context)
+        partitionBytes (int): target total file size of a partition
+        biopython (bool): parse with Biopython if true (default), else with
+                          the column oriented parser of structureParser,
+                          which only assigns the bonds given in the files
+        fields (list(str)): MMTF fields to keep, all if None. Column
+                            oriented parser only
+        coordType (str): coordinate storage, 'float64', 'float32' or
+                         'int32'. Column oriented parser only
 
     Return:
         structure data as keywork/value pairs
@@ -222,16 +491,30 @@ def readPDBFiles(path, sc):
     if not os.path.exists(path):
         raise Exception("file path does not exist")
 
-    return sc.parallelize(getFiles(path)).map(call_pdb).filter(lambda t: t != None)
+    files = parallelizeFiles(path, sc, lambda f: ".pdb" in f, partitionBytes)
+
+    if biopython:
+        return files.map(call_pdb).filter(lambda t: t != None)
+    else:
+        return files.map(lambda f: call_pdb_columns(f, fields, coordType))
 
 
-def readMmcifFiles(path, sc, fast=False):
+def readMmcifFiles(path, sc, fast=False, partitionBytes=DEFAULT_PARTITION_BYTES, biopython=True, fields=None, coordType='float64'):
     '''
     Read the specified PDB entries from a MMcif file
 
     Attributes:
         path (str): Path to MMcif files
         sc (Spark context)
+        fast (bool): use the fast mmCIF parser of Biopython
+        partitionBytes (int): target total file size of a partition
+        biopython (bool): parse with Biopython if true (default), else with
+                          the column oriented parser of structureParser,
+                          which only assigns the bonds given in the files
+        fields (list(str)): MMTF fields to keep, all if None. Column
+                            oriented parser only
+        coordType (str): coordinate storage, 'float64', 'float32' or
+                         'int32'. Column oriented parser only
 
     Return:
         structure data as keywork/value pairs
@@ -240,22 +523,78 @@ def readMmcifFiles(path, sc, fast=False):
     if not os.path.exists(path):
         raise Exception("file path does not exist")
 
-    if fast:
-        return sc.parallelize(getFiles(path)).map(call_fast_mmcif).filter(lambda t: t != None)
+    if fast and not biopython:
+        raise Exception("fast is a Biopython parser, it requires biopython=True")
+
+    files = parallelizeFiles(path, sc, lambda f: ".cif" in f, partitionBytes)
+
+    if not biopython:
+        return files.map(lambda f: call_mmcif_columns(f, fields, coordType))
+    elif fast:
+        return files.map(call_fast_mmcif).filter(lambda t: t != None)
     else:
-        return sc.parallelize(getFiles(path)).map(call_mmcif).filter(lambda t: t != None)
+        return files.map(call_mmcif).filter(lambda t: t != None)
 
 
-def downloadMmtfFiles(pdbIds, sc):
+def createFailureAccumulator(sc):
+    '''
+    Returns a Spark accumulator that collects (PDB ID, error message)
+    tuples of failed downloads, see downloadMmtfFiles
+
+    Attributes:
+        sc (Spark context)
+    '''
+
+    return sc.accumulator([], listAccumulatorParam())
+
+
+def downloadMmtfFiles(pdbIds, sc, lazy=False, fields=None, coordType='float64', baseUrl=None, numThreads=8, retries=3, failures=None, cache=None):
     '''
     Download and reads the specified PDB entries using <a href="http://mmtf.rcsb.org/download.html">MMTF web services</a>.
+    Each partition downloads its entries concurrently over pooled
+    connections and retries transient failures. Entries that fail are
+    left out instead of failing the task
 
     Attributes:
         path (str): Path to PDB files
         sc (Spark context)
+        lazy (bool): if true, decode fields on first access
+        fields (list(str)): MMTF fields to decode and keep, all if None
+        coordType (str): coordinate storage, 'float64', 'float32' or 'int32'
+        baseUrl (str): URL prefix of MMTF files, MMTF web services if None
+        numThreads (int): concurrent downloads per partition
+        retries (int): retries of a failed download
+        failures (Accumulator): optional, collects (PDB ID, error message)
+                                of failed entries once an action has run,
+                                see createFailureAccumulator
+        cache (mmtfCache): optional on-disk cache on each worker node,
+                           checked before downloading. True for the default
+                           cache of each worker (see mmtfCache), which is
+                           used if $MMTF_CACHE_DIR is set on the worker and
+                           cache is None, False to always download
 
     Return:
         structure data as keywork/value pairs
     '''
 
-    return sc.parallelize(set(pdbIds)).map(lambda t: getStructure(t))
+    if baseUrl == None:
+        downloader = mmtfDownloader(numThreads=numThreads, retries=retries, cache=cache)
+    else:
+        downloader = mmtfDownloader(baseUrl, numThreads=numThreads, retries=retries, cache=cache)
+
+    def decode(t):
+        pdbId, data, error = t
+        if error != None:
+            if failures != None:
+                failures.add([(pdbId, error)])
+            return []
+        try:
+            return [(pdbId, mmtfStructure(unpack(data), lazy, fields, coordType))]
+        except Exception as e:
+            if failures != None:
+                failures.add([(pdbId, str(e))])
+            return []
+
+    return sc.parallelize(sorted(set(pdbIds))) \
+             .mapPartitions(downloader.download) \
+             .flatMap(decode)
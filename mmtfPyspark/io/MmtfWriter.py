@@ -2,7 +2,9 @@
 '''
 MMTFWriter.py
 
-Encodes and write MMTF encoded structure data to a Hadoop Sequence File
+Encodes and write MMTF encoded structure data to a Hadoop Sequence File,
+individual MMTF files, or sharded sequence files and archives, optionally
+in the reduced representation
 
 Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
@@ -12,12 +14,17 @@ Authorship information:
 '''
 
 from mmtf.api.mmtf_writer import MMTFEncoder
-from mmtfPyspark.io import mmtfStructure
-import gzip
+from mmtfPyspark.io import mmtfStructure, mmtfArchive, mmtfCompression, hadoopSequenceFile
+from mmtfPyspark.utils import mmtfCodec
 import msgpack
 import os
 
-def writeSequenceFile(path, sc, structure, compressed = True):
+PART_FORMAT = "part-{:05d}"
+# Sequence file of the atom indices of reduced structures, ignored by Hadoop
+ATOM_INDEX = "_atomIndex"
+
+
+def writeSequenceFile(path, sc, structure, compressed = True, compression = 'gzip', level = None):
     '''
     Encodes and writes MMTF encoded structure data to a Hadoop Sequnce File
 
@@ -25,27 +32,32 @@ def writeSequenceFile(path, sc, structure, compressed = True):
         path (str): Path to Hadoop file directory)
         sc (Spark context)
         structure (tuple): structure data to be written
-        compress (bool): if true, apply gzip compression
+        compress (bool): if true, apply compression
+        compression (str): 'gzip', 'zstd' or 'lz4' (see mmtfCompression)
+        level (int): compression level, the default of the compression if
+                     None
     '''
-    if structure.first()[1] == mmtfStructure:
-        structure.map(lambda s: (s[0],s[1].set_alt_loc_list()) \
-                                 if not s[1].alt_loc_set \
-                                 else s) \
 
-    structure.map(lambda t: (t[0], toByteArray(t[1], compressed))).saveAsHadoopFile(path,
+    structure.map(lambda t: (t[0], toByteArray(t[1], compressed, compression, level))).saveAsHadoopFile(path,
                        "org.apache.hadoop.mapred.SequenceFileOutputFormat",
                        "org.apache.hadoop.io.Text",
                        "org.apache.hadoop.io.BytesWritable")
 
 
-def writeMmtfFiles(path, sc, structure):
+def writeMmtfFiles(path, sc, structure, compression = 'gzip', level = None):
     '''
-    Encodes and writes MMTF encoded and gzipped structure data to individual .mmtf.gz files.
+    Encodes and writes MMTF encoded and compressed structure data to
+    individual .mmtf.gz files (.mmtf.zst or .mmtf.lz4 for zstd and lz4).
 
     Attributes:
     path (str): Path to Hadoop file directory)
     sc (Spark context)
     structure (tuple): structure data to be written
+    compression (str): 'gzip', 'zstd', 'lz4' or None (see mmtfCompression)
+    level (int): compression level, the default of the compression if None
+
+    Returns:
+        list of the number of records and bytes written per partition
     '''
 
     if path[-1] != "/":
@@ -54,24 +66,318 @@ def writeMmtfFiles(path, sc, structure):
     if not os.path.exists(path):
         os.makedirs(path)
 
-    structure = structure.map(lambda s: (s[0],s[1].set_alt_loc_list()) \
-                                  if not s[1].alt_loc_set \
-                                  else s) \
-                .map(lambda t: (t[0], toByteArray(t[1], False))) \
-                .foreach(lambda t: gzip.open(path + t[0] + '.mmtf.gz', mode = 'wb').write(t[1]))
+    suffix = '.mmtf' + mmtfCompression.getSuffix(compression)
+
+    def writePartition(partition, records):
+        numRecords, numBytes = 0, 0
+
+        for key, s in records:
+            data = toByteArray(s, compression is not None, compression, level)
+            with open(path + key + suffix, 'wb') as f:
+                f.write(data)
+            numRecords += 1
+            numBytes += len(data)
+
+        yield {"partition": partition, "records": numRecords, "bytes": numBytes}
+
+    return structure.mapPartitionsWithIndex(writePartition).collect()
+
+
+def writeShards(path, sc, structure, fileFormat = 'sequenceFile', compression = 'gzip', level = None, shardBytes = mmtfArchive.DEFAULT_SHARD_BYTES):
+    '''
+    Encodes and writes structure data to one shard file per partition,
+    without the Hadoop output format. Each partition opens its files once
+    and writes them through a buffer. The index of the output is written
+    last, so subsets of it can be read with MmtfReader.readSequenceFile or
+    MmtfReader.readArchive
+
+    Attributes:
+        path (str): output directory, which must be accessible from all
+                    workers and must not contain files
+        sc (Spark context)
+        structure (tuple): structure data to be written
+        fileFormat (str): 'sequenceFile' for an MMTF Hadoop Sequence File
+                          with a sidecar index (see hadoopSequenceFile),
+                          'archive' for an indexed archive (see mmtfArchive)
+        compression (str): 'gzip', 'zstd', 'lz4', or None for uncompressed
+                           sequence file records (see mmtfCompression)
+        level (int): compression level, the default of the compression if
+                     None
+        shardBytes (int): maximum size of an archive shard file in bytes
+
+    Returns:
+        list of the number of records and bytes written per partition
+    '''
+
+    write = _partitionWriter(path, fileFormat, compression, level, shardBytes)
+    results = structure.mapPartitionsWithIndex(write).collect()
+    _writeIndex(path, fileFormat, results)
+
+    return results
+
+
+def writeReduced(path, sc, structure, fileFormat = 'sequenceFile', compression = 'gzip', level = None, shardBytes = mmtfArchive.DEFAULT_SHARD_BYTES):
+    '''
+    Converts full structures to their reduced representation (see
+    mappers.structureToReducedStructure) and writes them like writeShards,
+    in one pass. The indices of the retained atoms in the full structures
+    are written to the sequence file ATOM_INDEX in the output directory,
+    with MMTF integer array records (codec 8), so reduced atoms can be
+    mapped back to the full resolution records
+    (see MmtfReader.readAtomIndex)
 
+    Attributes:
+        path (str): output directory, which must be accessible from all
+                    workers and must not contain files
+        sc (Spark context)
+        structure (tuple): full structure data to be reduced
+        fileFormat (str): 'sequenceFile' or 'archive' (see writeShards)
+        compression (str): 'gzip', 'zstd', 'lz4', or None for uncompressed
+                           sequence file records (see mmtfCompression)
+        level (int): compression level, the default of the compression if
+                     None
+        shardBytes (int): maximum size of an archive shard file in bytes
 
-def toByteArray(structure, compressed):
+    Returns:
+        list of the number of records and bytes written per partition
     '''
-    Returns an MMTF-encoded byte array with optional gzip compression
 
+    write = _partitionWriter(path, fileFormat, compression, level, shardBytes)
+    os.makedirs(os.path.join(path, ATOM_INDEX))
+
+    writePartition = lambda i, records: _writeReducedPartition(path, i, records, write, compression, level)
+    results = structure.mapPartitionsWithIndex(writePartition).collect()
+
+    atomIndex = [entry for result in results for entry in result.pop("atomIndex")]
+    hadoopSequenceFile.writeIndex(os.path.join(path, ATOM_INDEX), atomIndex)
+    _writeIndex(path, fileFormat, results)
+
+    return results
+
+
+def _partitionWriter(path, fileFormat, compression, level, shardBytes):
+    # Validates the output and returns the partition writer of a format
+    if fileFormat not in ['sequenceFile', 'archive']:
+        raise Exception(f"unknown file format {fileFormat}, use 'sequenceFile' or 'archive'")
+
+    if fileFormat == 'archive' and compression is None:
+        raise Exception("archive records must be compressed")
+
+    if os.path.exists(path) and os.listdir(path):
+        raise Exception(f"output path {path} is not empty")
+
+    os.makedirs(path, exist_ok=True)
+
+    if fileFormat == 'sequenceFile':
+        return lambda i, records: _writeSequencePartition(path, i, records, compression, level)
+    else:
+        return lambda i, records: _writeArchivePartition(path, i, records, compression, level, shardBytes)
+
+
+def _writeIndex(path, fileFormat, results):
+    index = [entry for result in results for entry in result.pop("index")]
+
+    if fileFormat == 'sequenceFile':
+        hadoopSequenceFile.writeIndex(path, index)
+    else:
+        mmtfArchive.writeIndex(index, path)
+
+
+def _writeReducedPartition(path, partition, records, write, compression, level):
+    # Imported here, the mappers package imports optional dependencies
+    from mmtfPyspark.mappers.structureToReducedStructure import reduceStructure
+
+    part = PART_FORMAT.format(partition)
+    atomIndex = []
+
+    with hadoopSequenceFile.sequenceFileWriter(os.path.join(path, ATOM_INDEX, part)) as writer:
+
+        def reduced():
+            for key, s in records:
+                r, indices = reduceStructure(s, returnAtomIndices=True)
+                data = mmtfCompression.compress(mmtfCodec.encode_array(indices, 8), compression, level)
+                offset, length = writer.write(key, data)
+                atomIndex.append((key, part, offset, length, len(indices)))
+                yield key, r
+
+        for result in write(partition, reduced()):
+            result["atomIndex"] = atomIndex
+            yield result
+
+
+def _writeSequencePartition(path, partition, records, compression, level):
+    part = PART_FORMAT.format(partition)
+    index = []
+
+    with hadoopSequenceFile.sequenceFileWriter(os.path.join(path, part)) as writer:
+        for key, s in records:
+            data = toByteArray(s, compression is not None, compression, level)
+            offset, length = writer.write(key, data)
+            index.append((key, part, offset, length, s.num_atoms))
+
+    yield {"partition": partition, "records": len(index),
+           "bytes": sum(entry[3] for entry in index), "index": index}
+
+
+def _writeArchivePartition(path, partition, records, compression, level, shardBytes):
+    shardFormat = PART_FORMAT.format(partition) + "-{:05d}.mmtf" + mmtfCompression.getSuffix(compression)
+    encoded = ((key, toByteArray(s, False)) for key, s in records)
+    index = mmtfArchive.writeShards(encoded, path, shardFormat, shardBytes, compression, level)
+
+    yield {"partition": partition, "records": len(index),
+           "bytes": sum(entry[3] for entry in index), "index": index}
+
+
+# MMTF key -> structure attribute
+_ATTRIBUTES = {
+    "groupTypeList": "group_type_list",
+    "xCoordList": "x_coord_list",
+    "yCoordList": "y_coord_list",
+    "zCoordList": "z_coord_list",
+    "bFactorList": "b_factor_list",
+    "occupancyList": "occupancy_list",
+    "atomIdList": "atom_id_list",
+    "altLocList": "alt_loc_list",
+    "insCodeList": "ins_code_list",
+    "groupIdList": "group_id_list",
+    "groupList": "group_list",
+    "sequenceIndexList": "sequence_index_list",
+    "chainNameList": "chain_name_list",
+    "chainIdList": "chain_id_list",
+    "bondAtomList": "bond_atom_list",
+    "bondOrderList": "bond_order_list",
+    "secStructList": "sec_struct_list",
+    "chainsPerModel": "chains_per_model",
+    "groupsPerChain": "groups_per_chain",
+    "spaceGroup": "space_group",
+    "mmtfVersion": "mmtf_version",
+    "mmtfProducer": "mmtf_producer",
+    "structureId": "structure_id",
+    "entityList": "entity_list",
+    "bioAssemblyList": "bio_assembly",
+    "rFree": "r_free",
+    "rWork": "r_work",
+    "resolution": "resolution",
+    "title": "title",
+    "experimentalMethods": "experimental_methods",
+    "depositionDate": "deposition_date",
+    "releaseDate": "release_date",
+    "unitCell": "unit_cell",
+    "numBonds": "num_bonds",
+    "numChains": "num_chains",
+    "numModels": "num_models",
+    "numAtoms": "num_atoms",
+    "numGroups": "num_groups",
+}
+
+
+def encodeData(structure):
+    '''
+    Encodes a structure into a dictionary of MMTF fields. Array fields are
+    encoded with the vectorized codecs in mmtfCodec. Array fields of an
+    mmtfStructure that keeps its encoded data (read with lazy=True, or
+    created with keep_encoded=True) and that were not reassigned since
+    decoding are passed through as encoded
+
+    Attributes:
+        structure (mmtfStructure or MMTFEncoder): structure to be encoded
+    Returns:
+        dictionary of MMTF encoded fields
+    '''
+
+    if isinstance(structure, mmtfStructure.mmtfStructure):
+        encoded = structure.get_encoded_fields()
+        passThrough = {key: encoded[key.encode()] for key in mmtfCodec.DEFAULT_CODECS
+                       if key.encode() in encoded}
+    else:
+        passThrough = {}
+
+    return _encodeFields(structure, passThrough)
+
+
+# MMTF keys of fields that mmtfStructure holds as read, without decoding
+_RAW_KEYS = frozenset(key.decode() for key, decode, default in mmtfStructure._FIELDS.values()
+                      if decode is None)
+
+
+def _encodeFields(structure, passThrough):
+    # Encodes all fields of a structure, except those given as encoded
+    output_data = {}
+
+    for key, attribute in _ATTRIBUTES.items():
+        if key in passThrough:
+            output_data[key] = passThrough[key]
+            continue
+
+        if not hasattr(structure, attribute):
+            # Not in the fields projection of the structure
+            continue
+        value = getattr(structure, attribute)
+
+        if key in mmtfCodec.DEFAULT_CODECS:
+            if value is None:
+                value = []
+            codec, param = mmtfCodec.DEFAULT_CODECS[key]
+            value = mmtfCodec.encode_array(value, codec, param)
+
+        output_data[key] = value
+
+    return output_data
+
+
+def packData(structure):
+    '''
+    Returns the msgpack bytes of an MMTF encoded structure. Fields of an
+    mmtfStructure that were not decoded, and array fields that were not
+    reassigned since decoding, are written as read without decoding or
+    re-encoding them. Array fields of eagerly decoded structures are always
+    re-encoded, see mmtfStructure keep_encoded
+
+    Attributes:
+        structure (mmtfStructure or MMTFEncoder): structure to be encoded
+    '''
+
+    if not isinstance(structure, mmtfStructure.mmtfStructure):
+        return msgpack.packb(encodeData(structure))
+
+    encoded = {key.decode(): value for key, value in structure.get_encoded_fields().items()}
+    output_data = _encodeFields(structure, encoded)
+
+    # Strings of fields read with raw=True are bytes, which are packed as
+    # msgpack strings, whether the field was passed through or is held as
+    # read (e.g. spaceGroup). Only the encoded arrays are binary
+    packer = msgpack.Packer(use_bin_type=True)
+    stringPacker = msgpack.Packer(use_bin_type=False)
+
+    data = [packer.pack_map_header(len(output_data))]
+
+    for key, value in output_data.items():
+        data.append(packer.pack(key))
+        if key in _RAW_KEYS or (key in encoded and key not in mmtfCodec.DEFAULT_CODECS):
+            data.append(stringPacker.pack(value))
+        else:
+            data.append(packer.pack(value))
+
+    return b''.join(data)
+
+
+def toByteArray(structure, compressed, compression = 'gzip', level = None):
+    '''
+    Returns an MMTF-encoded byte array with optional compression
+
+    Attributes:
+        structure (mmtfStructure or MMTFEncoder): structure to be encoded
+        compressed (bool): if true, apply compression
+        compression (str): 'gzip', 'zstd' or 'lz4' (see mmtfCompression)
+        level (int): compression level, the default of the compression if
+                     None
     Returns:
-        MMTF encoded and optionally gzipped structure data
+        MMTF encoded and optionally compressed structure data
     '''
 
-    byte_array = bytearray(msgpack.packb(MMTFEncoder.encode_data(structure)))
+    byte_array = packData(structure)
 
     if compressed:
-        return gzip.compress(byte_array)
+        return mmtfCompression.compress(byte_array, compression, level)
     else:
-        return byte_array
+        return bytearray(byte_array)
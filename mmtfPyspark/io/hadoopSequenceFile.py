@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+'''
+hadoopSequenceFile.py: Reads and writes uncompressed Hadoop Sequence Files
+with org.apache.hadoop.io.Text keys and org.apache.hadoop.io.BytesWritable
+values, the layout of the MMTF Hadoop Sequence Files, without a Spark context.
+
+A sidecar index with one tab separated line per record
+
+    key    part file    offset    length    number of atoms
+
+allows reading individual records by seeking to their offset. The index of
+a sequence file directory is stored in the directory as _index.tsv, which
+Hadoop ignores as a hidden file.
+
+See <a href="https://hadoop.apache.org/docs/current/api/org/apache/hadoop/io/SequenceFile.html">SequenceFile</a>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import io
+import os
+import struct
+import msgpack
+from itertools import groupby
+from mmtfPyspark.io import mmtfCompression
+
+SYNC_ESCAPE = -1
+SYNC_SIZE = 16
+# Minimum number of bytes between sync markers of written files
+SYNC_INTERVAL = 100 * SYNC_SIZE
+VERSION = 6
+KEY_CLASS = "org.apache.hadoop.io.Text"
+VALUE_CLASS = "org.apache.hadoop.io.BytesWritable"
+INDEX_FILE = "_index.tsv"
+
+
+def readVInt(f):
+    '''
+    Reads a Hadoop variable length integer (WritableUtils.readVLong)
+
+    Attributes:
+        f (file): binary file object
+    Returns:
+        the integer value
+    '''
+
+    first = struct.unpack('b', f.read(1))[0]
+    if first >= -112:
+        return first
+
+    negative = first < -120
+    length = (-119 - first) if negative else (-111 - first)
+    value = int.from_bytes(f.read(length - 1), 'big')
+    return ~value if negative else value
+
+
+def readText(f):
+    '''
+    Reads a serialized org.apache.hadoop.io.Text
+
+    Attributes:
+        f (file): binary file object
+    '''
+
+    return f.read(readVInt(f)).decode('utf-8')
+
+
+def readHeader(f):
+    '''
+    Reads the header of a sequence file
+
+    Attributes:
+        f (file): binary file object positioned at the start of the file
+    Returns:
+        dictionary with the key class, value class, metadata and sync marker
+    '''
+
+    if f.read(3) != b'SEQ':
+        raise Exception("not a Hadoop sequence file")
+
+    version = f.read(1)[0]
+    header = {"version": version,
+              "keyClass": readText(f),
+              "valueClass": readText(f)}
+
+    compressed = f.read(1)[0] != 0
+    blockCompressed = f.read(1)[0] != 0
+    if compressed or blockCompressed:
+        raise Exception("compressed sequence files are not supported")
+
+    metadata = {}
+    for i in range(struct.unpack('>i', f.read(4))[0]):
+        key = readText(f)
+        metadata[key] = readText(f)
+
+    header["metadata"] = metadata
+    header["sync"] = f.read(SYNC_SIZE)
+    return header
+
+
+def readRecord(f):
+    '''
+    Reads the record at the current position of a sequence file, skipping
+    a preceding sync marker
+
+    Attributes:
+        f (file): binary file object
+    Returns:
+        tuple of key (str), value (bytes) and record offset, or None at the
+        end of the file
+    '''
+
+    offset = f.tell()
+    data = f.read(4)
+
+    if len(data) < 4:
+        return None
+
+    recordLength = struct.unpack('>i', data)[0]
+
+    if recordLength == SYNC_ESCAPE:
+        f.read(SYNC_SIZE)
+        return readRecord(f)
+
+    keyLength = struct.unpack('>i', f.read(4))[0]
+    key = readText(io.BytesIO(f.read(keyLength)))
+
+    # BytesWritable value: int length + bytes
+    value = f.read(recordLength - keyLength)[4:]
+
+    return key, value, offset
+
+
+def readRecords(path):
+    '''
+    Generator of all records in a sequence file
+
+    Attributes:
+        path (str): path to a sequence file
+    Returns:
+        tuples of key (str), value (bytes) and record offset
+    '''
+
+    with open(path, 'rb') as f:
+        readHeader(f)
+        record = readRecord(f)
+
+        while record is not None:
+            yield record
+            record = readRecord(f)
+
+
+def writeVInt(f, value):
+    '''
+    Writes a Hadoop variable length integer (WritableUtils.writeVLong)
+
+    Attributes:
+        f (file): binary file object
+        value (int): integer value
+    '''
+
+    if -112 <= value <= 127:
+        f.write(struct.pack('b', value))
+        return
+
+    first = -112
+    if value < 0:
+        value = ~value
+        first = -120
+
+    length = (value.bit_length() + 7) // 8
+    f.write(struct.pack('b', first - length))
+    f.write(value.to_bytes(length, 'big'))
+
+
+def writeText(f, text):
+    '''
+    Writes a serialized org.apache.hadoop.io.Text
+
+    Attributes:
+        f (file): binary file object
+        text (str): text
+    '''
+
+    data = text.encode('utf-8')
+    writeVInt(f, len(data))
+    f.write(data)
+
+
+def writeHeader(f, sync):
+    '''
+    Writes the header of an uncompressed sequence file of Text keys and
+    BytesWritable values
+
+    Attributes:
+        f (file): binary file object positioned at the start of the file
+        sync (bytes): sync marker of the file
+    '''
+
+    f.write(b'SEQ' + bytes([VERSION]))
+    writeText(f, KEY_CLASS)
+    writeText(f, VALUE_CLASS)
+    # Neither record nor block compressed, no metadata
+    f.write(b'\x00\x00')
+    f.write(struct.pack('>i', 0))
+    f.write(sync)
+
+
+class sequenceFileWriter(object):
+    '''
+    Writes records to a new part file. The file is opened once and written
+    through a buffer, use as a context manager to close it
+
+    Attributes:
+        path (str): path of the part file
+        bufferSize (int): size of the write buffer in bytes
+    '''
+
+    def __init__(self, path, bufferSize=1024 * 1024):
+
+        self.path = path
+        self.sync = os.urandom(SYNC_SIZE)
+        self.records = 0
+        self.f = open(path, 'wb', buffering=bufferSize)
+
+        writeHeader(self.f, self.sync)
+        self.lastSync = self.f.tell()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def write(self, key, value):
+        '''
+        Appends a record, preceded by a sync marker if the last one is more
+        than SYNC_INTERVAL bytes back
+
+        Attributes:
+            key (str): record key
+            value (bytes): record value
+        Returns:
+            offset and length of the record, as in the sidecar index
+        '''
+
+        offset = self.f.tell()
+
+        if offset >= self.lastSync + SYNC_INTERVAL:
+            self.f.write(struct.pack('>i', SYNC_ESCAPE))
+            self.f.write(self.sync)
+            self.lastSync = self.f.tell()
+
+        keyData = io.BytesIO()
+        writeText(keyData, key)
+        keyData = keyData.getvalue()
+
+        # Record length, key length, key, BytesWritable value
+        self.f.write(struct.pack('>ii', len(keyData) + 4 + len(value), len(keyData)))
+        self.f.write(keyData)
+        self.f.write(struct.pack('>i', len(value)))
+        self.f.write(value)
+
+        self.records += 1
+        return offset, self.f.tell() - offset
+
+
+    def close(self):
+        self.f.close()
+
+
+def getPartFiles(path):
+    '''
+    Returns the sorted list of part files of a sequence file directory
+
+    Attributes:
+        path (str): path to a sequence file directory or a single part file
+    '''
+
+    if os.path.isfile(path):
+        return [path]
+
+    return sorted(os.path.join(path, f) for f in os.listdir(path)
+                  if f.startswith('part-') and not f.endswith('.crc'))
+
+
+def getIndexPath(path):
+    '''
+    Returns the path of the sidecar index of a sequence file directory or
+    a single part file
+
+    Attributes:
+        path (str): path to a sequence file directory or a single part file
+    '''
+
+    if os.path.isfile(path):
+        return path + ".index.tsv"
+
+    return os.path.join(path, INDEX_FILE)
+
+
+def indexPartFile(path, gz=True):
+    '''
+    Returns the index entries of the MMTF records in a part file
+
+    Attributes:
+        path (str): path to a part file
+        gz (bool): true if the MMTF records are compressed
+    Returns:
+        list of (key, part file name, offset, length, number of atoms)
+    '''
+
+    entries = []
+    part = os.path.basename(path)
+
+    with open(path, 'rb') as f:
+        readHeader(f)
+        record = readRecord(f)
+
+        while record is not None:
+            key, value, offset = record
+            data = mmtfCompression.decompress(value) if gz else value
+            numAtoms = msgpack.unpackb(data, raw=True)[b'numAtoms']
+            entries.append((key, part, offset, f.tell() - offset, numAtoms))
+            record = readRecord(f)
+
+    return entries
+
+
+def createIndex(path, sc=None, gz=True):
+    '''
+    Indexes all records of a sequence file and writes the sidecar index.
+    Part files are indexed in parallel if a Spark context is given
+
+    Attributes:
+        path (str): path to a sequence file directory or a single part file
+        sc (Spark Context): optional, used to index part files in parallel
+        gz (bool): true if the MMTF records are compressed
+    Returns:
+        list of index entries
+    '''
+
+    partFiles = getPartFiles(path)
+
+    if sc is None:
+        entries = [e for part in partFiles for e in indexPartFile(part, gz)]
+    else:
+        entries = sc.parallelize(partFiles, len(partFiles)) \
+                    .flatMap(lambda part: indexPartFile(part, gz)) \
+                    .collect()
+
+    writeIndex(path, entries)
+    return entries
+
+
+def writeIndex(path, entries):
+    '''
+    Atomically writes the sidecar index of a sequence file
+
+    Attributes:
+        path (str): path to a sequence file directory or a single part file
+        entries (list): index entries
+    '''
+
+    indexPath = getIndexPath(path)
+    tmp = indexPath + ".tmp"
+
+    with open(tmp, 'w') as f:
+        for entry in entries:
+            f.write("\t".join(str(x) for x in entry) + "\n")
+
+    os.replace(tmp, indexPath)
+
+
+def readIndex(path):
+    '''
+    Reads the sidecar index of a sequence file
+
+    Attributes:
+        path (str): path to a sequence file directory or a single part file
+    Returns:
+        list of (key, part file name, offset, length, number of atoms),
+        or None if the sequence file has not been indexed
+    '''
+
+    indexPath = getIndexPath(path)
+
+    if not os.path.exists(indexPath):
+        return None
+
+    with open(indexPath) as f:
+        index = []
+        for line in f:
+            key, part, offset, length, numAtoms = line.rstrip('\n').split('\t')
+            index.append((key, part, int(offset), int(length), int(numAtoms)))
+
+    return index
+
+
+def readIndexedRecords(path, entries):
+    '''
+    Generator of the records of the given index entries. Each part file is
+    opened once for consecutive entries of the same part file
+
+    Attributes:
+        path (str): path to a sequence file directory or a single part file
+        entries (iterable): index entries
+    Returns:
+        tuples of key (str) and value (bytes)
+    '''
+
+    directory = os.path.dirname(path) if os.path.isfile(path) else path
+
+    for part, partEntries in groupby(entries, key=lambda e: e[1]):
+        with open(os.path.join(directory, part), 'rb') as f:
+            for entry in partEntries:
+                f.seek(entry[2])
+                key, value, offset = readRecord(f)
+                yield key, value
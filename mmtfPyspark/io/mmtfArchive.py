@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+'''
+mmtfArchive.py: Writes and reads indexed MMTF archives, a local format for
+random access to individual entries.
+
+An archive is a directory of shard files, each a concatenation of
+compressed MMTF records (gzip by default, see mmtfCompression), and an
+index file with one tab separated line per record:
+
+    key    shard    offset    length
+
+Keys are PDB IDs, or PDB ID and chain ID (e.g. 4HHB.A) for archives of
+polymer chains. Records are read by memory mapping the shards, so only the
+requested records are read from disk.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import mmap
+import os
+from itertools import groupby
+from mmtfPyspark.io import hadoopSequenceFile, mmtfCompression
+
+INDEX_FILE = "index.tsv"
+SHARD_FORMAT = "shard-{:05d}.mmtf"
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+
+
+def writeArchive(records, path, shardBytes=DEFAULT_SHARD_BYTES, compression='gzip', level=None):
+    '''
+    Writes records to a new archive. A new shard is started when the
+    current one exceeds shardBytes. The index is written last, so an
+    archive is only readable once it is complete
+
+    Attributes:
+        records (iterable): tuples of key and MMTF encoded bytes, which
+                            are compressed if not already compressed
+                            with the given compression
+        path (str): archive directory
+        shardBytes (int): maximum size of a shard file in bytes
+        compression (str): compression of the records, 'gzip', 'zstd' or
+                           'lz4' (see mmtfCompression). Records with
+                           another compression are recompressed
+        level (int): compression level, the default of the compression if
+                     None
+    Returns:
+        list of index entries (key, shard, offset, length)
+    '''
+
+    os.makedirs(path, exist_ok=True)
+
+    shardFormat = SHARD_FORMAT + mmtfCompression.getSuffix(compression)
+    index = writeShards(records, path, shardFormat, shardBytes, compression, level)
+    writeIndex(index, path)
+    return index
+
+
+def writeShards(records, path, shardFormat=None, shardBytes=DEFAULT_SHARD_BYTES, compression='gzip', level=None):
+    '''
+    Writes records to shard files of an archive directory, without writing
+    the index. Used to write the shards of an archive in parallel, with a
+    distinct shardFormat per writer
+
+    Attributes:
+        records (iterable): tuples of key and MMTF encoded bytes, which
+                            are compressed if not already compressed
+                            with the given compression
+        path (str): archive directory
+        shardFormat (str): format of shard file names, given the shard
+                           number. Defaults to SHARD_FORMAT with the file
+                           suffix of the compression
+        shardBytes (int): maximum size of a shard file in bytes
+        compression (str): compression of the records, records with
+                           another compression are recompressed
+        level (int): compression level
+    Returns:
+        list of index entries (key, shard, offset, length)
+    '''
+
+    if shardFormat is None:
+        shardFormat = SHARD_FORMAT + mmtfCompression.getSuffix(compression)
+
+    index = []
+    shardNumber = 0
+    shard = None
+
+    try:
+        for key, value in records:
+            # All records of a shard have the compression of its suffix
+            current = mmtfCompression.getCompression(value)
+            if current != compression:
+                if current is not None:
+                    value = mmtfCompression.decompress(value)
+                value = mmtfCompression.compress(value, compression, level)
+
+            if shard is not None and shard.tell() + len(value) > shardBytes:
+                shard.close()
+                shard = None
+                shardNumber += 1
+
+            if shard is None:
+                shardName = shardFormat.format(shardNumber)
+                shard = open(os.path.join(path, shardName), 'wb', buffering=1024 * 1024)
+
+            index.append((key, shardName, shard.tell(), len(value)))
+            shard.write(value)
+    finally:
+        if shard is not None:
+            shard.close()
+
+    return index
+
+
+def writeIndex(index, path):
+    '''
+    Atomically writes the index file of an archive
+
+    Attributes:
+        index (list): index entries (key, shard, offset, length)
+        path (str): archive directory
+    '''
+
+    tmp = os.path.join(path, INDEX_FILE + ".tmp")
+
+    with open(tmp, 'w') as f:
+        for key, shard, offset, length in index:
+            f.write(f"{key}\t{shard}\t{offset}\t{length}\n")
+
+    os.replace(tmp, os.path.join(path, INDEX_FILE))
+
+
+def readIndex(path):
+    '''
+    Reads the index of an archive
+
+    Attributes:
+        path (str): archive directory
+    Returns:
+        list of index entries (key, shard, offset, length)
+    '''
+
+    indexPath = os.path.join(path, INDEX_FILE)
+
+    if not os.path.exists(indexPath):
+        raise Exception(f"no archive index found in {path}")
+
+    with open(indexPath) as f:
+        index = []
+        for line in f:
+            key, shard, offset, length = line.rstrip('\n').split('\t')
+            index.append((key, shard, int(offset), int(length)))
+
+    return index
+
+
+def selectEntries(index, pdbIds):
+    '''
+    Returns the index entries of a list of PDB IDs or keys. A PDB ID
+    selects all chains of the entry in archives of polymer chains
+
+    Attributes:
+        index (list): index entries (key, shard, offset, length)
+        pdbIds (list(str)): PDB IDs (e.g. 4HHB) or keys (e.g. 4HHB.A)
+    '''
+
+    pdbIds = set(pdbIds)
+    return [entry for entry in index
+            if entry[0] in pdbIds or entry[0].split('.')[0] in pdbIds]
+
+
+def readRecords(path, entries):
+    '''
+    Generator of the compressed MMTF records of the given index entries. Each
+    shard is memory mapped once for consecutive entries of the same shard
+
+    Attributes:
+        path (str): archive directory
+        entries (iterable): index entries (key, shard, offset, length)
+    Returns:
+        tuples of key and compressed MMTF bytes
+    '''
+
+    for shard, shardEntries in groupby(entries, key=lambda e: e[1]):
+        with open(os.path.join(path, shard), 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for key, _, offset, length in shardEntries:
+                yield key, m[offset:offset + length]
+
+
+def convertSequenceFile(inputPath, path, shardBytes=DEFAULT_SHARD_BYTES):
+    '''
+    Converts an MMTF Hadoop Sequence File into an archive
+
+    Attributes:
+        inputPath (str): path to an MMTF Hadoop Sequence File
+        path (str): archive directory
+        shardBytes (int): maximum size of a shard file in bytes
+    Returns:
+        list of index entries (key, shard, offset, length)
+    '''
+
+    records = ((key, value)
+               for part in hadoopSequenceFile.getPartFiles(inputPath)
+               for key, value, offset in hadoopSequenceFile.readRecords(part))
+
+    return writeArchive(records, path, shardBytes)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+'''
+mmtfCache.py: Persistent on-disk cache of downloaded MMTF files.
+
+Entries are stored as gzipped MMTF files named by PDB ID and an optional
+version (e.g. an ETag or release date), in subdirectories named by the
+middle two characters of the PDB ID. Files are written to a temporary file
+and renamed, so concurrent processes on a node never read partial entries.
+The default cache directory is $MMTF_CACHE_DIR, or mmtfPyspark in the
+user cache directory ($XDG_CACHE_HOME or ~/.cache), resolved on the node
+that uses it. Downloads only use the default cache without being asked to
+if $MMTF_CACHE_DIR is set (see mmtfDownloader). When the cache exceeds its
+size limit, the least recently used entries are removed until it is below
+a lower limit, so the cache directory is only scanned once in a while when
+the cache is full; file modification times record the last use.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import gzip
+import os
+import re
+import tempfile
+import threading
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+SUFFIX = ".mmtf.gz"
+# Fraction of the size limit the cache is reduced to by an eviction
+LOW_WATER = 0.9
+
+# Default caches of this process by directory, so their size estimates
+# are kept between downloads
+_defaultCaches = {}
+_defaultLock = threading.Lock()
+
+
+def getDefaultPath():
+    '''
+    Returns the default cache directory, $MMTF_CACHE_DIR or mmtfPyspark in
+    the user cache directory
+    '''
+
+    path = os.environ.get("MMTF_CACHE_DIR")
+    if not path:
+        cacheHome = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        path = os.path.join(cacheHome, "mmtfPyspark")
+    return path
+
+
+def getDefaultCache(baseUrl):
+    '''
+    Returns the default cache of the MMTF files of a server. Each server
+    has a subdirectory of the default cache directory, so full, reduced
+    and mirrored files are kept apart
+
+    Attributes:
+        baseUrl (str): URL prefix of MMTF files
+    '''
+
+    name = re.sub(r'[^A-Za-z0-9.-]+', '_', baseUrl.split("://")[-1]).strip('_')
+    path = os.path.join(getDefaultPath(), name)
+
+    with _defaultLock:
+        if path not in _defaultCaches:
+            _defaultCaches[path] = mmtfCache(path)
+        return _defaultCaches[path]
+
+
+class mmtfCache(object):
+    '''
+    Attributes:
+        path (str): cache directory, shared by all processes on a node.
+                    Defaults to the default cache directory (see
+                    getDefaultPath)
+        maxBytes (int): size limit of the cache in bytes
+    '''
+
+    def __init__(self, path=None, maxBytes=DEFAULT_MAX_BYTES):
+
+        self.path = getDefaultPath() if path is None else path
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Estimated cache size, None until the directory has been scanned
+        self._size = None
+
+
+    def __getstate__(self):
+        # Counters and the size estimate are per process
+        return {"path": self.path, "maxBytes": self.maxBytes}
+
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["maxBytes"])
+
+
+    def getFile(self, pdbId, version=None):
+        '''
+        Returns the path of the cache file of an entry
+
+        Attributes:
+            pdbId (str): PDB ID
+            version (str): optional version of the entry
+        '''
+
+        pdbId = pdbId.upper()
+        name = pdbId if version is None else f"{pdbId}.{version}"
+        return os.path.join(self.path, pdbId[1:3], name + SUFFIX)
+
+
+    def get(self, pdbId, version=None):
+        '''
+        Returns the gzipped MMTF file of an entry, or None if it is not
+        cached
+
+        Attributes:
+            pdbId (str): PDB ID
+            version (str): optional version of the entry
+        '''
+
+        path = self.getFile(pdbId, version)
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # Marks the entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+
+    def put(self, pdbId, data, version=None):
+        '''
+        Adds an entry and evicts least recently used entries if the cache
+        exceeds its size limit
+
+        Attributes:
+            pdbId (str): PDB ID
+            data (bytes): MMTF file, gzipped if not already compressed
+            version (str): optional version of the entry
+        '''
+
+        if data[:2] != b'\x1f\x8b':
+            data = gzip.compress(data)
+
+        path = self.getFile(pdbId, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+
+            # Size of an entry that is replaced
+            try:
+                oldSize = os.stat(path).st_size
+            except FileNotFoundError:
+                oldSize = 0
+
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - oldSize
+
+            if self._size is None or self._size > self.maxBytes:
+                self.evict()
+
+
+    def getEntries(self):
+        '''
+        Returns a list of (last use, size, path) of all cache files
+        '''
+
+        entries = []
+
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for f in filenames:
+                if f.endswith(SUFFIX):
+                    try:
+                        stat = os.stat(os.path.join(dirpath, f))
+                    except FileNotFoundError:
+                        # Evicted by another process
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(dirpath, f)))
+
+        return entries
+
+
+    def evict(self):
+        '''
+        Removes least recently used entries if the cache exceeds its size
+        limit, until the cache is within LOW_WATER times the size limit
+        '''
+
+        entries = sorted(self.getEntries())
+        size = sum(entry[1] for entry in entries)
+
+        if size <= self.maxBytes:
+            self._size = size
+            return
+
+        for mtime, fileSize, path in entries:
+            if size <= LOW_WATER * self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= fileSize
+
+        self._size = size
+
+
+    def clear(self):
+        '''
+        Removes all entries and resets the counters
+        '''
+
+        for mtime, size, path in self.getEntries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+
+    def getStatistics(self):
+        '''
+        Returns the number of hits and misses of this process
+        '''
+
+        return {"hits": self.hits, "misses": self.misses}
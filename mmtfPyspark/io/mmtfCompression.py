@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+'''
+mmtfCompression.py: Compression of MMTF records with gzip, or zstd and lz4
+if the zstandard and lz4 packages are installed.
+
+Compressed records are recognized by their magic bytes, so readers accept
+records of any supported compression without further configuration. Note
+that other MMTF tools only read uncompressed or gzipped MMTF records.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import gzip
+import io
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+LZ4_MAGIC = b'\x04\x22\x4d\x18'
+
+# Compression -> default level, file suffix
+COMPRESSIONS = {None: (None, ''),
+                'gzip': (6, '.gz'),
+                'zstd': (3, '.zst'),
+                'lz4': (0, '.lz4')}
+
+
+def isAvailable(compression):
+    '''
+    Returns true if a compression is supported in this environment
+
+    Attributes:
+        compression (str): None, 'gzip', 'zstd' or 'lz4'
+    '''
+
+    if compression == 'zstd':
+        return zstandard is not None
+    if compression == 'lz4':
+        return lz4 is not None
+    return compression in COMPRESSIONS
+
+
+def getSuffix(compression):
+    '''
+    Returns the file suffix of a compression, e.g. '.gz'
+    '''
+
+    return COMPRESSIONS[compression][1]
+
+
+def getCompression(data):
+    '''
+    Returns the compression of a record, or None if it is uncompressed
+
+    Attributes:
+        data (bytes): MMTF record
+    '''
+
+    if data[:2] == GZIP_MAGIC:
+        return 'gzip'
+    if data[:4] == ZSTD_MAGIC:
+        return 'zstd'
+    if data[:4] == LZ4_MAGIC:
+        return 'lz4'
+    return None
+
+
+def compress(data, compression='gzip', level=None):
+    '''
+    Compresses a record
+
+    Attributes:
+        data (bytes): uncompressed MMTF record
+        compression (str): None, 'gzip', 'zstd' or 'lz4'
+        level (int): compression level, the default of the compression if
+                     None
+    '''
+
+    if compression not in COMPRESSIONS:
+        raise Exception(f"unknown compression {compression}, use one of {list(COMPRESSIONS)}")
+
+    if not isAvailable(compression):
+        raise Exception(f"{compression} compression requires the "
+                        f"{'zstandard' if compression == 'zstd' else 'lz4'} package")
+
+    if level is None:
+        level = COMPRESSIONS[compression][0]
+
+    if compression == 'gzip':
+        # mtime 0 makes the output deterministic. gzip.compress only
+        # takes an mtime from Python 3.8
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=level, mtime=0) as f:
+            f.write(data)
+        return buffer.getvalue()
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if compression == 'lz4':
+        return lz4.frame.compress(data, compression_level=level)
+    return bytes(data)
+
+
+def decompress(data):
+    '''
+    Decompresses a record of any supported compression. Uncompressed
+    records are returned unchanged
+
+    Attributes:
+        data (bytes): MMTF record
+    '''
+
+    compression = getCompression(data)
+
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if compression is None:
+        return data
+
+    if not isAvailable(compression):
+        raise Exception(f"reading {compression} compressed records requires the "
+                        f"{'zstandard' if compression == 'zstd' else 'lz4'} package")
+
+    if compression == 'zstd':
+        # Streaming decompression, frames may not store the content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return lz4.frame.decompress(data)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+'''
+mmtfDownloader.py: Concurrent download of MMTF files from the MMTF web
+services, or any server that returns the MMTF file of an entry at
+<base url><PDB ID>.
+
+Each call to download uses a bounded thread pool and a single HTTP session,
+so connections are kept alive and reused. Only a bounded number of entries
+is submitted at a time, and entries are returned as they complete. Failed requests are retried with
+exponential backoff, and entries that cannot be downloaded are reported
+with their error instead of raising. If a cache (see mmtfCache) is given,
+or $MMTF_CACHE_DIR is set on the node that downloads, cached entries are
+not downloaded and downloaded entries are cached.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import os
+import time
+import msgpack
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pyspark.accumulators import AccumulatorParam
+from mmtfPyspark.io import mmtfCompression
+from mmtfPyspark.io.mmtfCache import getDefaultCache
+
+BASE_URL = "https://mmtf.rcsb.org/v1.0/full/"
+BASE_URL_REDUCED = "https://mmtf.rcsb.org/v1.0/reduced/"
+
+# Status codes of transient server errors, which are retried
+RETRY_STATUS = frozenset([429, 500, 502, 503, 504])
+
+# Entries submitted at a time per thread. Bounds the downloads held in
+# memory until they are consumed
+QUEUE_FACTOR = 4
+
+
+class mmtfDownloader(object):
+    '''
+    Attributes:
+        baseUrl (str): URL prefix of MMTF files, the full MMTF web service
+                       by default
+        numThreads (int): maximum number of concurrent requests per call
+                          to download
+        retries (int): number of retries of a failed request
+        backoff (float): delay before the first retry in seconds, doubled
+                         for each further retry
+        timeout (float): connect and read timeout of a request in seconds
+        cache (mmtfCache): on-disk cache of MMTF files. True for the
+                           default cache of baseUrl on the node that
+                           downloads, False to download every entry. If
+                           None, the default cache is only used if
+                           $MMTF_CACHE_DIR is set
+    '''
+
+    def __init__(self, baseUrl=BASE_URL, numThreads=8, retries=3, backoff=0.5, timeout=30, cache=None):
+
+        self.baseUrl = baseUrl
+        self.numThreads = numThreads
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+
+
+    def getCache(self):
+        '''
+        Returns the cache of this downloader, or None if entries are not
+        cached
+        '''
+
+        if self.cache is None:
+            useDefault = bool(os.environ.get("MMTF_CACHE_DIR"))
+        else:
+            useDefault = self.cache is True
+
+        if useDefault:
+            return getDefaultCache(self.baseUrl)
+        return self.cache or None
+
+
+    def createSession(self):
+        '''
+        Returns an HTTP session with a connection pool for all threads
+        '''
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.numThreads)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
+    def fetch(self, pdbId, session):
+        '''
+        Downloads the MMTF file of an entry, retrying transient failures
+
+        Attributes:
+            pdbId (str): PDB ID
+            session (requests.Session): HTTP session
+        Returns:
+            MMTF file as returned by the server, gzipped if the server
+            compressed it
+        '''
+
+        url = self.baseUrl + pdbId
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = session.get(url, timeout=self.timeout, stream=True,
+                                       headers={'Accept-Encoding': 'gzip'})
+                with response:
+                    if response.status_code == 200:
+                        # Keep gzip content encoding, it is decompressed on decoding
+                        return response.raw.read(decode_content=False)
+                    if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                        response.raise_for_status()
+                        raise Exception(f"unexpected status {response.status_code} for {url}")
+
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+
+            time.sleep(self.backoff * 2 ** attempt)
+
+
+    def download(self, pdbIds):
+        '''
+        Generator of downloaded entries, in the order they complete. At most
+        numThreads * QUEUE_FACTOR entries are submitted at a time, so the
+        memory used does not grow with the number of entries and a slow
+        entry does not hold back the others
+
+        Attributes:
+            pdbIds (iterable): PDB IDs
+        Returns:
+            tuples of PDB ID, MMTF file (or None) and error message (or None)
+        '''
+
+        cache = self.getCache()
+
+        def task(pdbId):
+            try:
+                if cache is not None:
+                    data = cache.get(pdbId)
+                    if data is not None:
+                        return pdbId, data, None
+
+                data = self.fetch(pdbId, session)
+
+                if cache is not None:
+                    cache.put(pdbId, data)
+                return pdbId, data, None
+            except Exception as e:
+                return pdbId, None, str(e)
+
+        with self.createSession() as session, \
+                ThreadPoolExecutor(max_workers=self.numThreads) as executor:
+            pending = set()
+
+            for pdbId in pdbIds:
+                if len(pending) >= self.numThreads * QUEUE_FACTOR:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+                pending.add(executor.submit(task, pdbId))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+def unpack(data):
+    '''
+    Unpacks an optionally compressed MMTF file into msgpack data
+
+    Attributes:
+        data (bytes): MMTF file
+    '''
+
+    return msgpack.unpackb(mmtfCompression.decompress(data), raw=True)
+
+
+class listAccumulatorParam(AccumulatorParam):
+    '''
+    Spark accumulator of lists, used to collect download failures as
+    (PDB ID, error message) tuples
+    '''
+
+    def zero(self, value):
+        return []
+
+
+    def addInPlace(self, value1, value2):
+        value1.extend(value2)
+        return value1
@@ -2,6 +2,11 @@
 '''
 mmtfStructure.py: Decode msgpack unpacked data to mmtf structure
 
+Fields are either decoded eagerly when the structure is created, or, in lazy
+mode, kept as raw msgpack buffers and decoded on first access. Chain ids,
+chain names, insertion codes and alternative locations are held as fixed
+width numpy byte arrays and only converted to strings on access.
+
 Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
     __maintainer__ = "Mars (Shih-Cheng) Huang"
@@ -10,136 +15,406 @@ Authorship information:
 '''
 
 import numpy as np
+import copyreg
+import msgpack
 import time
 import struct
 from mmtf.utils import decoder_utils
-from mmtfPyspark.utils import mmtfDecoder
+from mmtfPyspark.utils import mmtfDecoder, mmtfCodec
+from mmtfPyspark.utils.columnarStructure import ColumnarStructure
+
+# Marks fields that are guaranteed to be present in an mmtf file
+_REQUIRED = object()
+
+
+def _decode_string(data):
+    return data.decode()
+
+
+class stringArray(object):
+    '''Read-only list of strings backed by a fixed width numpy byte array
+    ('S1' for one-character codes, 'S4' for chain ids and names). Items
+    are converted to str on access; one-character codes keep the null
+    character '\\x00' used by MMTF for missing values.
+
+    Attributes:
+        array (ndarray): numpy array of dtype 'S<n>'
+    '''
+
+    __slots__ = ('array',)
+
+    def __init__(self, array):
+        self.array = array
+
+
+    def __len__(self):
+        return len(self.array)
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return stringArray(self.array[index])
+
+        if self.array.dtype.itemsize == 1:
+            return chr(self.array.view(np.uint8)[index])
+
+        return self.array[index].decode()
+
+
+    def __iter__(self):
+        if self.array.dtype.itemsize == 1:
+            return map(chr, self.array.view(np.uint8).tolist())
+
+        return (x.decode() for x in self.array.tolist())
+
+
+    def __eq__(self, other):
+        if isinstance(other, (stringArray, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+
+    __hash__ = None
+
+
+    def __repr__(self):
+        return f"stringArray({self.tolist()})"
+
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
+
+    def __reduce__(self):
+        return (stringArray, (self.array,))
+
+
+    def tolist(self):
+        '''Returns the strings as a list'''
+        return list(self)
+
+
+def _read_only(value):
+    # Marks the arrays of a decoded field as read-only
+    if isinstance(value, stringArray):
+        value = value.array
+    elif isinstance(value, tuple):
+        # Fixed point values and divisor
+        value = value[0]
+    value.setflags(write=False)
+
+
+def _decode_string_array(data):
+    return stringArray(mmtfCodec.decode_array(data))
+
+
+# Attribute name -> (mmtf key, decode function, value if key is missing)
+_FIELDS = {
+    'b_factor_list': (b'bFactorList', mmtfCodec.decode_array, []),
+    'resolution': (b'resolution', None, None),
+    'r_free': (b'rFree', None, None),
+    'r_work': (b'rWork', None, None),
+    'bio_assembly': (b'bioAssemblyList', None, []),
+    'unit_cell': (b'unitCell', None, None),
+    'release_date': (b'releaseDate', _decode_string, None),
+    'deposition_date': (b'depositionDate', _decode_string, None),
+    'title': (b'title', _decode_string, None),
+    'mmtf_version': (b'mmtfVersion', _decode_string, None),
+    'mmtf_producer': (b'mmtfProducer', _decode_string, None),
+    'structure_id': (b'structureId', _decode_string, None),
+    'space_group': (b'spaceGroup', None, None),
+    'bond_atom_list': (b'bondAtomList', mmtfCodec.decode_array, None),
+    'bond_order_list': (b'bondOrderList', mmtfCodec.decode_array, None),
+    'sec_struct_list': (b'secStructList', mmtfCodec.decode_array, []),
+    'ins_code_list': (b'insCodeList', _decode_string_array, []),
+    'atom_id_list': (b'atomIdList', mmtfCodec.decode_array, []),
+    'sequence_index_list': (b'sequenceIndexList', mmtfCodec.decode_array, []),
+    'occupancy_list': (b'occupancyList', mmtfCodec.decode_array, []),
+    'entity_list': (b'entityList', mmtfDecoder.decode_entity_list, []),
+    'chain_name_list': (b'chainNameList', _decode_string_array, []),
+    'experimental_methods': (b'experimentalMethods', None, None),
+    'num_bonds': (b'numBonds', None, _REQUIRED),
+    'num_chains': (b'numChains', None, _REQUIRED),
+    'num_models': (b'numModels', None, _REQUIRED),
+    'num_atoms': (b'numAtoms', None, _REQUIRED),
+    'num_groups': (b'numGroups', None, _REQUIRED),
+    'chains_per_model': (b'chainsPerModel', None, _REQUIRED),
+    'groups_per_chain': (b'groupsPerChain', None, _REQUIRED),
+    'group_id_list': (b'groupIdList', mmtfCodec.decode_array, _REQUIRED),
+    'group_type_list': (b'groupTypeList', mmtfCodec.decode_array, _REQUIRED),
+    'chain_id_list': (b'chainIdList', _decode_string_array, _REQUIRED),
+    'group_list': (b'groupList', mmtfDecoder.decode_group_list, _REQUIRED),
+    'x_coord_list': (b'xCoordList', mmtfCodec.decode_array, _REQUIRED),
+    'y_coord_list': (b'yCoordList', mmtfCodec.decode_array, _REQUIRED),
+    'z_coord_list': (b'zCoordList', mmtfCodec.decode_array, _REQUIRED),
+    'alt_loc_list': (b'altLocList', _decode_string_array, _REQUIRED),
+}
+
+# MMTF key name -> attribute name
+_FIELD_NAMES = {key.decode(): name for name, (key, _, _) in _FIELDS.items()}
+
+# Fields affected by the coordinate storage type
+_COORD_FIELDS = frozenset(['x_coord_list', 'y_coord_list', 'z_coord_list', 'b_factor_list'])
+
+# Fields stored as binary encoded arrays, which can be written unchanged
+_BINARY_FIELDS = frozenset(name for name, (key, decode, default) in _FIELDS.items()
+                           if decode in (mmtfCodec.decode_array, _decode_string_array))
+
+COORD_TYPES = ('float64', 'float32', 'int32')
+
+# 'columns' pickles the decoded arrays, 'mmtf' pickles the MMTF encoded
+# structure, which is decoded lazily when it is unpickled
+SERIALIZATION_FORMS = ('columns', 'mmtf')
 
 
 class mmtfStructure(object):
-    model_counter = 0
-    chain_counter = 0
-    group_counter = 0
-    atom_counter = 0
+    '''
+    Attributes:
+        input_data (dict): msgpack unpacked mmtf data
+        lazy (bool): if true, fields are only decoded on first access
+        fields (list(str)): MMTF fields to keep, e.g. ["resolution", "entityList"].
+                            All fields are kept if None
+        coord_type (str): storage of coordinates and B-factors, either
+                          'float64', 'float32' or 'int32'. With 'int32' the
+                          fixed point values and their divisor are kept and
+                          converted to floats on first access
+        keep_encoded (bool): if true, keep the encoded data of decoded
+                             binary array fields, so unmodified fields are
+                             written without re-encoding. Defaults to lazy,
+                             so eagerly decoded structures are always
+                             re-encoded when written
 
-    def __init__(self, input_data):
+    Structures are pickled as their decoded columns, with groups shipped as
+    msgpack bytes that resolve to shared group dictionaries in the receiving
+    process. set_serialization('mmtf') ships the MMTF encoded structure
+    instead.
+
+    Fields are treated as modified when their attribute is assigned a new
+    value. The arrays of fields whose encoded data is kept are read-only,
+    so they can't be modified in place and written with stale data. Assign
+    a modified copy instead, e.g. s.x_coord_list = s.x_coord_list + 1.0
+    '''
+
+    # Fields stay unset until they are decoded
+    __slots__ = tuple(_FIELDS) + ('_input_data', '_fields', '_fixed_point', '_encoded', '_columnar',
+                                  'coord_type', 'alt_loc_set', '_serialization', 'model_counter',
+                                  'chain_counter', 'group_counter', 'atom_counter')
+
+    def __init__(self, input_data, lazy=False, fields=None, coord_type='float64', keep_encoded=None):
         """
         Decodes a msgpack unpacked data to mmtf structure
         """
 
-        # Variables that are not in all mmtf files
-        if b"bFactorList" in input_data:
-            int_array = np.frombuffer(input_data[b'bFactorList'][12:],'>i2')
-            decode_num = np.frombuffer(input_data[b'bFactorList'][8:12],'>i')
-            self.b_factor_list = mmtfDecoder.recursive_index_decode(int_array, decode_num)
-        else:
-            self.b_factor_list = []
-        if b'resolution' in input_data:
-            self.resolution = input_data[b'resolution']
-        else:
-            self.resolution = None
-        if b"rFree" in input_data:
-            self.r_free = input_data[b"rFree"]
-        else:
-            self.r_free = None
-        if b"rWork" in input_data:
-            self.r_work = input_data[b"rWork"]
-        else:
-            self.r_work = None
-        if b"bioAssemblyList" in input_data:
-            self.bio_assembly = input_data[b"bioAssemblyList"]
-        else:
-            self.bio_assembly = []
-        if b"unitCell" in input_data:
-            self.unit_cell = input_data[b"unitCell"]
-        else:
-            self.unit_cell = None
-        if b"releaseDate" in input_data:
-            self.release_date = input_data[b"releaseDate"].decode()
-        else:
-            self.release_date = None
-        if b"depositionDate" in input_data:
-            self.deposition_date = input_data[b"depositionDate"].decode()
-        else:
-            self.deposition_date = None
-        if b"title" in input_data:
-            self.title = input_data[b"title"].decode()
-        else:
-            self.title = None
-        if b"mmtfVersion" in input_data:
-            self.mmtf_version = input_data[b"mmtfVersion"].decode()
-        else:
-            self.mmtf_version = None
-        if b"mmtfProducer" in input_data:
-            self.mmtf_producer = input_data[b"mmtfProducer"].decode()
-        else:
-            self.mmtf_producer = None
-        if b"structureId" in input_data:
-            self.structure_id = input_data[b"structureId"].decode()
-        else:
-            self.structure_id = None
-        if b"spaceGroup" in input_data:
-            self.space_group = input_data[b"spaceGroup"]
-        else:
-            self.space_group = None
-        if b"bondAtomList" in input_data:
-            self.bond_atom_list = np.frombuffer(input_data[b"bondAtomList"][12:],'>i4')
-        else:
-            self.bond_atom_list = None
-        if b"bondOrderList" in input_data:
-            self.bond_order_list = np.frombuffer(input_data[b"bondOrderList"][12:],'>i1')
-        else:
-            self.bond_order_list = None
-        if b"secStructList" in input_data:
-            self.sec_struct_list = np.frombuffer(input_data[b"secStructList"][12:],'>i1')
-        else:
-            self.sec_struct_list = []
-        if b"insCodeList" in input_data:
-            self.ins_code_list = [chr(x) for x in mmtfDecoder.run_length_decoder_numpy(np.frombuffer(input_data[b"insCodeList"][12:],">i4")).astype(np.int16)]
-        else:
-            self.ins_code_list = []
-        if b"atomIdList" in input_data:
-            self.atom_id_list = np.cumsum(mmtfDecoder.run_length_decoder_numpy(np.frombuffer(input_data[b'atomIdList'][12:],'>i4')).astype(np.int16))
-        else:
-            self.atom_id_list = []
-        if b"sequenceIndexList" in input_data:
-            self.sequence_index_list = np.cumsum(mmtfDecoder.run_length_decoder_numpy(np.frombuffer(input_data[b'sequenceIndexList'][12:],'>i4')).astype(np.int16))
-        else:
-            self.sequence_index_list = []
-        if b"occupancyList" in input_data:
-            self.occupancy_list = mmtfDecoder.run_length_decoder_numpy(np.frombuffer(input_data[b"occupancyList"][12:],">i4")) /100
-        else:
-            self.occupancy_list = []
-        if b"entityList" in input_data:
-            self.entity_list = mmtfDecoder.decode_entity_list(input_data[b"entityList"])
-        else:
-            self.entity_list = []
-        if b"chainNameList" in input_data:
-            self.chain_name_list = [chr(a) for a in input_data[b"chainNameList"][12:][::4]]
-        else:
-            self.chain_name_list = []
-        if b"experimentalMethods" in input_data:
-            self.experimental_methods = input_data[b"experimentalMethods"]
+        if coord_type not in COORD_TYPES:
+            raise Exception(f"coord_type must be one of {COORD_TYPES}")
+
+        self.coord_type = coord_type
+        self._fixed_point = {}
+        # Field name -> (encoded data, decoded value) of decoded fields
+        self._encoded = {} if (lazy if keep_encoded is None else keep_encoded) else None
+
+        if fields is None:
+            self._fields = None
+            names = _FIELDS
+            # Keep a private copy, decoded entries are dropped from it
+            self._input_data = dict(input_data)
         else:
-            self.experimental_methods = None
-
-        # Variables gaurenteed in mmtf files
-        self.num_bonds = input_data[b"numBonds"]
-        self.num_chains = input_data[b"numChains"]
-        self.num_models = input_data[b"numModels"]
-        self.num_atoms = input_data[b"numAtoms"]
-        self.num_groups = input_data[b"numGroups"]
-        self.chains_per_model = input_data[b"chainsPerModel"]
-        self.groups_per_chain = input_data[b"groupsPerChain"]
-        self.group_id_list = np.cumsum(mmtfDecoder.run_length_decoder_numpy(np.frombuffer(input_data[b'groupIdList'][12:],'>i4'))).astype(np.int32)
-        self.group_type_list = np.frombuffer(input_data[b'groupTypeList'][12:],'>i4')
-        self.chain_id_list = [chr(a) for a in input_data[b"chainIdList"][12:][::4]]
-        self.group_list = mmtfDecoder.decode_group_list(input_data[b'groupList'])
-        self.x_coord_list = mmtfDecoder.recursive_index_decode(np.frombuffer(input_data[b'xCoordList'][12:],'>i2'),np.frombuffer(input_data[b'xCoordList'][8:12],'>i'))
-        self.y_coord_list = mmtfDecoder.recursive_index_decode(np.frombuffer(input_data[b'yCoordList'][12:],'>i2'),np.frombuffer(input_data[b'yCoordList'][8:12],'>i'))
-        self.z_coord_list = mmtfDecoder.recursive_index_decode(np.frombuffer(input_data[b'zCoordList'][12:],'>i2'),np.frombuffer(input_data[b'xCoordList'][8:12],'>i'))
-        self.alt_loc_list = input_data[b'altLocList'][12:]
+            for field in fields:
+                if field not in _FIELD_NAMES:
+                    raise Exception(f"Unknown MMTF field: {field}")
+
+            self._fields = frozenset(_FIELD_NAMES[field] for field in fields)
+            names = self._fields
+            keys = [_FIELDS[name][0] for name in names]
+            self._input_data = {key: input_data[key] for key in keys if key in input_data}
+
         self.alt_loc_set = False
+        self._columnar = None
+        self._serialization = 'columns'
+        self.model_counter = 0
+        self.chain_counter = 0
+        self.group_counter = 0
+        self.atom_counter = 0
+
+        if not lazy:
+            for name in names:
+                self._decode_field(name)
+            self._input_data = None
+
+
+    def __getattr__(self, name):
+        '''Decodes a field on first access and memoizes the result
+        '''
+        # Only called for unset slots, other attributes are always set
+        if name not in _FIELDS:
+            raise AttributeError(f"'mmtfStructure' object has no attribute '{name}'")
+
+        if self._fields is not None and name not in self._fields:
+            raise AttributeError(f"'{_FIELDS[name][0].decode()}' is not in the fields projection")
+
+        if name in self._fixed_point:
+            int_array, divisor = self._fixed_point[name]
+            value = int_array / divisor
+            setattr(self, name, value)
+            if self._encoded is not None and name in self._encoded:
+                value.setflags(write=False)
+                self._encoded[name] = (self._encoded[name][0], value)
+            return value
+
+        if self._input_data is None:
+            raise AttributeError(f"'mmtfStructure' object has no attribute '{name}'")
+
+        self._decode_field(name)
+        return getattr(self, name)
+
+
+    def __reduce__(self):
+        if self._serialization == 'mmtf':
+            return (_from_mmtf, (self.to_mmtf(), self._fields, self.coord_type))
+
+        return (copyreg.__newobj__, (mmtfStructure,), self.__getstate__())
+
+
+    def __getstate__(self):
+        # Values of the set slots. Floats converted from fixed point values
+        # are not pickled, groups are replaced by their msgpack bytes
+        state = {}
+        for name in self.__slots__:
+            try:
+                state[name] = _SLOTS[name].__get__(self)
+            except AttributeError:
+                pass
+
+        for name in state.get('_fixed_point', ()):
+            state.pop(name, None)
+
+        # Encoded data is not shipped, it would double the pickled size
+        if state.get('_encoded') is not None:
+            state['_encoded'] = {}
+
+        # Columnar views are rebuilt on demand by the receiver
+        state.pop('_columnar', None)
+
+        if state.get('group_list') is not None:
+            state['group_list'] = [mmtfDecoder.pack_group(group) for group in state['group_list']]
+        return state
+
+
+    def __setstate__(self, state):
+        if state.get('group_list') is not None:
+            state['group_list'] = [mmtfDecoder.unpack_group(group) for group in state['group_list']]
+
+        self._encoded = None
+        self._columnar = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+    def set_serialization(self, form):
+        '''Sets how the structure is pickled, e.g. between Spark stages
+
+        Attributes:
+            form (str): 'columns' (default) pickles the decoded arrays,
+                        'mmtf' pickles the MMTF encoded structure, which is
+                        decoded lazily by the receiver. Coordinates are
+                        then rounded to the precision of the MMTF codecs
+        '''
+        if form not in SERIALIZATION_FORMS:
+            raise Exception(f"serialization form must be one of {SERIALIZATION_FORMS}")
+
+        self._serialization = form
+        return self
+
+
+    def get_encoded_fields(self):
+        '''Returns the data of fields as read, for fields that were not
+        decoded and binary array fields that were not modified since they
+        were decoded, as a dictionary of MMTF key -> msgpack unpacked data.
+        Strings in the data are bytes
+        '''
+        encoded = dict(self._input_data) if self._input_data is not None else {}
+
+        if self._encoded:
+            for name, (data, value) in self._encoded.items():
+                try:
+                    current = _SLOTS[name].__get__(self)
+                except AttributeError:
+                    # Fixed point values, not yet converted to floats
+                    current = self._fixed_point.get(name)
+
+                if current is value:
+                    encoded[_FIELDS[name][0]] = data
+
+        return encoded
+
+
+    def get_columnar_structure(self, first_model_only=True):
+        '''Returns the columnar view of the structure (see
+        utils.ColumnarStructure), which is created once per structure, so
+        filters and mappers applied to the same structure share its atom
+        columns. The view is not pickled
+
+        Attributes:
+            first_model_only (bool): view of the first model only if true
+        '''
+        if self._columnar is None:
+            self._columnar = {}
+
+        if first_model_only not in self._columnar:
+            self._columnar[first_model_only] = ColumnarStructure(self, first_model_only)
+
+        return self._columnar[first_model_only]
+
+
+    def to_mmtf(self):
+        '''Returns the MMTF encoded structure as msgpack bytes. Fields
+        outside of the fields projection are omitted
+        '''
+        from mmtfPyspark.io.MmtfWriter import packData
+
+        return packData(self)
+
+
+    def _decode_field(self, name):
+        '''Decodes the raw entry of a field and sets the attribute, or the
+        fixed point values for coordinates stored as 'int32'
+        '''
+        key, decode, default = _FIELDS[name]
+
+        if key not in self._input_data:
+            if default is _REQUIRED:
+                raise KeyError(key)
+            setattr(self, name, default)
+            return
+
+        data = self._input_data.pop(key)
+
+        if name in _COORD_FIELDS and self.coord_type == 'int32':
+            value = mmtfCodec.decode_fixed_point(data)
+            self._fixed_point[name] = value
+        elif name in _COORD_FIELDS and self.coord_type == 'float32':
+            value = mmtfCodec.decode_array(data, np.float32)
+            setattr(self, name, value)
+        else:
+            value = decode(data) if decode is not None else data
+            setattr(self, name, value)
+
+        if self._encoded is not None and name in _BINARY_FIELDS and isinstance(data, bytes):
+            _read_only(value)
+            self._encoded[name] = (data, value)
+
+
+    def get_fixed_point(self, name):
+        '''Returns the int32 fixed point values and divisor of a coordinate
+        field for structures decoded with coord_type 'int32'
+
+        Attributes:
+            name (str): attribute name, e.g. 'x_coord_list'
+        '''
+        if name not in self._fixed_point and self._input_data is not None:
+            self._decode_field(name)
+
+        return self._fixed_point[name]
 
 
     def pass_data_on(self, data_setters):
@@ -162,9 +437,55 @@ class mmtfStructure(object):
 
     def set_alt_loc_list(self):
         """
-        Set the alternative location list for structure
+        Set the alternative location list for structure. Alternative
+        locations are decoded with the other fields, this only marks
+        them as set and is kept for compatibility
         """
-        #TODO: set inputdata first
-        self.alt_loc_list = [chr(x) for x in mmtfDecoder.run_length_decoder_numpy(np.frombuffer(self.alt_loc_list,">i4")).astype(np.int16)]
         self.alt_loc_set = True
         return self
+
+
+def from_fields(values, fields=None, coord_type='float64'):
+    '''Returns a structure of decoded field values, e.g. of a parser. The
+    values must have the types of decoded MMTF fields
+
+    Attributes:
+        values (dict): attribute name -> decoded value, e.g. 'x_coord_list'.
+                       Missing fields are set to their default value
+        fields (list(str)): MMTF fields to keep, all if None
+        coord_type (str): storage of coordinates and B-factors, either
+                          'float64', 'float32' or 'int32'
+    '''
+    structure = mmtfStructure({}, lazy=True, fields=fields, coord_type=coord_type, keep_encoded=False)
+
+    for name in structure._fields if structure._fields is not None else _FIELDS:
+        key, decode, default = _FIELDS[name]
+
+        if name not in values:
+            if default is _REQUIRED:
+                raise KeyError(key)
+            setattr(structure, name, default)
+        elif name in _COORD_FIELDS and coord_type == 'int32':
+            divisor = mmtfCodec.DEFAULT_CODECS[key.decode()][1]
+            structure._fixed_point[name] = (np.rint(np.asarray(values[name]) * divisor).astype(np.int32), divisor)
+        elif name in _COORD_FIELDS and coord_type == 'float32':
+            setattr(structure, name, np.asarray(values[name], dtype=np.float32))
+        else:
+            setattr(structure, name, values[name])
+
+    structure._input_data = None
+    return structure
+
+
+def _from_mmtf(data, fields, coord_type):
+    # Unpickles a structure serialized in the 'mmtf' form
+    if fields is not None:
+        fields = [_FIELDS[name][0].decode() for name in fields]
+
+    structure = mmtfStructure(msgpack.unpackb(data, raw=True), lazy=True,
+                              fields=fields, coord_type=coord_type)
+    return structure.set_serialization('mmtf')
+
+
+# Slot descriptors, used to read slots without triggering lazy decoding
+_SLOTS = {name: getattr(mmtfStructure, name) for name in mmtfStructure.__slots__}
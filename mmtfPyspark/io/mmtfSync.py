@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+'''
+mmtfSync.py: Incremental updates of a local MMTF archive from lists of
+added, modified and removed entries, e.g. the weekly PDB updates.
+
+A synchronized archive is a directory of generations, each a complete
+indexed archive (see mmtfArchive), and a CURRENT file with the name of the
+current generation:
+
+    CURRENT
+    generation-00000/
+    generation-00001/
+
+An update downloads only the added and modified entries and writes them to
+new shards of the next generation. Shards of the previous generation are
+hard linked into the new generation, so unchanged shards are not rewritten.
+Shards with less than minLiveFraction of their bytes in use after the update
+are merged into the new shards. The new generation only becomes current
+once it is complete, and previous generations are kept for rollback until
+they are pruned.
+
+The current generation is read with
+MmtfReader.readArchive(mmtfSync.getCurrent(path), sc)
+
+Usage:
+    python -m mmtfPyspark.io.mmtfSync -p <archive> -i <sequence_file>
+    python -m mmtfPyspark.io.mmtfSync -p <archive> -m <manifest> -b <base_url>
+    python -m mmtfPyspark.io.mmtfSync -p <archive> -r
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import sys
+import getopt
+import os
+import re
+import shutil
+from itertools import chain
+from mmtfPyspark.io import mmtfArchive, mmtfCompression
+from mmtfPyspark.io.mmtfDownloader import mmtfDownloader, unpack, BASE_URL
+
+CURRENT_FILE = "CURRENT"
+GENERATION_FORMAT = "generation-{:05d}"
+GENERATION_PATTERN = re.compile(r"^generation-(\d{5})$")
+# Shards written by a generation, given the generation and shard number
+SHARD_FORMAT = "shard-{:05d}-{{:05d}}.mmtf"
+DEFAULT_MIN_LIVE_FRACTION = 0.5
+
+# Manifest actions, including the names of the wwPDB status files
+ACTIONS = {'added': 'added', 'modified': 'modified', 'removed': 'removed',
+           'obsolete': 'removed'}
+
+
+def listGenerations(path):
+    '''
+    Returns the sorted names of the generations of a synchronized archive
+
+    Attributes:
+        path (str): synchronized archive directory
+    '''
+
+    if not os.path.isdir(path):
+        return []
+
+    return sorted(name for name in os.listdir(path)
+                  if GENERATION_PATTERN.match(name) and os.path.isdir(os.path.join(path, name)))
+
+
+def getCurrent(path):
+    '''
+    Returns the path of the current generation of a synchronized archive
+
+    Attributes:
+        path (str): synchronized archive directory
+    '''
+
+    currentPath = os.path.join(path, CURRENT_FILE)
+
+    if not os.path.exists(currentPath):
+        raise Exception(f"{path} is not a synchronized archive, create it with mmtfSync.initialize")
+
+    with open(currentPath) as f:
+        return os.path.join(path, f.read().strip())
+
+
+def setCurrent(path, generation):
+    '''
+    Atomically makes a generation the current generation
+
+    Attributes:
+        path (str): synchronized archive directory
+        generation (str): generation name, e.g. generation-00001
+    '''
+
+    if generation not in listGenerations(path):
+        raise Exception(f"unknown generation {generation}")
+
+    tmp = os.path.join(path, CURRENT_FILE + ".tmp")
+
+    with open(tmp, 'w') as f:
+        f.write(generation + "\n")
+
+    os.replace(tmp, os.path.join(path, CURRENT_FILE))
+
+
+def initialize(path, inputPath, shardBytes=mmtfArchive.DEFAULT_SHARD_BYTES):
+    '''
+    Creates the first generation of a synchronized archive from an MMTF
+    Hadoop Sequence File, or from an archive, whose shards are linked
+
+    Attributes:
+        path (str): new synchronized archive directory
+        inputPath (str): MMTF Hadoop Sequence File or archive directory
+        shardBytes (int): maximum size of a shard file in bytes
+    Returns:
+        list of index entries (key, shard, offset, length)
+    '''
+
+    if listGenerations(path):
+        raise Exception(f"{path} already contains generations")
+
+    generation = GENERATION_FORMAT.format(0)
+    generationPath = os.path.join(path, generation)
+
+    try:
+        if os.path.exists(os.path.join(inputPath, mmtfArchive.INDEX_FILE)):
+            index = mmtfArchive.readIndex(inputPath)
+            os.makedirs(generationPath)
+            for shard in sorted(set(entry[1] for entry in index)):
+                _linkShard(os.path.join(inputPath, shard), os.path.join(generationPath, shard))
+            mmtfArchive.writeIndex(index, generationPath)
+        else:
+            index = mmtfArchive.convertSequenceFile(inputPath, generationPath, shardBytes)
+    except BaseException:
+        shutil.rmtree(generationPath, ignore_errors=True)
+        raise
+
+    setCurrent(path, generation)
+    return index
+
+
+def readManifest(path):
+    '''
+    Reads the added, modified and removed entries of an update. The
+    manifest is either a directory of the wwPDB weekly status files
+    added.pdb, modified.pdb and obsolete.pdb with one PDB ID per line, or a
+    file with one action (added, modified, removed or obsolete) and PDB ID
+    per line. Empty lines and lines starting with # are ignored
+
+    Attributes:
+        path (str): manifest directory or file
+    Returns:
+        dictionary of action -> list of PDB IDs
+    '''
+
+    manifest = {'added': [], 'modified': [], 'removed': []}
+
+    if os.path.isdir(path):
+        for name, action in ACTIONS.items():
+            statusFile = os.path.join(path, name + ".pdb")
+            if os.path.exists(statusFile):
+                with open(statusFile) as f:
+                    manifest[action] += [line.strip().upper() for line in f
+                                         if line.strip() and not line.startswith('#')]
+        return manifest
+
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip() or line.startswith('#'):
+                continue
+
+            fields = line.split()
+            if len(fields) != 2 or fields[0].lower() not in ACTIONS:
+                raise Exception(f"invalid manifest line {number}: {line.strip()}")
+
+            manifest[ACTIONS[fields[0].lower()]].append(fields[1].upper())
+
+    return manifest
+
+
+def update(path, added=(), modified=(), removed=(), baseUrl=BASE_URL, numThreads=8, retries=3,
+           shardBytes=mmtfArchive.DEFAULT_SHARD_BYTES, minLiveFraction=DEFAULT_MIN_LIVE_FRACTION,
+           compression='gzip', level=None):
+    '''
+    Creates and activates the next generation of a synchronized archive.
+    Added and modified entries are downloaded first, and no generation is
+    created if any download fails
+
+    Attributes:
+        path (str): synchronized archive directory
+        added (list(str)): PDB IDs of new entries
+        modified (list(str)): PDB IDs of revised entries
+        removed (list(str)): PDB IDs of obsoleted entries
+        baseUrl (str): URL prefix of MMTF files, e.g. a local mirror
+        numThreads (int): maximum number of concurrent downloads
+        retries (int): number of retries of a failed download
+        shardBytes (int): maximum size of a new shard file in bytes
+        minLiveFraction (float): shards with a smaller fraction of bytes
+                                 in use are merged into new shards
+        compression (str): compression of the records of new shards, 'gzip',
+                           'zstd' or 'lz4' (see mmtfCompression). Merged
+                           and downloaded records with another compression
+                           are recompressed
+        level (int): compression level, the default of the compression if
+                     None
+    Returns:
+        dictionary with the new generation name and the number of added,
+        modified and removed entries, and of linked, merged and written
+        shards
+    '''
+
+    current = getCurrent(path)
+    index = mmtfArchive.readIndex(current)
+
+    added = sorted(set(pdbId.upper() for pdbId in added))
+    modified = sorted(set(pdbId.upper() for pdbId in modified))
+    removed = set(pdbId.upper() for pdbId in removed)
+    changed = removed.union(added, modified)
+
+    downloads = _download(added + modified, baseUrl, numThreads, retries)
+
+    # Entries of unchanged structures, and their bytes per shard
+    keptEntries = [entry for entry in index if entry[0].split('.')[0] not in changed]
+    liveBytes = {}
+    for key, shard, offset, length in keptEntries:
+        liveBytes[shard] = liveBytes.get(shard, 0) + length
+
+    linked = set(shard for shard, live in liveBytes.items()
+                 if live >= minLiveFraction * os.path.getsize(os.path.join(current, shard)))
+    merged = set(liveBytes) - linked
+
+    number = int(GENERATION_PATTERN.match(listGenerations(path)[-1]).group(1)) + 1
+    generation = GENERATION_FORMAT.format(number)
+    generationPath = os.path.join(path, generation)
+    os.makedirs(generationPath)
+
+    try:
+        for shard in sorted(linked):
+            _linkShard(os.path.join(current, shard), os.path.join(generationPath, shard))
+
+        # Live records of merged shards and the downloaded records
+        mergedEntries = [entry for entry in keptEntries if entry[1] in merged]
+        records = chain(mmtfArchive.readRecords(current, mergedEntries), downloads)
+
+        shardFormat = SHARD_FORMAT.format(number) + mmtfCompression.getSuffix(compression)
+        newEntries = mmtfArchive.writeShards(records, generationPath, shardFormat, shardBytes,
+                                             compression, level)
+
+        newIndex = [entry for entry in keptEntries if entry[1] in linked] + newEntries
+        mmtfArchive.writeIndex(newIndex, generationPath)
+    except BaseException:
+        shutil.rmtree(generationPath, ignore_errors=True)
+        raise
+
+    setCurrent(path, generation)
+
+    return {'generation': generation,
+            'added': len(added), 'modified': len(modified),
+            'removed': len(set(entry[0].split('.')[0] for entry in index) & removed),
+            'linkedShards': len(linked), 'mergedShards': len(merged),
+            'writtenShards': len(set(entry[1] for entry in newEntries))}
+
+
+def _download(pdbIds, baseUrl, numThreads, retries):
+    # Downloads and validates MMTF files, raises if any entry fails
+    # Not cached, a cached entry may be older than the modified entry
+    downloader = mmtfDownloader(baseUrl, numThreads=numThreads, retries=retries, cache=False)
+    records = []
+    failures = []
+
+    for pdbId, data, error in downloader.download(pdbIds):
+        if error is None:
+            try:
+                unpack(data)
+            except Exception as e:
+                error = f"invalid MMTF file: {e}"
+
+        if error is None:
+            records.append((pdbId, bytes(data)))
+        else:
+            failures.append(f"{pdbId}: {error}")
+
+    if failures:
+        raise Exception(f"{len(failures)} entries could not be downloaded, "
+                        f"no generation was created: {'; '.join(sorted(failures)[:10])}")
+
+    # Entries complete in any order, shards are written in the order of PDB IDs
+    return sorted(records)
+
+
+def _linkShard(source, destination):
+    # Hard links a shard, or copies it on file systems without hard links
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def rollback(path):
+    '''
+    Makes the generation before the current generation current again
+
+    Attributes:
+        path (str): synchronized archive directory
+    Returns:
+        name of the new current generation
+    '''
+
+    generations = listGenerations(path)
+    position = generations.index(os.path.basename(getCurrent(path)))
+
+    if position == 0:
+        raise Exception("no previous generation to roll back to")
+
+    setCurrent(path, generations[position - 1])
+    return generations[position - 1]
+
+
+def prune(path, keep=2):
+    '''
+    Deletes all generations before the last keep generations up to the
+    current generation. Generations after the current generation, e.g.
+    after a rollback, are kept. Shards linked into the kept generations are
+    not affected
+
+    Attributes:
+        path (str): synchronized archive directory
+        keep (int): number of generations to keep, including the current
+    Returns:
+        list of the deleted generation names
+    '''
+
+    generations = listGenerations(path)
+    position = generations.index(os.path.basename(getCurrent(path)))
+    deleted = generations[:max(position + 1 - keep, 0)]
+
+    for generation in deleted:
+        shutil.rmtree(os.path.join(path, generation))
+
+    return deleted
+
+
+def main(argv):
+
+    path = None
+    inputPath = None
+    manifest = None
+    baseUrl = BASE_URL
+    rollbackGeneration = False
+
+    try:
+        opts, args = getopt.getopt(argv, "p:i:m:b:r", ["path=", "input=", "manifest=", "baseUrl=", "rollback"])
+    except getopt.GetoptError:
+        print("mmtfSync.py -p <archive> [-i <sequence_file> | -m <manifest> [-b <base_url>] | -r]")
+        sys.exit()
+
+    for opt, arg in opts:
+        if opt in ["-p", "--path"]:
+            path = arg
+        elif opt in ["-i", "--input"]:
+            inputPath = arg
+        elif opt in ["-m", "--manifest"]:
+            manifest = arg
+        elif opt in ["-b", "--baseUrl"]:
+            baseUrl = arg
+        elif opt in ["-r", "--rollback"]:
+            rollbackGeneration = True
+
+    if path is None:
+        print("mmtfSync.py -p <archive> [-i <sequence_file> | -m <manifest> [-b <base_url>] | -r]")
+        sys.exit()
+
+    if inputPath is not None:
+        print(f"initialized with {len(initialize(path, inputPath))} entries")
+    elif manifest is not None:
+        print(update(path, baseUrl=baseUrl, **readManifest(manifest)))
+    elif rollbackGeneration:
+        print(f"rolled back to {rollback(path)}")
+    else:
+        print(f"current generation: {os.path.basename(getCurrent(path))}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
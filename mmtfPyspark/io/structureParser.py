@@ -0,0 +1,863 @@
+#!/usr/bin/env python
+'''
+structureParser.py: Column oriented parsers of mmCIF and PDB files, which
+return the same mmtfStructure as the MMTF readers.
+
+Atom records are collected as rows of text and converted column by column
+into numpy arrays. The model, chain and group hierarchy, group types and
+entities are derived from the columns, and the structure is created from
+the decoded arrays without encoding them to MMTF.
+
+Bonds: only bonds that can be derived from the file are assigned. These
+are the bonds between consecutive polymer groups (peptide and
+phosphodiester bonds), covalent and disulfide bonds of the _struct_conn
+category of mmCIF files or all bonds of the CONECT records of PDB files
+(which also list metal coordination, unlike MMTF files), and bonds
+within groups listed in the _chem_comp_bond category of mmCIF files. Most
+files have no _chem_comp_bond category, and the bonds within their groups
+require the chemical component dictionary. So unlike MMTF files, groups of
+parsed structures usually have no bonds, and num_bonds only counts the
+bonds that were assigned.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import gzip
+import re
+import numpy as np
+from mmtfPyspark.io.mmtfStructure import from_fields, stringArray
+from mmtfPyspark.utils import mmtfDecoder
+
+AMINO_ACIDS = {'ALA': 'A', 'ARG': 'R', 'ASN': 'N', 'ASP': 'D', 'CYS': 'C',
+               'GLN': 'Q', 'GLU': 'E', 'GLY': 'G', 'HIS': 'H', 'ILE': 'I',
+               'LEU': 'L', 'LYS': 'K', 'MET': 'M', 'PHE': 'F', 'PRO': 'P',
+               'SER': 'S', 'THR': 'T', 'TRP': 'W', 'TYR': 'Y', 'VAL': 'V',
+               'MSE': 'M', 'SEC': 'U', 'PYL': 'O'}
+RNA = {'A': 'A', 'C': 'C', 'G': 'G', 'U': 'U'}
+DNA = {'DA': 'A', 'DC': 'C', 'DG': 'G', 'DT': 'T', 'DU': 'U'}
+WATER = frozenset(['HOH', 'WAT', 'DOD'])
+
+MONTHS = {'JAN': '01', 'FEB': '02', 'MAR': '03', 'APR': '04', 'MAY': '05',
+          'JUN': '06', 'JUL': '07', 'AUG': '08', 'SEP': '09', 'OCT': '10',
+          'NOV': '11', 'DEC': '12'}
+
+# Bond orders of _chem_comp_bond and _struct_conn
+BOND_ORDERS = {'SING': 1, 'DOUB': 2, 'TRIP': 3, 'QUAD': 4}
+
+# _struct_conn types of covalent bonds
+COVALENT_CONNECTIONS = frozenset(['covale', 'covale_base', 'covale_phosphate', 'covale_sugar', 'disulf'])
+
+# Atoms of the bonds between consecutive polymer groups
+PEPTIDE_BOND = ('C', 'N')
+PHOSPHODIESTER_BOND = ("O3'", 'P')
+
+# Quoted or unquoted mmCIF tokens
+_TOKEN = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+
+
+def _open(path):
+    if hasattr(path, 'read'):
+        return path
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path, 'r')
+
+
+def _single_letter_code(groupName):
+    for table in (AMINO_ACIDS, RNA, DNA):
+        if groupName in table:
+            return table[groupName]
+    return '?'
+
+
+def _chem_comp_type(groupName):
+    # Approximates the chemical component type for files without _chem_comp
+    if groupName == 'GLY':
+        return 'PEPTIDE LINKING'
+    if groupName in AMINO_ACIDS:
+        return 'L-PEPTIDE LINKING'
+    if groupName in RNA:
+        return 'RNA LINKING'
+    if groupName in DNA:
+        return 'DNA LINKING'
+    return 'NON-POLYMER'
+
+
+def _changes(n, columns):
+    # Mask of rows where any of the columns differs from the previous row
+    mask = np.zeros(n, dtype=bool)
+    if n > 0:
+        mask[0] = True
+    for column in columns:
+        mask[1:] |= column[1:] != column[:-1]
+    return mask
+
+
+def getHierarchy(model, chainId, groupNumber, insCode, groupName):
+    '''
+    Returns the first atom index of each chain and of each group
+
+    Attributes:
+        model, chainId, groupNumber, insCode, groupName (ndarray): atom
+            columns, groups and chains start where any of them changes
+    '''
+
+    n = len(model)
+    chainStart = np.flatnonzero(_changes(n, [model, chainId]))
+    groupStart = np.flatnonzero(_changes(n, [model, chainId, groupNumber, insCode, groupName]))
+    return chainStart, groupStart
+
+
+def getGroupTypes(groupStart, groupName, atomName, element, charge):
+    '''
+    Returns the group type of each group, and the first group of each type.
+    Groups have the same type if they have the same name, and the same atom
+    names, elements and charges in the same order. Types are numbered in
+    the order of their first group
+
+    Attributes:
+        groupStart (ndarray): first atom index of each group
+        groupName, atomName, element, charge (ndarray): atom columns
+    '''
+
+    n = len(atomName)
+    length = np.diff(np.append(groupStart, n))
+
+    # One integer code per atom for its name, element and charge
+    atomCode = np.zeros(n, dtype=np.int64)
+    for column in (atomName, element, charge):
+        values, inverse = np.unique(column, return_inverse=True)
+        atomCode = atomCode * len(values) + inverse.ravel()
+
+    nameCode = np.unique(groupName[groupStart], return_inverse=True)[1].ravel()
+
+    # Groups of the same size are compared as rows of a matrix
+    groupType = np.empty(len(groupStart), dtype=np.int64)
+    firstGroup = []
+    numTypes = 0
+
+    for size in np.unique(length).tolist():
+        groups = np.flatnonzero(length == size)
+        keys = np.column_stack((nameCode[groups], atomCode[groupStart[groups, None] + np.arange(size)]))
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+        groupType[groups] = numTypes + inverse.ravel()
+        firstGroup.append(groups[first])
+        numTypes += len(first)
+
+    firstGroup = np.concatenate(firstGroup) if firstGroup else np.zeros(0, dtype=np.int64)
+    order = np.argsort(firstGroup)
+    rank = np.empty(numTypes, dtype=np.int64)
+    rank[order] = np.arange(numTypes)
+
+    return rank[groupType].astype(np.int32), firstGroup[order]
+
+
+def _pairs(first, second):
+    # Atom pairs of a bond between atoms with several alternative locations
+    # or models: one to many, or pairwise in order
+    if len(first) == 1 or len(second) == 1 or len(first) != len(second):
+        return [(i, j) for i in first for j in second]
+    return list(zip(first, second))
+
+
+def _positions(names):
+    # Atom name -> indices of the atoms with the name
+    positions = {}
+    for i, name in enumerate(names):
+        positions.setdefault(name, []).append(i)
+    return positions
+
+
+def _polymer_bonds(groupStart, groupType, sequenceIndex, chainOfGroup, groupList):
+    # Bonds between consecutive polymer groups of a chain, with the first
+    # atom of each name
+    numTypes = len(groupList)
+    linking = [group['chemCompType'] for group in groupList]
+
+    first = {}
+    for name in PEPTIDE_BOND + PHOSPHODIESTER_BOND:
+        index = np.full(numTypes, -1, dtype=np.int64)
+        for t, group in enumerate(groupList):
+            if name in group['atomNameList']:
+                index[t] = group['atomNameList'].index(name)
+        first[name] = index
+
+    peptide = np.array(['PEPTIDE' in t for t in linking], dtype=bool)
+    nucleotide = np.array(['DNA' in t or 'RNA' in t for t in linking], dtype=bool)
+
+    this, following = groupType[:-1], groupType[1:]
+    consecutive = (chainOfGroup[:-1] == chainOfGroup[1:]) & (sequenceIndex[:-1] >= 0) \
+                  & (sequenceIndex[1:] == sequenceIndex[:-1] + 1)
+
+    bonds = []
+    for kind, (a, b) in [(peptide, PEPTIDE_BOND), (nucleotide, PHOSPHODIESTER_BOND)]:
+        linked = consecutive & kind[this] & kind[following] & (first[a][this] >= 0) & (first[b][following] >= 0)
+        groups = np.flatnonzero(linked)
+        bonds.append(np.column_stack((groupStart[groups] + first[a][groupType[groups]],
+                                      groupStart[groups + 1] + first[b][groupType[groups + 1]])))
+
+    return np.concatenate(bonds)
+
+
+def buildFields(structureId, atoms, chainStart, groupStart, sequenceIndex, entities, chemCompTypes, header,
+                groupBonds=None, atomBonds=None):
+    '''
+    Returns the decoded MMTF fields of a structure from atom columns, see
+    mmtfStructure.from_fields
+
+    Attributes:
+        structureId (str): structure id
+        atoms (dict): atom columns model, chainId, chainName, groupNumber,
+                      insCode, groupName, atomName, element, charge, altLoc,
+                      atomId, x, y, z, occupancy and bFactor
+        chainStart (ndarray): first atom index of each chain
+        groupStart (ndarray): first atom index of each group
+        sequenceIndex (ndarray): index of each group in its entity
+                                 sequence, -1 for non-polymer groups
+        entities (list): entity dictionaries with description, type,
+                         chainIndexList and sequence
+        chemCompTypes (dict): group name -> chemical component type
+        header (dict): optional MMTF header fields by attribute name,
+                       e.g. title, resolution
+        groupBonds (dict): group name -> list of (atom name, atom name,
+                           bond order) of bonds within the group
+        atomBonds (tuple): (ndarray, ndarray) of atom index pairs and bond
+                           orders of other bonds, e.g. of CONECT records
+    Returns:
+        dictionary of attribute name -> decoded value
+    '''
+
+    n = len(atoms['x'])
+    numGroups = len(groupStart)
+    groupsPerChain = np.diff(np.append(np.searchsorted(groupStart, chainStart), numGroups))
+    chainOfGroup = np.repeat(np.arange(len(chainStart)), groupsPerChain)
+
+    modelOfChain = atoms['model'][chainStart]
+    modelStart = np.flatnonzero(_changes(len(chainStart), [modelOfChain]))
+    chainsPerModel = np.diff(np.append(modelStart, len(chainStart)))
+
+    groupTypeList, firstGroup = getGroupTypes(groupStart, atoms['groupName'], atoms['atomName'],
+                                              atoms['element'], atoms['charge'])
+    groupEnd = np.append(groupStart[1:], n)
+
+    # Explicit bonds within a group become bonds of its group type
+    typeBonds = [{} for g in firstGroup]
+    interBonds = [np.zeros((0, 2), dtype=np.int64)]
+    interOrders = [np.zeros(0, dtype=np.int64)]
+
+    if atomBonds is not None and len(atomBonds[0]) > 0:
+        pairs, orders = atomBonds
+        groupOfAtom = np.repeat(np.arange(numGroups), groupEnd - groupStart)
+        g = groupOfAtom[pairs[:, 0]]
+        inGroup = g == groupOfAtom[pairs[:, 1]]
+
+        starts = groupStart.tolist()
+        for (i, j), group, order in zip(pairs[inGroup].tolist(), g[inGroup].tolist(), orders[inGroup].tolist()):
+            start = starts[group]
+            typeBonds[groupTypeList[group]].setdefault(tuple(sorted((i - start, j - start))), order)
+
+        interBonds.append(pairs[~inGroup])
+        interOrders.append(orders[~inGroup])
+
+    groupList = []
+    for t, g in enumerate(firstGroup.tolist()):
+        start, end = groupStart[g], groupEnd[g]
+        name = str(atoms['groupName'][start])
+        atomNames = tuple(atoms['atomName'][start:end].tolist())
+
+        bonds = typeBonds[t]
+        if groupBonds and name in groupBonds:
+            positions = _positions(atomNames)
+            for a, b, order in groupBonds[name]:
+                for i, j in _pairs(positions.get(a, []), positions.get(b, [])):
+                    bonds.setdefault(tuple(sorted((i, j))), order)
+
+        groupList.append(mmtfDecoder.share_group(
+            {'groupName': name,
+             'atomNameList': atomNames,
+             'elementList': tuple(atoms['element'][start:end].tolist()),
+             'bondAtomList': tuple(i for pair in bonds for i in pair),
+             'bondOrderList': tuple(bonds.values()),
+             'formalChargeList': tuple(atoms['charge'][start:end].tolist()),
+             'singleLetterCode': _single_letter_code(name),
+             'chemCompType': chemCompTypes.get(name) or _chem_comp_type(name)}))
+
+    polymerBonds = _polymer_bonds(groupStart, groupTypeList, sequenceIndex, chainOfGroup, groupList)
+    bondAtoms = np.concatenate([polymerBonds] + interBonds)
+    bondOrders = np.concatenate([np.ones(len(polymerBonds), dtype=np.int64)] + interOrders)
+
+    bondsPerType = np.array([len(group['bondOrderList']) for group in groupList], dtype=np.int64)
+    numBonds = int(bondsPerType[groupTypeList].sum()) + len(bondOrders)
+
+    values = {'mmtf_version': '1.0.0',
+              'mmtf_producer': 'mmtfPyspark',
+              'num_bonds': numBonds,
+              'num_atoms': n,
+              'num_groups': numGroups,
+              'num_chains': len(chainStart),
+              'num_models': len(chainsPerModel),
+              'structure_id': structureId,
+              'chains_per_model': chainsPerModel.tolist(),
+              'groups_per_chain': groupsPerChain.tolist(),
+              'chain_id_list': stringArray(atoms['chainId'][chainStart].astype('S4')),
+              'chain_name_list': stringArray(atoms['chainName'][chainStart].astype('S4')),
+              'group_list': groupList,
+              'group_type_list': groupTypeList,
+              'group_id_list': atoms['groupNumber'][groupStart].astype(np.int32),
+              'ins_code_list': stringArray(atoms['insCode'][groupStart].astype('S1')),
+              'sequence_index_list': sequenceIndex.astype(np.int32),
+              'sec_struct_list': np.full(numGroups, -1, dtype=np.int8),
+              'atom_id_list': atoms['atomId'].astype(np.int32),
+              'alt_loc_list': stringArray(atoms['altLoc'].astype('S1')),
+              'x_coord_list': atoms['x'],
+              'y_coord_list': atoms['y'],
+              'z_coord_list': atoms['z'],
+              'occupancy_list': atoms['occupancy'],
+              'b_factor_list': atoms['bFactor'],
+              'bond_atom_list': bondAtoms.astype(np.int32).ravel(),
+              'bond_order_list': bondOrders.astype(np.int8),
+              'entity_list': entities,
+              'bio_assembly': []}
+
+    for name, value in header.items():
+        if value is not None:
+            values[name] = value
+
+    return values
+
+
+def _missing(values, default):
+    # Replaces unknown ('?') and missing ('.' or blank) values by a default
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    if '?' in values or '.' in values or '' in values:
+        values = [default if v in ('?', '.', '') else v for v in values]
+    return values
+
+
+def _floats(values, default=0.0):
+    # Converting lists of strings is faster than astype of string arrays
+    return np.array(_missing(values, default), dtype=np.float64)
+
+
+def _ints(values, default=0):
+    return np.array(list(map(int, _missing(values, default))), dtype=np.int64)
+
+
+def readCif(f):
+    '''
+    Reads the first data block of an mmCIF file
+
+    Attributes:
+        f (file): text file object
+    Returns:
+        data block name and dictionary of category -> item -> list of values
+    '''
+
+    block = None
+    categories = {}
+    loopItems = None
+    loopValues = None
+    pending = None
+
+    def setValue(name, value):
+        category, item = name[1:].split('.', 1)
+        categories.setdefault(category, {})[item] = [value]
+
+    def endLoop():
+        if loopItems:
+            k = len(loopItems)
+            for i, name in enumerate(loopItems):
+                category, item = name[1:].split('.', 1)
+                categories.setdefault(category, {})[item] = loopValues[i::k]
+
+    lines = iter(f)
+    for line in lines:
+        if line.startswith(';'):
+            # Multi-line text field
+            text = [line[1:].rstrip()]
+            for line in lines:
+                if line.startswith(';'):
+                    break
+                text.append(line.rstrip())
+            value = '\n'.join(text).strip()
+
+            if loopItems is not None:
+                loopValues.append(value)
+            elif pending is not None:
+                setValue(pending, value)
+                pending = None
+            continue
+
+        s = line.strip()
+        if not s or s[0] == '#':
+            continue
+
+        if s[0] == '_':
+            if loopItems is not None and not loopValues:
+                loopItems.append(s.split()[0])
+                continue
+            endLoop()
+            loopItems = None
+
+            tokens = s.split(None, 1)
+            if len(tokens) == 1:
+                pending = tokens[0]
+            else:
+                setValue(tokens[0], _split(tokens[1])[0])
+            continue
+
+        if s.startswith('loop_'):
+            endLoop()
+            loopItems, loopValues = [], []
+            continue
+
+        if s.startswith('data_'):
+            if block is not None:
+                break
+            block = s[5:]
+            continue
+
+        tokens = _split(s)
+        if loopItems is not None:
+            loopValues.extend(tokens)
+        elif pending is not None:
+            setValue(pending, tokens[0])
+            pending = None
+
+    endLoop()
+    return block, categories
+
+
+def _split(line):
+    if "'" not in line and '"' not in line:
+        return line.split()
+    return [m.group(m.lastindex) for m in _TOKEN.finditer(line)]
+
+
+def _value(categories, category, item, convert=str):
+    # Returns the first value of an item, or None if missing or unknown
+    values = categories.get(category, {}).get(item)
+    if not values or values[0] in ('?', '.'):
+        return None
+    return convert(values[0])
+
+
+def parseMmcif(path):
+    '''
+    Parses an mmCIF file into decoded MMTF fields
+
+    Attributes:
+        path (str): path to an optionally gzipped mmCIF file, or a text
+                    file object
+    Returns:
+        dictionary of attribute name -> decoded MMTF field
+    '''
+
+    f = _open(path)
+    try:
+        block, categories = readCif(f)
+    finally:
+        if f is not path:
+            f.close()
+
+    site = categories['atom_site']
+    n = len(site['id'])
+
+    def values(item, fallback=None, default='?'):
+        if item in site:
+            return site[item]
+        if fallback is not None and fallback in site:
+            return site[fallback]
+        return [default] * n
+
+    def column(item, fallback=None, default='?'):
+        return np.array(values(item, fallback, default))
+
+    altLoc = column('label_alt_id', default='.')
+    insCode = column('pdbx_PDB_ins_code')
+    element = column('type_symbol')
+
+    atoms = {'model': _ints(values('pdbx_PDB_model_num', default='1')),
+             'chainId': column('label_asym_id', 'auth_asym_id'),
+             'chainName': column('auth_asym_id', 'label_asym_id'),
+             'groupNumber': _ints(values('auth_seq_id', 'label_seq_id')),
+             'insCode': np.where(np.isin(insCode, ['?', '.']), '\x00', insCode),
+             'groupName': column('label_comp_id', 'auth_comp_id'),
+             'atomName': column('label_atom_id', 'auth_atom_id'),
+             'element': np.char.capitalize(element),
+             'charge': _ints(values('pdbx_formal_charge')),
+             'altLoc': np.where(np.isin(altLoc, ['?', '.']), '\x00', altLoc),
+             'atomId': _ints(values('id')),
+             'x': _floats(site['Cartn_x']),
+             'y': _floats(site['Cartn_y']),
+             'z': _floats(site['Cartn_z']),
+             'occupancy': _floats(values('occupancy', default='1.0'), 1.0),
+             'bFactor': _floats(values('B_iso_or_equiv'))}
+
+    chainStart, groupStart = getHierarchy(atoms['model'], atoms['chainId'], atoms['groupNumber'],
+                                          atoms['insCode'], atoms['groupName'])
+
+    sequenceIndex = _ints(column('label_seq_id', default='.')[groupStart]) - 1
+    sequenceIndex[sequenceIndex < 0] = -1
+
+    # Entities of the chains of the first model
+    entityId = column('label_entity_id')[chainStart]
+    modelOfChain = atoms['model'][chainStart]
+    firstModel = np.flatnonzero(modelOfChain == modelOfChain[0]) if n > 0 else []
+
+    entity = categories.get('entity', {})
+    sequences = dict(zip(categories.get('entity_poly', {}).get('entity_id', []),
+                         categories.get('entity_poly', {}).get('pdbx_seq_one_letter_code_can', [])))
+
+    entities = []
+    for i, eid in enumerate(entity.get('id', [])):
+        description = entity['pdbx_description'][i] if 'pdbx_description' in entity else ''
+        entities.append({'description': '' if description in ('?', '.') else description,
+                         'type': entity['type'][i] if 'type' in entity else '',
+                         'chainIndexList': [int(c) for c in firstModel if entityId[c] == eid],
+                         'sequence': sequences.get(eid, '').replace('\n', '')})
+
+    chemComp = categories.get('chem_comp', {})
+    chemCompTypes = {name: t.upper() for name, t in zip(chemComp.get('id', []), chemComp.get('type', []))}
+
+    methods = categories.get('exptl', {}).get('method', [])
+    revisionDates = [d for d in categories.get('pdbx_audit_revision_history', {}).get('revision_date', [])
+                     if d not in ('?', '.')]
+    cell = [_value(categories, 'cell', item, float)
+            for item in ['length_a', 'length_b', 'length_c', 'angle_alpha', 'angle_beta', 'angle_gamma']]
+
+    resolution = _value(categories, 'refine', 'ls_d_res_high', float)
+    if resolution is None:
+        resolution = _value(categories, 'em_3d_reconstruction', 'resolution', float)
+
+    header = {'title': _value(categories, 'struct', 'title'),
+              'experimental_methods': [m.encode() for m in methods],
+              'resolution': resolution,
+              'r_free': _value(categories, 'refine', 'ls_R_factor_R_free', float),
+              'r_work': _value(categories, 'refine', 'ls_R_factor_R_work', float),
+              'deposition_date': _value(categories, 'pdbx_database_status', 'recvd_initial_deposition_date'),
+              'release_date': min(revisionDates) if revisionDates else None,
+              'space_group': _value(categories, 'symmetry', 'space_group_name_H-M', str.encode),
+              'unit_cell': cell if None not in cell else None}
+
+    compBond = categories.get('chem_comp_bond', {})
+    groupBonds = {}
+    for name, a, b, order in zip(compBond.get('comp_id', []), compBond.get('atom_id_1', []),
+                                 compBond.get('atom_id_2', []), compBond.get('value_order', [])):
+        groupBonds.setdefault(name, []).append((a, b, BOND_ORDERS.get(order.upper(), 1)))
+
+    structureId = (block or '').upper()
+    return buildFields(structureId, atoms, chainStart, groupStart, sequenceIndex, entities, chemCompTypes,
+                       header, groupBonds, _connections(categories.get('struct_conn', {}), atoms))
+
+
+def _connections(conn, atoms):
+    # Atom pairs and bond orders of the covalent bonds of _struct_conn.
+    # Bonds to symmetry related atoms are left out
+    partners = []
+    for i, connType in enumerate(conn.get('conn_type_id', [])):
+        if connType.lower() not in COVALENT_CONNECTIONS:
+            continue
+        if 'ptnr1_symmetry' in conn and conn['ptnr1_symmetry'][i] != conn['ptnr2_symmetry'][i]:
+            continue
+
+        order = conn['pdbx_value_order'][i] if 'pdbx_value_order' in conn else '?'
+        partner = [(conn[f'ptnr{p}_label_asym_id'][i], conn[f'ptnr{p}_auth_seq_id'][i],
+                    conn[f'pdbx_ptnr{p}_PDB_ins_code'][i] if f'pdbx_ptnr{p}_PDB_ins_code' in conn else '?',
+                    conn[f'ptnr{p}_label_atom_id'][i]) for p in (1, 2)]
+        partners.append((partner, BOND_ORDERS.get(order.upper(), 1)))
+
+    return _atom_pairs(partners, atoms, ['chainId', 'groupNumber', 'insCode', 'atomName'])
+
+
+def _atom_pairs(partners, atoms, columns):
+    # Atom index pairs and bond orders of bonds between atoms given by the
+    # values of atom columns. An atom matches all its alternative locations
+    # and models
+    keys = set(key for pair, order in partners for key in pair)
+    pairs, orders = [], []
+
+    if keys:
+        candidates = np.flatnonzero(np.isin(atoms[columns[-1]], [key[-1] for key in keys]))
+        atomKeys = zip(*[atoms[c][candidates].tolist() for c in columns])
+        index = {}
+        for i, key in zip(candidates.tolist(), atomKeys):
+            index.setdefault(tuple(str(k) for k in key), []).append(i)
+
+        # Missing values are read as empty strings from the atom columns
+        for (a, b), order in partners:
+            a = tuple(str(k) if k not in ('?', '.') else '' for k in a)
+            b = tuple(str(k) if k not in ('?', '.') else '' for k in b)
+            for pair in _pairs(index.get(a, []), index.get(b, [])):
+                pairs.append(pair)
+                orders.append(order)
+
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2), np.array(orders, dtype=np.int64)
+
+
+# Column ranges of PDB ATOM and HETATM records
+_PDB_COLUMNS = {'record': (0, 6), 'atomId': (6, 11), 'atomName': (12, 16),
+                'altLoc': (16, 17), 'groupName': (17, 20), 'chainId': (21, 22),
+                'groupNumber': (22, 26), 'insCode': (26, 27), 'x': (30, 38),
+                'y': (38, 46), 'z': (46, 54), 'occupancy': (54, 60),
+                'bFactor': (60, 66), 'element': (76, 78), 'charge': (78, 80)}
+
+
+def _pdb_date(date):
+    # DD-MMM-YY -> YYYY-MM-DD
+    day, month, year = date.split('-')
+    century = '19' if int(year) >= 50 else '20'
+    return f"{century}{year}-{MONTHS[month]}-{day}"
+
+
+def parsePdb(path, structureId=None):
+    '''
+    Parses a PDB file into decoded MMTF fields. Each chain of a model is one MMTF
+    chain. Groups up to the TER record of a chain, or ATOM records if the
+    chain has no TER record, are polymer groups. Polymer chains with the
+    same sequence form an entity, other chains are non-polymer or water
+    entities
+
+    Attributes:
+        path (str): path to an optionally gzipped PDB file, or a text file
+                    object
+        structureId (str): structure id if the file has no HEADER record
+    Returns:
+        dictionary of attribute name -> decoded MMTF field
+    '''
+
+    records = []
+    models = []
+    beforeTer = []
+    terChains = set()
+    seqres = {}
+    compound = []
+    hetnam = {}
+    header = {'experimental_methods': []}
+    conect = []
+    title = []
+    model = 1
+
+    f = _open(path)
+    try:
+        for line in f:
+            record = line[:6]
+
+            if record == 'ATOM  ' or record == 'HETATM':
+                records.append(line.rstrip('\n').ljust(80))
+                models.append(model)
+                beforeTer.append((model, line[21]) not in terChains)
+            elif record == 'CONECT':
+                conect.append(line.rstrip('\n'))
+            elif record == 'TER   ':
+                if len(records) > 0:
+                    terChains.add((model, records[-1][21]))
+            elif record == 'MODEL ':
+                model = int(line[10:14])
+            elif record == 'HEADER':
+                structureId = line[62:66].strip() or structureId
+                if line[50:59].strip():
+                    header['deposition_date'] = _pdb_date(line[50:59].strip())
+            elif record == 'TITLE ':
+                title.append(line[10:80].strip())
+            elif record == 'COMPND':
+                compound.append(line[10:80].strip())
+            elif record == 'HETNAM':
+                name = line[11:14].strip()
+                hetnam[name] = (hetnam.get(name, '') + ' ' + line[15:70].strip()).strip()
+            elif record == 'EXPDTA':
+                header['experimental_methods'] += [m.strip().encode() for m in line[10:80].split(';') if m.strip()]
+            elif record == 'REVDAT' and line[7:10].strip() == '1':
+                header['release_date'] = _pdb_date(line[13:22].strip())
+            elif record == 'SEQRES':
+                seqres.setdefault(line[11], []).extend(line[19:80].split())
+            elif record == 'CRYST1':
+                header['unit_cell'] = [float(line[i:j]) for i, j in
+                                      [(6, 15), (15, 24), (24, 33), (33, 40), (40, 47), (47, 54)]]
+                header['space_group'] = line[55:66].strip().encode()
+            elif record == 'REMARK':
+                if line.startswith('REMARK   2 RESOLUTION.'):
+                    try:
+                        header['resolution'] = float(line[22:30])
+                    except ValueError:
+                        pass
+                elif 'R VALUE            (WORKING SET)' in line or 'FREE R VALUE  ' in line:
+                    try:
+                        value = float(line.split(':')[1])
+                    except (IndexError, ValueError):
+                        continue
+                    if 'FREE' in line and 'BIN' not in line and 'ESU' not in line:
+                        header.setdefault('r_free', value)
+                    elif 'WORKING SET' in line and 'BIN' not in line:
+                        header.setdefault('r_work', value)
+    finally:
+        if f is not path:
+            f.close()
+
+    if title:
+        header['title'] = ' '.join(title)
+
+    # Fixed width columns of all atom records
+    raw = np.array(records, dtype='S80').view(np.uint8).reshape(len(records), 80)
+
+    def column(name):
+        start, end = _PDB_COLUMNS[name]
+        values = np.ascontiguousarray(raw[:, start:end]).view(f'S{end - start}').ravel()
+        return np.char.strip(values.astype('U'))
+
+    altLoc = column('altLoc')
+    insCode = column('insCode')
+    atomName = column('atomName')
+    element = column('element')
+    # Element from the atom name if the element column is empty
+    element = np.where(element == '', np.char.lstrip(atomName, '0123456789').astype('U1'), element)
+    charge = column('charge')
+    chargeValues, chargeIndex = np.unique(charge, return_inverse=True)
+    chargeValues = np.array([int(c[-1] + c[:-1]) if c else 0 for c in chargeValues], dtype=np.int64)
+
+    try:
+        atomId = _ints(column('atomId'))
+    except ValueError:
+        # hybrid-36 serial numbers of large structures
+        atomId = np.arange(1, len(records) + 1)
+
+    chainId = column('chainId')
+    atoms = {'model': np.array(models, dtype=np.int64),
+             'chainId': chainId,
+             'chainName': chainId,
+             'groupNumber': _ints(column('groupNumber')),
+             'insCode': np.where(insCode == '', '\x00', insCode),
+             'groupName': column('groupName'),
+             'atomName': atomName,
+             'element': np.char.capitalize(element),
+             'charge': chargeValues[chargeIndex],
+             'altLoc': np.where(altLoc == '', '\x00', altLoc),
+             'atomId': atomId,
+             'x': _floats(column('x')),
+             'y': _floats(column('y')),
+             'z': _floats(column('z')),
+             'occupancy': _floats(column('occupancy'), 1.0),
+             'bFactor': _floats(column('bFactor'))}
+
+    chainStart, groupStart = getHierarchy(atoms['model'], atoms['chainId'], atoms['groupNumber'],
+                                          atoms['insCode'], atoms['groupName'])
+
+    # Polymer groups, numbered in order within their chain
+    isAtom = column('record') == 'ATOM'
+    hasTer = np.array([(m, c) in terChains for m, c in zip(models, chainId.tolist())], dtype=bool)
+    polymer = np.where(hasTer, np.array(beforeTer, dtype=bool), isAtom)[groupStart]
+
+    chainOfGroup = np.searchsorted(chainStart, groupStart, side='right') - 1
+    polymerCount = np.cumsum(polymer)
+    chainOffset = np.concatenate(([0], polymerCount))[np.searchsorted(groupStart, chainStart)]
+    sequenceIndex = np.where(polymer, polymerCount - 1 - chainOffset[chainOfGroup], -1)
+
+    entities = _pdb_entities(atoms, chainStart, groupStart, polymer, chainOfGroup, seqres, compound, hetnam)
+
+    return buildFields((structureId or '').upper(), atoms, chainStart, groupStart, sequenceIndex,
+                       entities, {}, header, atomBonds=_conect_bonds(conect, atoms))
+
+
+def _conect_bonds(conect, atoms):
+    # Atom pairs of CONECT records, each bond once. Bond orders are not
+    # given by CONECT records
+    partners = set()
+    for line in conect:
+        serials = [line[i:i + 5].strip() for i in range(6, 31, 5)]
+        if not serials[0].isdigit():
+            continue
+        for serial in serials[1:]:
+            if serial.isdigit() and serial != serials[0]:
+                partners.add(tuple(sorted((int(serials[0]), int(serial)))))
+
+    return _atom_pairs([(((a,), (b,)), 1) for a, b in sorted(partners)], atoms, ['atomId'])
+
+
+def _pdb_entities(atoms, chainStart, groupStart, polymer, chainOfGroup, seqres, compound, hetnam):
+    # Entities of the chains of the first model, polymer chains are grouped
+    # by sequence and other chains by their groups
+    descriptions = {}
+    molecule = ''
+    for entry in ' '.join(compound).split(';'):
+        key, _, value = entry.partition(':')
+        key = key.strip()
+        if key == 'MOLECULE':
+            molecule = value.strip()
+        elif key == 'CHAIN':
+            for chain in value.split(','):
+                descriptions[chain.strip()] = molecule
+
+    groupNames = atoms['groupName'][groupStart]
+    modelOfChain = atoms['model'][chainStart]
+
+    entities = []
+    entityIndex = {}
+
+    for c in range(len(chainStart)):
+        if modelOfChain[c] != modelOfChain[0]:
+            break
+
+        chainName = str(atoms['chainName'][chainStart[c]])
+        inChain = chainOfGroup == c
+        names = groupNames[inChain & polymer].tolist()
+
+        if names:
+            sequence = ''.join(_single_letter_code(x) if _single_letter_code(x) != '?' else 'X'
+                               for x in seqres.get(chainName, names))
+            entityType = 'polymer'
+            key = (entityType, sequence)
+            description = descriptions.get(chainName, '')
+        else:
+            names = sorted(set(groupNames[inChain].tolist()))
+            sequence = ''
+            entityType = 'water' if set(names) <= WATER else 'non-polymer'
+            key = (entityType, tuple(names))
+            description = 'water' if entityType == 'water' else ' '.join(hetnam.get(x, x) for x in names)
+
+        index = entityIndex.get(key)
+        if index is None:
+            index = len(entities)
+            entityIndex[key] = index
+            entities.append({'description': description,
+                             'type': entityType,
+                             'chainIndexList': [],
+                             'sequence': sequence})
+
+        entities[index]['chainIndexList'].append(c)
+
+    return entities
+
+
+def readMmcif(path, fields=None, coordType='float64'):
+    '''
+    Reads an mmCIF file into an mmtfStructure. See the module documentation
+    for the bonds that are assigned
+
+    Attributes:
+        path (str): path to an optionally gzipped mmCIF file
+        fields (list(str)): MMTF fields to keep, all if None
+        coordType (str): coordinate storage, 'float64', 'float32' or 'int32'
+    '''
+
+    return from_fields(parseMmcif(path), fields, coordType)
+
+
+def readPdb(path, structureId=None, fields=None, coordType='float64'):
+    '''
+    Reads a PDB file into an mmtfStructure. See the module documentation
+    for the bonds that are assigned
+
+    Attributes:
+        path (str): path to an optionally gzipped PDB file
+        structureId (str): structure id if the file has no HEADER record
+        fields (list(str)): MMTF fields to keep, all if None
+        coordType (str): coordinate storage, 'float64', 'float32' or 'int32'
+    '''
+
+    return from_fields(parsePdb(path, structureId), fields, coordType)
@@ -6,3 +6,5 @@ from .structureToSecondaryStructureSegments import structureToSecondaryStructure
 from .structureToSecondaryStructureElements import structureToSecondaryStructureElements
 from .structureToProteinDimers import structureToProteinDimers
 from .structureToBiopython import structureToBiopython
+from .structureToReducedStructure import structureToReducedStructure
+from .structureToInteractingResidues import structureToInteractingResidues
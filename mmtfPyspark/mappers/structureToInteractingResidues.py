@@ -2,7 +2,14 @@
 '''
 structureToInteractingResidues.py:
 
-Convert a full format of the file to a reduced format
+Maps a structure to the residues that interact with specified groups
+within a cutoff distance, with the minimum atom distance of each pair of
+interacting residues. For a multi-model structure, only the first model
+is considered.
+
+Atom pairs within the cutoff distance are found with a spatial index (see
+utils.spatialIndex), and reduced to the minimum distance per residue pair
+with numpy array operations.
 
 Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
@@ -10,143 +17,110 @@ Authorship information:
     __email__ = "marshuang80@gmail.com:
     __status__ = "Done"
 '''
+import numpy as np
 from pyspark.sql import Row
+from mmtfPyspark.utils.columnarStructure import getColumnarStructure
+from mmtfPyspark.utils.spatialIndex import SpatialIndex
 
 class structureToInteractingResidues(object):
-
-    def __init__(self, groupName, cutoffDistance):
-        self.groupName = groupName
+    '''Finds the residues (groups) within a cutoff distance of the specified
+    groups. Returns one row of structureId, residue1, index1, residue2,
+    index2 and distance for each interacting pair of a specified group
+    (residue1) and another group (residue2), where index1 and index2 are
+    the group indices in the structure and distance is the minimum atom
+    distance. An interaction of two specified groups is returned once, with
+    index1 < index2. Rows are ordered by index1, then index2.
+
+    Attributes:
+        groupName (str or list(str)): names of the groups, e.g. "ZN" or
+                                      ["ATP", "ADP"], or a comma separated list
+        cutoffDistance (float): cutoff distance
+        excludeSameResidue (bool): if true, exclude interactions between
+                                   groups with the same name, e.g. HOH-HOH
+        excludeSameChain (bool): if true, exclude interactions with groups with
+                                 the same chain name, e.g. a ligand and the
+                                 residues of the chain it is bound to
+    '''
+
+    def __init__(self, groupName, cutoffDistance, excludeSameResidue = False,
+                 excludeSameChain = False):
+        if type(groupName) == str:
+            groupName = groupName.split(',')
+
+        self.groupNames = list(groupName)
         self.cutoffDistance = cutoffDistance
+        self.excludeSameResidue = excludeSameResidue
+        self.excludeSameChain = excludeSameChain
 
 
     def __call__(self, t):
-        structureId = t[0]
-        structure = t[1]
-        groupIndices, groupNames = self._getGroupIndices(structure)
-
-        neighbors = []
-        for i in range(len(groupName)):
-
-            if groupNames[i] == self.groupName:
-                matches = []
-                boundingBox = self._calcBondingBox(structure, groupIndices, i, self.cutoffDistance)
-                matches += self._findNeighbors(structure, index, boudingBox, groupIndices)
-                neighbors += self._getDistanceProfile(structureId,
-                                  matches, i, groupIndices, groupNames, structure)
-        return neighbors
-
-
-    def _getDistanceProfile(self, structureId, matches, index, groupIndices, groupNames, structure):
-        cutoffDistanceSq = cutoffDistance * cutoffDistance
-
-        x = structure.x_coord_list
-        y = structure.y_coord_list
-        z = structure.z_coord_list
-
-        first = groupIndices(index)
-        last = groupIndices(index + 1)
-
-        rows = []
-
-        for i in matches:
-            if i == index: continue
-
-            minDSq = float('inf')
-            minIndex = -1
-
-            for j in range(groupIndices[i], groupIndices[i+1]):
-
-                for k in range(first, last):
-                    dx = x[j] - x[k]
-                    dy = y[j] - y[k]
-                    dz = z[j] - z[k]
-                    dSq = dx*dx + dy*dy + dz*dz
-
-                    if (dSq <= cutoffDistanceSq and dSq < minDSq):
-                        minDSq = min(minDSq, dSq)
-                        minIndex = i
-
-            if minIndex >= 0:
-                # TODO add unique group (and atom?) for each group?
-                row = Row(structureId,
-                          groupNames[index],
-                          index,
-                          groupNames.get(minIndex),
-                          minIndex,
-                          float(minDSq**0.5))
-                rows.append(row)
+        '''Returns the interacting residues of a structure as a list of rows
+        '''
+        batch = self.getBatch(t)
 
-        return rows
+        return [Row(*row) for row in zip(batch[0], batch[1], batch[2].tolist(),
+                                         batch[3], batch[4].tolist(), batch[5].tolist())]
 
 
-    def _findNeighbors(self, structure, index, boundingBox, groupIndices):
-        x = structure.x_coord_list
-        y = structure.y_coord_list
-        z = structure.z_coord_list
+    def getBatches(self, t):
+        '''Returns the interacting residues of a structure as a list of one
+        column batch, or an empty list if there are no interactions, for use
+        with flatMap and pythonRDDToDataset.getDatasetFromBatches
+        '''
+        batch = self.getBatch(t)
 
-        matches = []
-        for i in range(len(groupIndices) - 1):
+        return [batch] if len(batch[0]) > 0 else []
 
-            for j in range(groupIndices[i], groupIndices[i+1]):
 
-                if (x[j] >= boundingBox[0] and x[j] <= boundingBox[1] and
-                    y[j] >= boundingBox[2] and y[j] <= boundingBox[3] and
-                    z[j] >= boundindBox[4] and z[j] <= boundingBox[5]):
-                    matches.append(i)
-                    break
-
-        return matches
-
-
-    def _calcBondingBox(self, structure, groupIndices, i, cutoffDistance):
-        x = structure.x_coord_list
-        y = structure.y_coord_list
-        z = structure.z_coord_list
-
-        xMin = -float('inf')
-        xMax = float('inf')
-        yMin = -float('inf')
-        yMax = float('inf')
-        zMin = -float('inf')
-        zMax = float('inf')
-
-        first = groupIndices[i]
-        last = groupIndices[i+1]
-
-        for i in range(first, last):
-            xMin = min(xMin, x[i])
-            xMax = max(xMax, x[i])
-            yMin = min(yMin, y[i])
-            yMax = max(yMax, y[i])
-            zMin = min(zMin, z[i])
-            zMax = max(zMax, z[i])
-
-        boundingBox = [0]*6
-        boundingBox[0] = float(xMin - cutoffDistance)
-        boundingBox[1] = float(xMax + cutoffDistance)
-        boundingBox[2] = float(yMin - cutoffDistance)
-        boundingBox[3] = float(yMax + cutoffDistance)
-        boundingBox[4] = float(zMin - cutoffDistance)
-        boundingBox[5] = float(zMax + cutoffDistance)
-
-        return boundingBox
-
-
-    def _getGroupIndices(self, structure):
-        groupIndices = [0]
-        groupNames = []
-
-        atomCounter = 0
-        groupCounter = 0
-        numChains = structure.chains_per_model[0]
-
-        for i in range(numChains):
-
-            for j in range(structure.groups_per_chain[i]):
-                groupIndex = structure.group_type_list[groupCounter]
-                groupNames.append(structure.group_list[groupIndex]['groupName'])
-                atomCounter += len(structure.group_list[group_Index]['atomNameList'])
-                groupIndices.append(atomCounter)
-                groupCounter += 1
-
-        return groupIndices, groupNames
+    def getBatch(self, t):
+        '''Returns the interacting residues of a structure as a column batch
+        of structureId, residue1, index1, residue2, index2 and distance
+        '''
+        structureId = t[0]
+        cs = getColumnarStructure(t[1])
+
+        groupNames = cs.get_group_property('groupName')
+        atomToGroup = cs.get_atom_to_group_indices()
+        isQuery = np.isin(groupNames, self.groupNames)
+        queryAtoms = np.flatnonzero(isQuery[atomToGroup])
+
+        if len(queryAtoms) == 0:
+            return _emptyBatch()
+
+        index = SpatialIndex(cs.get_coords(), self.cutoffDistance)
+        q, atoms, distances = index.query_radius(index.coords[queryAtoms], self.cutoffDistance,
+                                                 return_distance=True)
+        atoms1 = queryAtoms[q]
+        groups1, groups2 = atomToGroup[atoms1], atomToGroup[atoms]
+
+        # Pairs of two specified groups are found from both groups, keep
+        # them in one direction
+        keep = (groups1 < groups2) | ((groups1 != groups2) & ~isQuery[groups2])
+        if self.excludeSameResidue:
+            keep &= groupNames[groups1] != groupNames[groups2]
+        if self.excludeSameChain:
+            chainNames = cs.get_chain_names()
+            keep &= chainNames[atoms1] != chainNames[atoms]
+
+        # Minimum distance of each residue pair: sort the atom pairs by
+        # residue pair and distance, and keep the first of each residue pair
+        pairs = groups1[keep].astype(np.int64) * len(groupNames) + groups2[keep]
+        distances = distances[keep]
+        order = np.lexsort((distances, pairs))
+        pairs, first = np.unique(pairs[order], return_index=True)
+        distances = distances[order][first]
+
+        index1, index2 = pairs // len(groupNames), pairs % len(groupNames)
+
+        return [[structureId] * len(pairs),
+                groupNames[index1].tolist(),
+                index1.astype(np.int32),
+                groupNames[index2].tolist(),
+                index2.astype(np.int32),
+                distances.astype(np.float32)]
+
+
+def _emptyBatch():
+    # Column batch without interactions
+    return [[], [], np.zeros(0, dtype=np.int32),
+            [], np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)]
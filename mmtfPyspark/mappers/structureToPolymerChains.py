@@ -12,9 +12,11 @@ Authorship information:
     __email__ = "marshuang80@gmail.com:
     __status__ = "debug"
 '''
+import numpy as np
 from mmtf.utils import *
 from mmtf.api.mmtf_writer import MMTFEncoder
 from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.utils.columnarStructure import getColumnarStructure
 
 class structureToPolymerChains(object):
     '''
@@ -42,9 +44,11 @@ class structureToPolymerChains(object):
             structure = t[1]
 
         # Precalculate indices
-        numChains = structure.chains_per_model[0]
-        chainToEntityIndex = self._getChainToEntityIndex(structure)
-        atomsPerChain, bondsPerChain = self._getNumAtomsAndBonds(structure)
+        cs = getColumnarStructure(structure)
+        numChains = cs.get_num_chains()
+        chainToEntityIndex = cs.get_chain_to_entity_index()
+        chainPolymer = cs.is_polymer_chain()
+        atomsPerChain, bondsPerChain = self._getNumAtomsAndBonds(structure, cs)
 
         chainList = list()
         seqSet = set()
@@ -56,9 +60,7 @@ class structureToPolymerChains(object):
 
             entityToChainIndex = chainToEntityIndex[i]
 
-            chain_type = [chain['type'] for chain in structure.entity_list
-                         if i in chain['chainIndexList']][0]
-            polymer = chain_type == "polymer"
+            polymer = chainPolymer[i]
             polymerAtomCount = 0
 
             atomMap = {}
@@ -158,35 +160,14 @@ class structureToPolymerChains(object):
         return chainList
 
 
-    def _getNumAtomsAndBonds(self, structure):
+    def _getNumAtomsAndBonds(self, structure, cs):
         '''Gets the number of atoms and bonds per chain
         '''
-        numChains = structure.chains_per_model[0]
-        atomsPerChain = [0] * numChains
-        bondsPerChain = [0] * numChains
-        groupCounter = 0
-
-        for i in range(numChains):
-
-            for j in range(structure.groups_per_chain[i]):
-                groupIndex = structure.group_type_list[groupCounter]
-                atomsPerChain[i] = len(structure.group_list[groupIndex]['atomNameList'])
-                bondsPerChain[i] = len(structure.group_list[groupIndex]['bondOrderList'])
-                groupCounter += 1
-
-        return atomsPerChain, bondsPerChain
-
-
-    def _getChainToEntityIndex(self, structure):
-        '''Returns an list that maps a chain index to an entity index.
-        Args:
-            structureDataInterFace
-        '''
-        entityChainIndex = [0] * structure.num_chains
-
-        for i in range(len(structure.entity_list)):
-
-            for j in structure.entity_list[i]["chainIndexList"]:
-                entityChainIndex[j] = i
-
-        return entityChainIndex
+        bondsPerType = np.array([len(group['bondOrderList']) for group in structure.group_list],
+                                dtype=np.int64)
+        bondsPerChain = np.bincount(cs.get_group_to_chain_indices(),
+                                    weights=bondsPerType[cs.get_group_types()],
+                                    minlength=cs.get_num_chains())
+        atomsPerChain = np.diff(cs.get_chain_to_atom_indices())
+
+        return atomsPerChain.tolist(), bondsPerChain.astype(np.int64).tolist()
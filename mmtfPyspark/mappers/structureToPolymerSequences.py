@@ -9,6 +9,8 @@ Authorship information:
     __status__ = "Done"
 
 '''
+from mmtfPyspark.utils.columnarStructure import getColumnarStructure
+
 
 class structureToPolymerSequences(object):
     '''This mapper maps a structure to it's polypeptides, polynucleotide chain sequences.
@@ -36,10 +38,12 @@ class structureToPolymerSequences(object):
         sequences = list()
         seqSet = set()
 
-        chainToEntityIndex = self._getChainToEntityIndex(structure)
+        cs = getColumnarStructure(structure)
+        chainToEntityIndex = cs.get_chain_to_entity_index()
+        chainPolymer = cs.is_polymer_chain()
 
-        for i in range(structure.chains_per_model[0]):
-            polymer = structure.entity_list[i]['type'] == 'polymer'
+        for i in range(cs.get_num_chains()):
+            polymer = chainPolymer[i]
 
             if polymer:
                 key = t[0]
@@ -60,15 +64,3 @@ class structureToPolymerSequences(object):
             return list(set(sequences))
 
         return sequences
-
-
-
-    def _getChainToEntityIndex(self, structure):
-        entityChainIndex = [0]*structure.num_chains
-
-        for i in range(len(structure.entity_list)):
-
-            for j in structure.entity_list[i]['chainIndexList']:
-                entityChainIndex[j] = i
-
-        return entityChainIndex
@@ -4,6 +4,12 @@ structureToProteinDimers.py:
 
 Maps a structure to its protein dimers
 
+Contacts between the protein chains of the first model are found with one
+spatial index (see utils.spatialIndex) over the C-beta atoms, or all atoms,
+of the chains, and counted per chain pair with numpy array operations. The
+two chains of a dimer are only copied into a new structure for the chain
+pairs with enough contacts.
+
 Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
     __maintainer__ = "Mars (Shih-Cheng) Huang"
@@ -13,16 +19,34 @@ Authorship information:
 
 from mmtf.utils import *
 from mmtf.api.mmtf_writer import MMTFEncoder
-import itertools
-from sympy import Point3D
-from mmtfPyspark.utils import distanceBox
-import time
+from mmtfPyspark.utils.columnarStructure import getColumnarStructure
+from mmtfPyspark.utils.spatialIndex import SpatialIndex
 import numpy as np
 import math
 
+_PEPTIDE_LINKING = ["L-PEPTIDE LINKING", "PEPTIDE LINKING"]
+
+# Tolerance of the distance (in Angstrom) and angle (in radians) between the
+# vectors of the chain centers of two dimers that are the same for exclusive,
+# also the cell size of the hash of these vectors
+_TOLERANCE = 0.1
+_NEIGHBOR_OFFSETS = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]
+
 class structureToProteinDimers(object):
     '''
-    Maps a protein structure to it's protein dimers
+    Maps a protein structure to it's protein dimers. Two protein chains form
+    a dimer if more than the specified number of contacts, pairs of atoms
+    within the cutoff distance, are found between them. Each atom is counted
+    in at most one contact.
+
+    Attributes:
+        cutoffDistance (float): maximum distance of the atoms in a contact
+        contacts (int): a dimer has more than this number of contacts
+        useAllAtoms (bool): use all atoms for contacts, otherwise only the
+                            C-beta atoms
+        exclusive (bool): if true, only return one of the dimers of the same
+                          entities with the same distance and orientation
+                          between the chain centers
     '''
 
     def __init__(self, cutoffDistance = 8.0, contacts = 20, useAllAtoms = False, exclusive = False):
@@ -34,478 +58,280 @@ class structureToProteinDimers(object):
 
     def __call__(self, t):
         structure = t[1]
+        cs = getColumnarStructure(structure)
 
-        # split structure into a list of chains
-        chains = self._splitToChains(structure)
-        chainVectors = self._getChainVectors(chains)
+        chains = self._getProteinChains(cs)
+        chainVectors = self._getChainVectors(cs)
+        dimers = self._getContactPairs(cs, chains)
         resList = []
 
-        if self.useAllAtoms:
-            boxes = self._getAllAtomsDistanceBoxes(chains, self.cutoffDistance)
-        else:
-            boxes = self._getCBetaAtomsDistanceBoxes(chains, self.cutoffDistance)
-
-        self.exclusiveHashSet = np.empty([0,3])
+        chainToEntity = cs.get_chain_to_entity_index()
+        self.exclusiveHashSet = {}
 
-        for i in range(len(chains)):
+        # Chain pairs in the order of the first chain, then the second chain
+        for i, j in dimers:
 
-            j = 0
+            if self.exclusive:
 
-            while j < i:
+                newVec = chainVectors[i] - chainVectors[j]
+                entities = (int(chainToEntity[i]), int(chainToEntity[j]))
 
-                if self._checkPair(boxes[i], boxes[j], chains[i], chains[j], self.cutoffDistance, self.contacts):
+                if not self._checkList(newVec, entities, self.exclusiveHashSet):
 
-                    if self.exclusive:
+                    resList.append(self._combineChains(structure, cs, i, j))
 
-                        newVec = chainVectors[i] - chainVectors[j]
-                        if not self._checkList(newVec, self.exclusiveHashSet):
+                    self._addToList(newVec, entities, self.exclusiveHashSet)
 
-                            resList.append(self._combineChains(chains[i], chains[j]))
+            else: resList.append(self._combineChains(structure, cs, i, j))
 
-                            self.exclusiveHashSet = np.append(self.exclusiveHashSet, [newVec], axis = 0)
-
-                        '''
-                        es1 = chains[i].entity_list[self._getChainToEntityIndex(chains[i])[0]]["sequence"]
-                        es2 = chains[j].entity_list[self._getChainToEntityIndex(chains[j])[0]]["sequence"]
+        return resList
 
-                        newTuple1 = (es1, es2)
-                        newTuple2 = (es2, es1)
 
-                        if (newTuple1 not in self.exclusiveHashSet) and (newTuple2 not in self.exclusiveHashSet):
-                            print(newTuple1)
-                            resList.append(self._combineChains(chains[i], chains[j]))
-                            exclusiveHashSet.add(newTuple1)
-                            exclusiveHashSet.add(newTuple2)
-                        '''
+    def _hashKeys(self, vec, entities, neighbors = False):
+        '''Returns the key of the hash cell of an interface, the entity pair
+        and the cell of the vector between the chain centers, or the keys of
+        the cell and its neighbor cells
+        '''
+        cell = np.floor(vec / _TOLERANCE).astype(np.int64)
+        offsets = _NEIGHBOR_OFFSETS if neighbors else [(0, 0, 0)]
 
-                    else: resList.append(self._combineChains(chains[i], chains[j]))
+        return [entities + tuple((cell + offset).tolist()) for offset in offsets]
 
-                j += 1
 
-        return resList
+    def _addToList(self, vec, entities, exclusiveHashSet):
+        '''Adds the vector between the chain centers of a dimer to the hash
+        '''
+        key = self._hashKeys(vec, entities)[0]
+        exclusiveHashSet.setdefault(key, []).append(vec)
 
 
-    def _checkList(self, vec, exclusiveList):
+    def _checkList(self, vec, entities, exclusiveHashSet):
+        '''Returns true if a dimer of the same entities with the same
+        vector between the chain centers, within the tolerance, is in the
+        hash. A dimer with the chains in reverse order has the opposite vector.
+        Vectors within the tolerance are in the same or a neighbor cell
+        '''
+        for v, e in [(vec, entities), (-vec, entities[::-1])]:
 
-        for point in exclusiveList:
+            for key in self._hashKeys(v, e, neighbors = True):
 
-            if np.linalg.norm(vec - point) < 0.1 and self._angle(vec, point) < 0.1: return True
-            vec = vec * -1
+                for point in exclusiveHashSet.get(key, []):
 
-            if np.linalg.norm(vec - point) < 0.1 and self._angle(vec, point) < 0.1: return True
-            vec = vec * -1
+                    if np.linalg.norm(v - point) < _TOLERANCE and self._angle(v, point) < _TOLERANCE: return True
 
         return False
 
 
     def _angle(self, a, b):
 
-      arccosInput = np.dot(a,b)/np.linagl.norm(a)/np.linagl.norm(b)
-      arccosInput = 1.0 if arccosInput > 1.0 else arccosInput
-      arccosInput = -1.0 if arccosInput < -1.0 else arccosInput
-
-      return math.acos(arccosInput)
-
-
-    def _getChainVectors(self, chains):
-
-        chainVectors = []
-
-        for chain in chains:
-
-            chainVectors.append(self._calcAverageVec(chain))
-
-        return chainVectors
-
-
-    def _calcAverageVec(self, s1):
-
-        totX, totY, totZ = 0, 0, 0
-
-        for i in range(s1.num_atoms): # TODO double check num atoms
-
-            totX += s1.x_coord_list[i]
-            totY += s1.y_coord_list[i]
-            totZ += s1.z_coord_list[i]
-
-        return np.array([totX/s1.num_atoms, totY/s1.num_atoms, totZ/s1.num_atoms])
-
-
-    def _distance(self, s1, s2, index1, index2):
+        norms = np.linalg.norm(a) * np.linalg.norm(b)
+        if norms == 0: return 0.0
 
-        xCoord = s1.x_coord_list[index1]
-        yCoord = s1.y_coord_list[index1]
-        zCoord = s1.z_coord_list[index1]
+        arccosInput = np.dot(a,b)/norms
+        arccosInput = 1.0 if arccosInput > 1.0 else arccosInput
+        arccosInput = -1.0 if arccosInput < -1.0 else arccosInput
 
-        newPoint1 = Point3D(xCoord, yCoord, zCoord)
+        return math.acos(arccosInput)
 
-        xCoord = s2.x_coord_list[index2]
-        yCoord = s2.y_coord_list[index2]
-        zCoord = s2.z_coord_list[index2]
 
-        newPoint2 = Point3D(xCoord, yCoord, zCoord)
-
-        return newPoint1.distance(newPoint2)
-
-    def _checkPair(self, box1, box2, s1, s2, cutoffDistance, contacts):
-
-        pointsInBox2 = box1.getIntersection(box2)
-        pointsInBox1 = box2.getIntersection(box1)
-
-        hs1, hs2 = set(), set()
-
-        num = 0
-
-        for i in range(len(pointsInBox2)):
-
-            for j in range(len(pointsInBox1)):
-
-                if (i in hs1) or (j in hs2): continue
-
-                if self._distance(s1, s2, pointsInBox2[i], pointsInBox1[j]) < cutoffDistance :
-
-                    num += 1
-                    hs1.add(i)
-                    hs2.add(j)
-
-                if num > contacts: return True
-
-        return False
-
-
-    def _getCBetaAtomsDistanceBoxes(self, chains, cutoffDistance):
-        '''Get distance boxes for all atoms
+    def _getProteinChains(self, cs):
+        '''Returns the indices of the chains of polymer entities where all
+        groups are peptide linking
         '''
-        distanceBoxes = []
-
-        for i in range(len(chains)):
-
-            tmp = chains[i]
-            newbox = distanceBox(cutoffDistance)
-            groupIndex = 0
-            atomIndex = 0
-
-            for k in range(tmp.groups_per_chain[0]):
-                groupType = tmp.group_type_list[groupIndex]
-
-                for m in range(len(tmp.group_list[groupType]["formalChargeList"])):
-
-                    atomName = tmp.group_list[groupType]["atomNameList"][m]
-
-                    if atomName == "CB":
-
-                        xCoord = tmp.x_coord_list[atomIndex]
-                        yCoord = tmp.y_coord_list[atomIndex]
-                        zCoord = tmp.z_coord_list[atomIndex]
-
-                        newPoint = Point3D(xCoord, yCoord, zCoord)
-
-                        newbox.addPoint(newPoint, atomIndex)
-
-                    atomIndex += 1
+        groupToChain = cs.get_group_to_chain_indices()
+        peptide = np.isin(cs.get_group_property('chemCompType'), _PEPTIDE_LINKING)
+        mismatches = np.bincount(groupToChain[~peptide], minlength=cs.get_num_chains())
 
-                groupIndex += 1
+        return np.flatnonzero(cs.is_polymer_chain() & (mismatches == 0))
 
-            distanceBoxes.append(newbox)
 
-        return distanceBoxes
-
-
-    def _getAllAtomsDistanceBoxes(self, chains, cutoffDistance):
-        '''Get distance boxes for all atoms
+    def _getChainVectors(self, cs):
+        '''Returns the average coordinates of the atoms of each chain
         '''
-        distanceBoxes = []
-
-        for i in range(len(chains)):
-
-            tmp = chains[i]
-            newbox = distanceBox(cutoffDistance)
-
-            for j in range(tmp.num_atoms):
-
-                xCoord = tmp.x_coord_list[j]
-                yCoord = tmp.y_coord_list[j]
-                zCoord = tmp.z_coord_list[j]
-
-                newPoint = Point3D(xCoord, yCoord, zCoord)
+        chainToAtom = cs.get_chain_to_atom_indices()
+        coords = cs.get_coords().astype(np.float64)
+        counts = np.diff(chainToAtom)
 
-                newbox.addPoint(newPoint, j)
+        totals = np.zeros((len(counts), 3))
+        nonEmpty = counts > 0
+        totals[nonEmpty] = np.add.reduceat(coords, chainToAtom[:-1][nonEmpty], axis=0)
 
-            distanceBoxes.append(newbox)
+        return totals / np.maximum(counts, 1)[:, np.newaxis]
 
-        return distanceBoxes
 
-
-    def _splitToChains(self, s):
-        '''split structure to a list of chains
+    def _getContactPairs(self, cs, chains):
+        '''Returns the pairs (i, j) of chain indices, with i > j, that have
+        more than the specified number of contacts, ordered by i, then j
         '''
-        chains = []
-        numChains = s.chains_per_model[0]
-
-        chainToEntityIndex = self._getChainToEntityIndex(s)
-        atomsPerChain, bondsPerChain = self._getNumAtomsAndBonds(s)
-
-        groupCounter = 0
-        atomCounter = 0
-
-        for i in range(numChains):
-            atomMap = {}
-            newChain = MMTFEncoder()
-            entityToChainIndex = chainToEntityIndex[i]
-
-            structureId = s.structure_id + '.' +\
-                            s.chain_name_list[i] + '.' +\
-                            s.chain_id_list[i] + '.' +\
-                            str(entityToChainIndex + 1)
-
-            # Set header
-            newChain.init_structure(bondsPerChain[i],
-                                    atomsPerChain[i],
-                                    s.groups_per_chain[i],
-                                    1, 1, structureId)
-            decoder_utils.add_xtalographic_info(s, newChain)
-            decoder_utils.add_header_info(s, newChain)
+        atomToChain = cs.get_atom_to_chain_indices()
+        selected = np.isin(atomToChain, chains)
+        if not self.useAllAtoms:
+            selected &= cs.get_atom_names() == "CB"
 
-            # Set model info (only one model: 0)
-            newChain.set_model_info(0,1)
+        atoms = np.flatnonzero(selected)
+        atomChains = atomToChain[atoms]
 
-            # Set entity and chain info
-            newChain.set_entity_info([0],
-                                     s.entity_list[entityToChainIndex]['sequence'],
-                                     s.entity_list[entityToChainIndex]['description'],
-                                     s.entity_list[entityToChainIndex]['type'])
+        index = SpatialIndex(cs.get_coords()[atoms], self.cutoffDistance)
+        first, second, distances = index.query_pairs(self.cutoffDistance, return_distance=True)
 
-            newChain.set_chain_info(s.chain_id_list[i],
-                                    s.chain_name_list[i],
-                                    s.groups_per_chain[i])
+        # Atoms are ordered by chain, the second atom of a pair between two
+        # chains is in the chain with the larger index
+        keep = (atomChains[first] != atomChains[second]) & (distances < self.cutoffDistance)
+        first, second = first[keep], second[keep]
 
-            for j in range(s.groups_per_chain[i]):
-                groupIndex = s.group_type_list[groupCounter]
-                #print(s.group_type_list)
+        numChains = cs.get_num_chains()
+        pairs = atomChains[second].astype(np.int64) * numChains + atomChains[first]
 
-                # Set group info
-                newChain.set_group_info(s.group_list[groupIndex]['groupName'],
-                                        s.group_id_list[groupCounter],
-                                        s.ins_code_list[groupCounter],
-                                        s.group_list[groupIndex]['chemCompType'],
-                                        len(s.group_list[groupIndex]['atomNameList']),
-                                        len(s.group_list[groupIndex]['bondOrderList']),
-                                        s.group_list[groupIndex]['singleLetterCode'],
-                                        s.sequence_index_list[groupCounter],
-                                        s.sec_struct_list[groupCounter])
+        # Each atom is used in at most one contact, so a chain pair can't
+        # have more contacts than atoms in contact on either chain
+        candidates = pairs[self._countAtoms(pairs, first) > self.contacts]
+        candidates = np.intersect1d(candidates, pairs[self._countAtoms(pairs, second) > self.contacts])
 
-                for k in range(len(s.group_list[groupIndex]['atomNameList'])):
-                    newChain.set_atom_info(s.group_list[groupIndex]['atomNameList'][k],
-                                           s.atom_id_list[atomCounter],
-                                           s.alt_loc_list[atomCounter],
-                                           s.x_coord_list[atomCounter],
-                                           s.y_coord_list[atomCounter],
-                                           s.z_coord_list[atomCounter],
-                                           s.occupancy_list[atomCounter],
-                                           s.b_factor_list[atomCounter],
-                                           s.group_list[groupIndex]['elementList'][k],
-                                           s.group_list[groupIndex]['formalChargeList'][k])
+        # Contacts sorted by chain pair (i, j), then by the atoms of chain i
+        # and then the atoms of chain j
+        order = np.lexsort((first, second, pairs))
+        pairs, first, second = pairs[order], first[order], second[order]
+        starts = np.searchsorted(pairs, candidates, side='left')
+        ends = np.searchsorted(pairs, candidates, side='right')
 
-                    atomCounter += 1
+        dimers = []
 
-                for l in range(len(s.group_list[groupIndex]['bondOrderList'])):
+        for pair, start, end in zip(candidates.tolist(), starts, ends):
+            if self._countContacts(second[start:end], first[start:end]) > self.contacts:
+                dimers.append((pair // numChains, pair % numChains))
 
-                    bondIndOne = s.group_list[groupIndex]['bondAtomList'][l*2]
-                    bondIndTwo = s.group_list[groupIndex]['bondAtomList'][l*2+1]
-                    bondOrder = s.group_list[groupIndex]['bondOrderList'][l]
+        return dimers
 
-                    #newChain.set_group_bond(bondIndOne, bondIndTwo, bondOrder)
-                    newChain.current_group.bond_atom_list += [bondIndOne, bondIndTwo]
-                    newChain.current_group.bond_order_list.append(bondOrder)
 
-                groupCounter += 1
-
-
-                # TODO skipping adding inter group bond info for now
+    def _countAtoms(self, pairs, atoms):
+        '''Returns the number of different atoms in contacts of the chain pair
+        of each contact
+        '''
+        unique = np.unique(np.stack((pairs, atoms)), axis=1)
+        pairIds, counts = np.unique(unique[0], return_counts=True)
 
-            newChain.finalize_structure()
+        return counts[np.searchsorted(pairIds, pairs)]
 
-            # TODO double check if just getting from chain 0
-            chain_type = [chain['type'] for chain in newChain.entity_list]
 
-            polymer = "polymer" in chain_type
+    def _countContacts(self, atoms1, atoms2):
+        '''Counts the contacts between the atoms of two chains, matching each
+        atom of the first chain with the first unmatched atom in contact of
+        the second chain, where the contacts are sorted by the atoms of the
+        first chain, then the second chain
+        '''
+        used1, used2 = set(), set()
 
+        for i, j in zip(atoms1.tolist(), atoms2.tolist()):
 
-            if polymer:
+            if (i in used1) or (j in used2): continue
 
-                match = True
+            used1.add(i)
+            used2.add(j)
 
-                for j in range(newChain.groups_per_chain[0]):
+            if len(used1) > self.contacts: break
 
-                    #print(newChain.groups_per_chain, newChain.group_type_list)
-                    groupIndex = newChain.group_type_list[j]
+        return len(used1)
 
-                    if match:
-                        _type = newChain.group_list[groupIndex]["chemCompType"]
 
-                        match = (_type == "L-PEPTIDE LINKING") or (_type == "PEPTIDE LINKING")
+    def _getChainId(self, s, cs, chainIndex):
+        '''Returns the structure id of a chain
+        '''
+        entityIndex = cs.get_chain_to_entity_index()[chainIndex]
 
-                if match: chains.append(newChain)
+        return s.structure_id + '.' +\
+               s.chain_name_list[chainIndex] + '.' +\
+               s.chain_id_list[chainIndex] + '.' +\
+               str(entityIndex + 1)
 
-        return chains
 
+    def _combineChains(self, s, cs, chain1, chain2):
 
-    def _combineChains(self, s1, s2):
+        structureId = self._getChainId(s, cs, chain1) + "_append_" +\
+                      self._getChainId(s, cs, chain2)
 
-        groupCounter = 0
-        atomCounter = 0
+        chainToGroup = cs.get_chain_to_group_indices()
+        chainToAtom = cs.get_chain_to_atom_indices()
+        groupTypes = cs.get_group_types()
+        bondsPerGroupType = np.array([len(group['bondOrderList']) for group in s.group_list], dtype=np.int64)
 
-        structureId = s1.structure_id + "_append_" + s2.structure_id
+        numAtoms, numBonds, numGroups = 0, 0, 0
+        for chain in (chain1, chain2):
+            numAtoms += chainToAtom[chain + 1] - chainToAtom[chain]
+            numBonds += bondsPerGroupType[groupTypes[chainToGroup[chain]:chainToGroup[chain + 1]]].sum()
+            numGroups += chainToGroup[chain + 1] - chainToGroup[chain]
 
         combinedStructure = MMTFEncoder()
 
         # Set header
-        combinedStructure.init_structure(s1.num_bonds + s2.num_bonds,
-                                         s1.num_atoms + s2.num_atoms,
-                                         s1.num_groups + s2.num_groups,
+        combinedStructure.init_structure(int(numBonds), int(numAtoms), int(numGroups),
                                          2, 1, structureId)
-        decoder_utils.add_xtalographic_info(s1, combinedStructure)
-        decoder_utils.add_header_info(s1, combinedStructure)
+        decoder_utils.add_xtalographic_info(s, combinedStructure)
+        decoder_utils.add_header_info(s, combinedStructure)
 
         # Set model info (only one model: 0)
         combinedStructure.set_model_info(0,2)
 
-        chainToEntityIndex = self._getChainToEntityIndex(s1)[0]
-
-        # Set entity and chain info
-        combinedStructure.set_entity_info([0],
-                                     s1.entity_list[chainToEntityIndex]['sequence'],
-                                     s1.entity_list[chainToEntityIndex]['description'],
-                                     s1.entity_list[chainToEntityIndex]['type'])
-
-        combinedStructure.set_chain_info(s1.chain_id_list[0],
-                                         s1.chain_name_list[0],
-                                         s1.groups_per_chain[0])
-
-        for i in range(s1.groups_per_chain[0]):
-            groupIndex = s1.group_type_list[groupCounter]
-
-            # Set group info
-            combinedStructure.set_group_info(s1.group_list[groupIndex]['groupName'],
-                                             s1.group_id_list[groupCounter],
-                                             s1.ins_code_list[groupCounter],
-                                             s1.group_list[groupIndex]['chemCompType'],
-                                             len(s1.group_list[groupIndex]['atomNameList']),
-                                             len(s1.group_list[groupIndex]['bondOrderList']),
-                                             s1.group_list[groupIndex]['singleLetterCode'],
-                                             s1.sequence_index_list[groupCounter],
-                                             s1.sec_struct_list[groupCounter])
-
-            for j in range(len(s1.group_list[groupIndex]['atomNameList'])):
-                combinedStructure.set_atom_info(s1.group_list[groupIndex]['atomNameList'][j],
-                                                s1.atom_id_list[atomCounter],
-                                                s1.alt_loc_list[atomCounter],
-                                                s1.x_coord_list[atomCounter],
-                                                s1.y_coord_list[atomCounter],
-                                                s1.z_coord_list[atomCounter],
-                                                s1.occupancy_list[atomCounter],
-                                                s1.b_factor_list[atomCounter],
-                                                s1.group_list[groupIndex]['elementList'][j],
-                                                s1.group_list[groupIndex]['formalChargeList'][j])
-
-                atomCounter += 1
+        self._addChain(combinedStructure, s, cs, chain1, 0)
+        self._addChain(combinedStructure, s, cs, chain2, 1)
 
-            # TODO not sure if we should add bonds like this
-            # TODO bondAtomList == getGroupBondIndices?
-            for k in range(len(s1.group_list[groupIndex]["bondOrderList"])):
-                bondIndOne = s1.group_list[groupIndex]["bondAtomList"][k*2]
-                bondIndTwo = s1.group_list[groupIndex]["bondAtomList"][k*2 + 1]
-                bondOrder = s1.group_list[groupIndex]["bondOrderList"][k]
-                combinedStructure.set_group_bond(bondIndOne, bondIndTwo, bondOrder)
-
-            groupCounter += 1
+        combinedStructure.finalize_structure()
+        return (structureId, combinedStructure)
 
 
-        # Set entity and chain info for s2
-        chainToEntityIndex = self._getChainToEntityIndex(s2)[0]
-        combinedStructure.set_entity_info([1],
-                                     s2.entity_list[chainToEntityIndex]['sequence'],
-                                     s2.entity_list[chainToEntityIndex]['description'],
-                                     s2.entity_list[chainToEntityIndex]['type'])
+    def _addChain(self, combinedStructure, s, cs, chainIndex, newChainIndex):
+        '''Adds the entity, chain, groups and atoms of a chain to a new
+        structure
+        '''
+        entityIndex = cs.get_chain_to_entity_index()[chainIndex]
+        groupCounter = cs.get_chain_to_group_indices()[chainIndex]
+        atomCounter = cs.get_chain_to_atom_indices()[chainIndex]
+        numGroups = s.groups_per_chain[chainIndex]
 
-        combinedStructure.set_chain_info(s2.chain_id_list[0],
-                                         s2.chain_name_list[0],
-                                         s2.groups_per_chain[0])
+        # Set entity and chain info
+        combinedStructure.set_entity_info([newChainIndex],
+                                          s.entity_list[entityIndex]['sequence'],
+                                          s.entity_list[entityIndex]['description'],
+                                          s.entity_list[entityIndex]['type'])
 
-        groupCounter = 0
-        atomCounter = 0
+        combinedStructure.set_chain_info(s.chain_id_list[chainIndex],
+                                         s.chain_name_list[chainIndex],
+                                         numGroups)
 
-        for i in range(s2.groups_per_chain[0]):
-            groupIndex = s2.group_type_list[groupCounter]
+        for i in range(numGroups):
+            groupIndex = s.group_type_list[groupCounter]
+            group = s.group_list[groupIndex]
 
             # Set group info
-            combinedStructure.set_group_info(s2.group_list[groupIndex]['groupName'],
-                                             s2.group_id_list[groupCounter],
-                                             s2.ins_code_list[groupCounter],
-                                             s2.group_list[groupIndex]['chemCompType'],
-                                             len(s2.group_list[groupIndex]['atomNameList']),
-                                             len(s2.group_list[groupIndex]['bondOrderList']),
-                                             s2.group_list[groupIndex]['singleLetterCode'],
-                                             s2.sequence_index_list[groupCounter],
-                                             s2.sec_struct_list[groupCounter])
-
-            for j in range(len(s2.group_list[groupIndex]['atomNameList'])):
-                combinedStructure.set_atom_info(s2.group_list[groupIndex]['atomNameList'][j],
-                                                s2.atom_id_list[atomCounter],
-                                                s2.alt_loc_list[atomCounter],
-                                                s2.x_coord_list[atomCounter],
-                                                s2.y_coord_list[atomCounter],
-                                                s2.z_coord_list[atomCounter],
-                                                s2.occupancy_list[atomCounter],
-                                                s2.b_factor_list[atomCounter],
-                                                s2.group_list[groupIndex]['elementList'][j],
-                                                s2.group_list[groupIndex]['formalChargeList'][j])
+            combinedStructure.set_group_info(group['groupName'],
+                                             s.group_id_list[groupCounter],
+                                             s.ins_code_list[groupCounter],
+                                             group['chemCompType'],
+                                             len(group['atomNameList']),
+                                             len(group['bondOrderList']),
+                                             group['singleLetterCode'],
+                                             s.sequence_index_list[groupCounter],
+                                             s.sec_struct_list[groupCounter])
+
+            for j in range(len(group['atomNameList'])):
+                combinedStructure.set_atom_info(group['atomNameList'][j],
+                                                s.atom_id_list[atomCounter],
+                                                s.alt_loc_list[atomCounter],
+                                                s.x_coord_list[atomCounter],
+                                                s.y_coord_list[atomCounter],
+                                                s.z_coord_list[atomCounter],
+                                                s.occupancy_list[atomCounter],
+                                                s.b_factor_list[atomCounter],
+                                                group['elementList'][j],
+                                                group['formalChargeList'][j])
 
                 atomCounter += 1
 
             # TODO not sure if we should add bonds like this
             # TODO bondAtomList == getGroupBondIndices?
-            for k in range(len(s2.group_list[groupIndex]["bondOrderList"])):
-                bondIndOne = s2.group_list[groupIndex]["bondAtomList"][k*2]
-                bondIndTwo = s2.group_list[groupIndex]["bondAtomList"][k*2 + 1]
-                bondOrder = s2.group_list[groupIndex]["bondOrderList"][k]
+            for k in range(len(group["bondOrderList"])):
+                bondIndOne = group["bondAtomList"][k*2]
+                bondIndTwo = group["bondAtomList"][k*2 + 1]
+                bondOrder = group["bondOrderList"][k]
                 combinedStructure.set_group_bond(bondIndOne, bondIndTwo, bondOrder)
 
             groupCounter += 1
-
-        combinedStructure.finalize_structure()
-        return (structureId, combinedStructure)
-
-
-    def _getNumAtomsAndBonds(self, structure):
-        '''Gets the number of atoms and bonds per chain
-        '''
-        numChains = structure.chains_per_model[0]
-        atomsPerChain = [0] * numChains
-        bondsPerChain = [0] * numChains
-        groupCounter = 0
-
-        for i in range(numChains):
-
-            for j in range(structure.groups_per_chain[i]):
-                groupIndex = structure.group_type_list[groupCounter]
-                atomsPerChain[i] = len(structure.group_list[groupIndex]['atomNameList'])
-                bondsPerChain[i] = len(structure.group_list[groupIndex]['bondOrderList'])
-                groupCounter += 1
-
-        return atomsPerChain, bondsPerChain
-
-
-    def _getChainToEntityIndex(self, structure):
-        '''Returns an list that maps a chain index to an entity index.
-        Args:
-            structureDataInterFace
-        '''
-        entityChainIndex = [0] * structure.num_chains
-
-        for i in range(len(structure.entity_list)):
-
-            for j in structure.entity_list[i]["chainIndexList"]:
-                entityChainIndex[j] = i
-
-        return entityChainIndex
@@ -0,0 +1,247 @@
+#!/user/bin/env python
+'''
+structureToReducedStructure.py:
+
+Maps a structure to its reduced representation, the layout of the reduced
+MMTF files of the MMTF web services: C-alpha atoms of polypeptide groups,
+P atoms of polynucleotide groups, all atoms of other polymer groups and
+ligands, no water. Chains, entities and bioassemblies are kept. Coordinates
+and B-factors are stored with a precision of 0.1, occupancies of 0.1.
+
+Atoms are selected with masks per group type, which are expanded to all
+atoms of a structure at once.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import msgpack
+import numpy as np
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.utils import mmtfCodec
+
+# Codecs of the reduced MMTF format
+REDUCED_CODECS = dict(mmtfCodec.DEFAULT_CODECS,
+                      xCoordList=(10, 10),
+                      yCoordList=(10, 10),
+                      zCoordList=(10, 10),
+                      bFactorList=(10, 10),
+                      occupancyList=(9, 10))
+
+WATER = frozenset(['HOH', 'DOD', 'WAT'])
+
+# Header fields copied to the reduced structure, MMTF key -> attribute
+_HEADER = {'mmtfVersion': 'mmtf_version', 'mmtfProducer': 'mmtf_producer',
+           'structureId': 'structure_id', 'title': 'title',
+           'spaceGroup': 'space_group', 'unitCell': 'unit_cell',
+           'resolution': 'resolution', 'rFree': 'r_free', 'rWork': 'r_work',
+           'releaseDate': 'release_date', 'depositionDate': 'deposition_date',
+           'experimentalMethods': 'experimental_methods',
+           'entityList': 'entity_list', 'bioAssemblyList': 'bio_assembly',
+           'numModels': 'num_models', 'numChains': 'num_chains',
+           'chainsPerModel': 'chains_per_model'}
+
+
+class structureToReducedStructure(object):
+    '''
+    Maps a structure to its reduced representation. The reduced structure
+    keeps its encoded arrays, so it is written with the reduced precision
+    (see MmtfWriter.writeReduced)
+    '''
+
+    def __call__(self, t):
+        return (t[0], reduceStructure(t[1]))
+
+
+def _groupMasks(group, polymer):
+    # Mask of the atoms of a group type kept in the reduced representation
+    atomNames = group['atomNameList']
+
+    if group['groupName'] in WATER:
+        return np.zeros(len(atomNames), dtype=bool)
+
+    if polymer:
+        chemCompType = group['chemCompType'].upper()
+        if 'PEPTIDE' in chemCompType:
+            mask = np.array([name == 'CA' for name in atomNames], dtype=bool)
+        elif 'DNA' in chemCompType or 'RNA' in chemCompType:
+            mask = np.array([name == 'P' for name in atomNames], dtype=bool)
+        else:
+            mask = np.zeros(len(atomNames), dtype=bool)
+
+        if mask.any():
+            return mask
+
+    return np.ones(len(atomNames), dtype=bool)
+
+
+def _groupInfo(structure):
+    # Group type, polymer flag, atom start and atom count of each group
+    groupTypes = np.asarray(structure.group_type_list, dtype=np.int64)
+    atomsPerType = np.array([len(g['atomNameList']) for g in structure.group_list], dtype=np.int64)
+    atomCounts = atomsPerType[groupTypes]
+    atomStarts = np.concatenate(([0], np.cumsum(atomCounts)[:-1])).astype(np.int64)
+
+    # Chains of polymer entities
+    polymerChains = np.zeros(structure.num_chains, dtype=bool)
+    for entity in structure.entity_list:
+        if entity['type'] == 'polymer':
+            chains = np.asarray(entity['chainIndexList'], dtype=np.int64)
+            chains = chains[chains < structure.num_chains]
+            polymerChains[chains] = True
+
+    # Entity chain indices refer to the first model, other models repeat them
+    chainsPerModel = np.asarray(structure.chains_per_model, dtype=np.int64)
+    chainInModel = np.arange(structure.num_chains) - np.repeat(np.cumsum(chainsPerModel) - chainsPerModel,
+                                                               chainsPerModel)
+    polymerChains = polymerChains[chainInModel]
+
+    groupChain = np.repeat(np.arange(structure.num_chains), structure.groups_per_chain)
+    polymer = polymerChains[groupChain]
+
+    return groupTypes, polymer, atomStarts, atomCounts
+
+
+def getReducedAtomIndices(structure):
+    '''
+    Returns the indices of the atoms of a structure that are kept in its
+    reduced representation
+
+    Attributes:
+        structure (mmtfStructure): full structure
+    Returns:
+        sorted int32 array of atom indices
+    '''
+
+    groupTypes, polymer, atomStarts, atomCounts = _groupInfo(structure)
+    return np.flatnonzero(_selectAtoms(structure, groupTypes, polymer, atomStarts, atomCounts)[0]).astype(np.int32)
+
+
+def _selectAtoms(structure, groupTypes, polymer, atomStarts, atomCounts):
+    # Masks of all group types in both contexts, concatenated into one table
+    # indexed by the offset of (group type, polymer) and the atom in the group
+    numTypes = len(structure.group_list)
+    masks = [_groupMasks(g, False) for g in structure.group_list] + \
+            [_groupMasks(g, True) for g in structure.group_list]
+    sizes = np.array([len(m) for m in masks], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    table = np.concatenate(masks) if len(masks) > 0 else np.zeros(0, dtype=bool)
+
+    maskIndex = groupTypes + numTypes * polymer
+    numAtoms = int(atomCounts.sum())
+    atomInGroup = np.arange(numAtoms) - np.repeat(atomStarts, atomCounts)
+    atomMask = table[np.repeat(offsets[maskIndex], atomCounts) + atomInGroup]
+
+    return atomMask, masks, maskIndex
+
+
+def _reducedGroup(group, mask):
+    # Group type with the atoms of the mask and the bonds between them
+    if mask.all():
+        return dict(group)
+
+    newIndex = np.cumsum(mask) - 1
+    bondAtoms = np.asarray(group['bondAtomList'], dtype=np.int64).reshape(-1, 2)
+    keep = mask[bondAtoms].all(axis=1) if len(bondAtoms) > 0 else np.zeros(0, dtype=bool)
+
+    return {'groupName': group['groupName'],
+            'atomNameList': [x for x, m in zip(group['atomNameList'], mask) if m],
+            'elementList': [x for x, m in zip(group['elementList'], mask) if m],
+            'formalChargeList': [x for x, m in zip(group['formalChargeList'], mask) if m],
+            'bondAtomList': newIndex[bondAtoms[keep]].ravel().tolist(),
+            'bondOrderList': [x for x, k in zip(group['bondOrderList'], keep) if k],
+            'singleLetterCode': group['singleLetterCode'],
+            'chemCompType': group['chemCompType']}
+
+
+def reduceStructure(structure, returnAtomIndices=False):
+    '''
+    Returns the reduced representation of a structure
+
+    Attributes:
+        structure (mmtfStructure): full structure
+        returnAtomIndices (bool): if true, also return the indices of the
+                                  retained atoms in the full structure
+    Returns:
+        lazily decoded mmtfStructure with reduced precision encoded arrays,
+        and the sorted int32 atom indices if returnAtomIndices is true
+    '''
+
+    groupTypes, polymer, atomStarts, atomCounts = _groupInfo(structure)
+    atomMask, masks, maskIndex = _selectAtoms(structure, groupTypes, polymer, atomStarts, atomCounts)
+    indices = np.flatnonzero(atomMask).astype(np.int32)
+
+    # Groups with retained atoms, and their reduced group types
+    if len(atomStarts) > 0:
+        keptAtoms = np.add.reduceat(atomMask.astype(np.int64), atomStarts)
+        keptGroups = np.flatnonzero((keptAtoms > 0) & (atomCounts > 0))
+    else:
+        keptGroups = atomStarts
+    newTypes, newTypeIndex = np.unique(maskIndex[keptGroups], return_inverse=True)
+    groupList = [_reducedGroup(structure.group_list[t % len(structure.group_list)], masks[t])
+                 for t in newTypes.tolist()]
+
+    groupChain = np.repeat(np.arange(structure.num_chains), structure.groups_per_chain)
+    groupsPerChain = np.bincount(groupChain[keptGroups], minlength=structure.num_chains)
+
+    # Inter-group bonds between retained atoms
+    fullToReduced = np.full(int(atomCounts.sum()), -1, dtype=np.int64)
+    fullToReduced[indices] = np.arange(len(indices))
+    bondAtoms = np.asarray(structure.bond_atom_list if structure.bond_atom_list is not None else [],
+                           dtype=np.int64).reshape(-1, 2)
+    bondOrders = np.asarray(structure.bond_order_list if structure.bond_order_list is not None else [],
+                            dtype=np.int64)
+    keep = (fullToReduced[bondAtoms] >= 0).all(axis=1) if len(bondAtoms) > 0 else np.zeros(0, dtype=bool)
+    bondAtoms = fullToReduced[bondAtoms[keep]].ravel()
+    bondOrders = bondOrders[keep] if len(bondOrders) == len(keep) else bondOrders[:0]
+
+    groupBonds = np.array([len(g['bondOrderList']) for g in groupList], dtype=np.int64)
+    numBonds = int(groupBonds[newTypeIndex].sum()) + len(bondOrders)
+
+    def encode(key, values):
+        codec, param = REDUCED_CODECS[key]
+        return mmtfCodec.encode_array(values, codec, param)
+
+    def atoms(name):
+        return np.asarray(getattr(structure, name))[indices]
+
+    def groups(name):
+        return np.asarray(getattr(structure, name))[keptGroups]
+
+    data = {'numAtoms': len(indices),
+            'numGroups': len(keptGroups),
+            'numBonds': numBonds,
+            'groupsPerChain': groupsPerChain.tolist(),
+            'groupList': groupList,
+            'groupTypeList': encode('groupTypeList', newTypeIndex),
+            'groupIdList': encode('groupIdList', groups('group_id_list')),
+            'insCodeList': encode('insCodeList', groups('ins_code_list')),
+            'secStructList': encode('secStructList', groups('sec_struct_list')),
+            'sequenceIndexList': encode('sequenceIndexList', groups('sequence_index_list')),
+            'chainIdList': encode('chainIdList', np.asarray(structure.chain_id_list)),
+            'chainNameList': encode('chainNameList', np.asarray(structure.chain_name_list)),
+            'xCoordList': encode('xCoordList', atoms('x_coord_list')),
+            'yCoordList': encode('yCoordList', atoms('y_coord_list')),
+            'zCoordList': encode('zCoordList', atoms('z_coord_list')),
+            'bFactorList': encode('bFactorList', atoms('b_factor_list')),
+            'occupancyList': encode('occupancyList', atoms('occupancy_list')),
+            'atomIdList': encode('atomIdList', atoms('atom_id_list')),
+            'altLocList': encode('altLocList', atoms('alt_loc_list')),
+            'bondAtomList': encode('bondAtomList', bondAtoms),
+            'bondOrderList': encode('bondOrderList', bondOrders)}
+
+    for key, attribute in _HEADER.items():
+        value = getattr(structure, attribute, None)
+        if value is not None:
+            data[key] = value
+
+    # Same representation as an unpacked MMTF file, e.g. bytes strings
+    data = msgpack.unpackb(msgpack.packb(data), raw=True)
+    reduced = mmtfStructure(data, lazy=True)
+
+    if returnAtomIndices:
+        return reduced, indices
+    return reduced
@@ -2,50 +2,220 @@
 '''
 pythonRDDToDataset.py:
 
-This class converts a PythonRDD<Row> to a Dataset<Row>. This method only
-supports simple data types and all data need to be not null.
+This class converts a PythonRDD<Row> to a Dataset<Row>, given an explicit
+schema, so no Spark job is run to infer the column types.
+
+Rows are collected into column batches per partition, or mappers yield
+column batches directly (see getDatasetFromBatches). If pyarrow is
+installed and Spark provides DataFrame.mapInArrow (Spark 3.3 or later),
+each column batch is converted to an Arrow record batch on the workers and
+passed to Spark with mapInArrow, instead of converting every row to a
+Spark row in Python.
+
+Columns of a batch are lists, or numpy arrays for numeric columns. Array
+and vector columns can be two dimensional numpy arrays with one row per
+value. None values are supported in nullable columns.
 
 Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
     __maintainer__ = "Mars (Shih-Cheng) Huang"
     __email__ = "marshuang80@gmail.com:
-    __status__ = "debug"
+    __status__ = "Done"
 '''
 
+import numpy as np
 from pyspark.sql.types import *
-from pyspark.sql import SparkSession
+from pyspark.sql import SparkSession, DataFrame
+from pyspark.ml.linalg import Vector, Vectors, VectorUDT
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# True if batches can be converted with Arrow
+ARROW_AVAILABLE = pa is not None and hasattr(DataFrame, 'mapInArrow')
 
-def getDataset(data, colNames):
+DEFAULT_BATCH_SIZE = 10000
+
+
+def getSchema(colNames, types, nullable=False):
     '''
-    Converts a PythonRDD<Row> to a Dataset<Row>. This method only
-	supports simple data types and all data need to be not null.
+    Returns a schema of columns with the given names and types
 
     Attributes:
-        data (PythonRDD): PythonRDD of row objects
+        colNames (list(str)): names of the columns
+        types (list(DataType)): Spark SQL data types of the columns, e.g.
+                                StringType(), ArrayType(FloatType()) or
+                                VectorUDT()
+        nullable (bool or list(bool)): true if columns may contain None
+    '''
+
+    if len(types) != len(colNames):
+        raise Exception("colNames length does not match types length")
+
+    if isinstance(nullable, bool):
+        nullable = [nullable] * len(colNames)
+
+    return StructType([StructField(name, dataType, n)
+                       for name, dataType, n in zip(colNames, types, nullable)])
+
+
+def getDataset(data, colNames, schema=None, batchSize=DEFAULT_BATCH_SIZE):
+    '''
+    Converts a PythonRDD<Row> to a Dataset<Row>. Without a schema, the
+    column types are inferred from the first row, which runs an extra Spark
+    job and requires values that are not None
+
+    Attributes:
+        data (PythonRDD): PythonRDD of row objects or tuples
         colNames (list(str)): names of the columns in a row
+        schema (StructType): schema of the rows (see getSchema)
+        batchSize (int): maximum number of rows per column batch
     '''
 
-    row = data.first()
-    length = len(row)
+    if schema is None:
+        schema = getSchema(colNames, [_inferType(o) for o in data.first()])
+
+    if len(schema.fields) != len(colNames):
+        raise Exception("colNames length does not match schema length")
 
-    if length != len(colNames):
-        raise Exception("colNames length does not match row length")
+    schema = StructType([StructField(name, f.dataType, f.nullable)
+                         for name, f in zip(colNames, schema.fields)])
 
-    sf = []
+    batches = data.mapPartitions(lambda rows: _toBatches(rows, len(colNames), batchSize))
+    return getDatasetFromBatches(batches, schema)
 
-    for i in range(len(colNames)):
-        o = row[i]
-        if type(o) == str:
-            sf.append(StructField(colNames[i], StringType(), False))
-        elif type(o) == int:
-            sf.append(StructField(colNames[i], IntegerType(), False))
-        elif type(o) == float:
-            sf.append(StructField(colNames[i], FloatType(), False))
-        elif type(o) == long:
-            sf.append(StructField(colNames[i], LongType(), False))
-        else:
-            print("Data type not implemented yet")
 
-    schema = StructType(sf)
+def getDatasetFromBatches(batches, schema, useArrow=None):
+    '''
+    Converts a PythonRDD of column batches to a Dataset<Row>
+
+    Attributes:
+        batches (PythonRDD): PythonRDD of column batches, each a list of
+                             columns in the order of the schema
+        schema (StructType): schema of the rows (see getSchema)
+        useArrow (bool): convert batches with Arrow, requires pyarrow and
+                         Spark 3.3 or later. By default Arrow is used if
+                         both are available
+    '''
+
     spark = SparkSession.builder.getOrCreate()
-    return spark.createDataFrame(data, schema)
+
+    if useArrow is None:
+        useArrow = ARROW_AVAILABLE
+
+    if useArrow and not ARROW_AVAILABLE:
+        raise Exception("useArrow requires pyarrow and Spark 3.3 or later")
+
+    if not useArrow:
+        rows = batches.flatMap(lambda batch: _toRows(batch, schema))
+        return spark.createDataFrame(rows, schema, verifySchema=False)
+
+    # Record batches are built and serialized on the workers. Spark passes
+    # them to mapInArrow as opaque binary values, one row per batch.
+    streams = spark.createDataFrame(batches.map(lambda batch: (_toStream(batch, schema),)),
+                                    StructType([StructField("batch", BinaryType(), False)]),
+                                    verifySchema=False)
+
+    return streams.mapInArrow(_fromStreams, schema)
+
+
+def _inferType(o):
+    # Spark SQL data type of a value
+    if isinstance(o, str):
+        return StringType()
+    if isinstance(o, (bool, np.bool_)):
+        return BooleanType()
+    if isinstance(o, (int, np.integer)):
+        return IntegerType()
+    if isinstance(o, (float, np.floating)):
+        return FloatType()
+    if isinstance(o, Vector):
+        return VectorUDT()
+    if isinstance(o, np.ndarray) and o.ndim == 1:
+        return ArrayType(LongType() if o.dtype.kind in 'iu' else DoubleType(), False)
+    if isinstance(o, list) and len(o) > 0 and o[0] is not None:
+        return ArrayType(_inferType(o[0]))
+
+    raise Exception(f"cannot infer the data type of {o!r}, use an explicit schema")
+
+
+def _toBatches(rows, numColumns, batchSize):
+    # Column batches of rows
+    batch = []
+
+    for row in rows:
+        batch.append(row)
+
+        if len(batch) == batchSize:
+            yield [list(c) for c in zip(*batch)]
+            batch = []
+
+    if batch:
+        yield [list(c) for c in zip(*batch)]
+
+
+def _toPython(values, dataType):
+    # Python values of a column, for conversion to Spark rows
+    if isinstance(dataType, VectorUDT):
+        return [v if v is None or isinstance(v, Vector) else Vectors.dense(v) for v in values]
+
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+
+    if isinstance(dataType, ArrayType):
+        return [v.tolist() if isinstance(v, np.ndarray) else v for v in values]
+
+    return values
+
+
+def _toRows(batch, schema):
+    # Rows of a column batch
+    columns = [_toPython(values, f.dataType) for values, f in zip(batch, schema.fields)]
+    return zip(*columns)
+
+
+def _toArrow(values, dataType):
+    # Arrow array of a column
+    from pyspark.sql.pandas.types import to_arrow_type
+
+    arrowType = to_arrow_type(dataType)
+
+    if isinstance(dataType, VectorUDT):
+        # Vectors are written as dense vectors in the struct of the VectorUDT
+        values = _toArrow(values, ArrayType(DoubleType(), False)).cast(arrowType.field('values').type)
+        n = len(values)
+        fields = [pa.array(np.ones(n, dtype=np.int8)), pa.nulls(n, arrowType.field('size').type),
+                  pa.nulls(n, arrowType.field('indices').type), values]
+        return pa.StructArray.from_arrays(fields, fields=list(arrowType), mask=values.is_null())
+
+    if isinstance(dataType, ArrayType) and isinstance(values, np.ndarray) and values.ndim == 2:
+        offsets = np.arange(len(values) + 1, dtype=np.int32) * values.shape[1]
+        flat = pa.array(values.ravel(), type=arrowType.value_type)
+        return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), flat)
+
+    if isinstance(dataType, ArrayType):
+        values = [v.toArray() if isinstance(v, Vector) else v for v in values]
+        values = [v.tolist() if isinstance(v, np.ndarray) else v for v in values]
+
+    return pa.array(values, type=arrowType)
+
+
+def _toStream(batch, schema):
+    # Arrow stream of a column batch
+    arrays = [_toArrow(values, f.dataType) for values, f in zip(batch, schema.fields)]
+    recordBatch = pa.RecordBatch.from_arrays(arrays, names=[f.name for f in schema.fields])
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, recordBatch.schema) as writer:
+        writer.write_batch(recordBatch)
+
+    return sink.getvalue().to_pybytes()
+
+
+def _fromStreams(recordBatches):
+    # Arrow record batches of a column of Arrow streams, read without copying
+    for recordBatch in recordBatches:
+        for stream in recordBatch.column(0):
+            yield from pa.ipc.open_stream(stream.as_buffer())
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+import unittest
+from pyspark import SparkConf, SparkContext
+from mmtfPyspark.io.MmtfReader import readMmtfFiles
+from mmtfPyspark.datasets import residueInteractionExtractor
+
+
+class residueInteractionExtractorTest(unittest.TestCase):
+
+    def setUp(self):
+        conf = SparkConf().setMaster("local[*]").setAppName('residueInteractionExtractorTest')
+        self.sc = SparkContext(conf=conf)
+
+        self.pdb = readMmtfFiles('./resources/files/', self.sc)
+
+
+    def test1(self):
+        ds = residueInteractionExtractor('HEM', 4.0).getDataset(self.pdb)
+
+        self.assertEqual(ds.columns, ["structureId", "residue1", "index1",
+                                      "residue2", "index2", "distance"])
+        self.assertEqual(ds.filter("structureId = '4HHB'").count(), 73)
+
+
+    def tearDown(self):
+        self.sc.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+'''
+mmtfServer.py:
+
+Local HTTP server as a stand-in of the MMTF web service in tests of
+downloads (see test_mmtfDownloader and test_mmtfSync)
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FILES = './resources/files'
+
+
+class mmtfHandler(BaseHTTPRequestHandler):
+    '''Serves <PDB ID> from resources/files, gzipped files with gzip content
+    encoding. /FLAKY fails with 503 on every other request
+    '''
+    protocol_version = 'HTTP/1.1'
+    requests = 0
+
+    def do_GET(self):
+        mmtfHandler.requests += 1
+        pdbId = self.path.strip('/')
+
+        if pdbId == 'FLAKY':
+            if mmtfHandler.requests % 2 == 1:
+                return self.send_data(503, b'')
+            pdbId = '1STP'
+
+        for name, encoding in [(pdbId + '.mmtf.gz', 'gzip'), (pdbId + '.mmtf', None)]:
+            path = os.path.join(FILES, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return self.send_data(200, f.read(), encoding)
+
+        self.send_data(404, b'')
+
+
+    def send_data(self, status, data, encoding=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data)))
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def log_message(self, *args):
+        pass
+
+
+def startServer():
+    '''
+    Starts a server on a free local port and resets the request counter
+
+    Returns:
+        the server and its base URL
+    '''
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), mmtfHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    mmtfHandler.requests = 0
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def stopServer(server):
+    '''
+    Stops a server started with startServer
+    '''
+
+    server.shutdown()
+    server.server_close()
@@ -11,8 +11,10 @@ __status__ = "Warning"
 '''
 
 import unittest
+import shutil
+import tempfile
 from pyspark import SparkConf, SparkContext
-from mmtfPyspark.io import MmtfReader
+from mmtfPyspark.io import MmtfReader, mmtfArchive, hadoopSequenceFile
 from mmtfPyspark.mappers import structureToPolymerChains
 
 
@@ -29,6 +31,43 @@ class testReadSequenceFile(unittest.TestCase):
         self.assertTrue(pdb.count() == 3)
 
 
+    def test_mmtf_partitions(self):
+        path = './resources/files/'
+        pdb = MmtfReader.readMmtfFiles(path, self.sc, partitionBytes=20000)
+
+        self.assertTrue(pdb.count() == 3)
+        self.assertTrue(pdb.getNumPartitions() >= 3)
+
+
+    def test_mmtf_lazy(self):
+        path = './resources/files/'
+        pdb = MmtfReader.readMmtfFiles(path, self.sc, lazy=True)
+
+        self.assertTrue(pdb.count() == 3)
+        self.assertTrue(pdb.filter(lambda t: t[1].num_atoms > 0).count() == 3)
+
+
+    def test_archive(self):
+        path = tempfile.mkdtemp()
+        mmtfArchive.convertSequenceFile('./resources/mmtf_reduced_sample', path)
+
+        pdb = MmtfReader.readArchive(path, self.sc, pdbId=['1BUJ', '1BUP'])
+        self.assertTrue(sorted(pdb.keys().collect()) == ['1BUJ', '1BUP'])
+
+        shutil.rmtree(path)
+
+
+    def test_indexed_sequence_file(self):
+        path = tempfile.mkdtemp()
+        shutil.copy('./resources/mmtf_reduced_sample/part-00000', path)
+        hadoopSequenceFile.createIndex(path)
+
+        pdb = MmtfReader.readSequenceFile(path, self.sc, pdbId=['1BUJ', '1BUP'])
+        self.assertTrue(sorted(pdb.keys().collect()) == ['1BUJ', '1BUP'])
+
+        shutil.rmtree(path)
+
+
     def test_pdb(self):
         path = './resources/files/'
         pdb = MmtfReader.readPDBFiles(path, self.sc)
@@ -43,6 +82,18 @@ class testReadSequenceFile(unittest.TestCase):
         self.assertTrue(pdb.count() == 2)
 
 
+    def test_column_parser(self):
+        path = './resources/files/'
+        pdb = MmtfReader.readPDBFiles(path, self.sc, biopython=False)
+        self.assertTrue(pdb.count() == 3)
+
+        cif = MmtfReader.readMmcifFiles(path, self.sc, biopython=False)
+        self.assertTrue(cif.count() == 2)
+
+        with self.assertRaises(Exception):
+            MmtfReader.readMmcifFiles(path, self.sc, fast=True, biopython=False)
+
+
     def test_mmtf_chains(self):
         path = './resources/files/test'
         pdb = MmtfReader.readMmtfFiles(path, self.sc)
@@ -55,5 +106,33 @@ class testReadSequenceFile(unittest.TestCase):
     def tearDown(self):
         self.sc.stop()
 
+class testListFiles(unittest.TestCase):
+
+    def test_list_files(self):
+        files = MmtfReader.listFiles('./resources/files', lambda f: ".mmtf" in f)
+
+        self.assertEqual([f for f, size in files], ['./resources/files/1STP.mmtf',
+                                                    './resources/files/4HHB.mmtf.gz',
+                                                    './resources/files/test/1HV4.mmtf.gz'])
+        self.assertEqual(files[0][1], 17439)
+
+
+class testBalancedPartitions(unittest.TestCase):
+
+    def test_equal_sizes(self):
+        partitions = MmtfReader.balancedPartitions(list(range(10)), [1] * 10, 3)
+        self.assertEqual(partitions, [[0, 1, 2], [3, 4, 5, 6], [7, 8, 9]])
+
+
+    def test_large_item(self):
+        partitions = MmtfReader.balancedPartitions(['a', 'b', 'c', 'd'], [100, 1, 1, 1], 2)
+        self.assertEqual(partitions, [['a'], ['b', 'c', 'd']])
+
+
+    def test_more_partitions_than_items(self):
+        self.assertEqual(MmtfReader.balancedPartitions([1, 2], [1, 1], 5), [[1], [2]])
+        self.assertEqual(MmtfReader.balancedPartitions([], [], 5), [])
+
+
 if __name__ == '__main__':
     unittest.main()
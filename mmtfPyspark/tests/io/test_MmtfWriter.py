@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+import unittest
+import os
+import shutil
+import tempfile
+from pyspark import SparkConf, SparkContext
+from mmtfPyspark.io import MmtfReader, MmtfWriter, hadoopSequenceFile, mmtfArchive
+
+
+class testMmtfWriter(unittest.TestCase):
+
+    def setUp(self):
+        conf = SparkConf().setMaster("local[*]").setAppName('MmtfWriter')
+        self.sc = SparkContext(conf=conf)
+        self.pdb = MmtfReader.readSequenceFile('./resources/mmtf_reduced_sample/part-00000', self.sc) \
+                             .filter(lambda t: t[1].num_atoms < 1000) \
+                             .repartition(3)
+        self.path = os.path.join(tempfile.mkdtemp(), 'output')
+
+
+    def test_mmtf_files(self):
+        stats = MmtfWriter.writeMmtfFiles(self.path, self.sc, self.pdb, level=1)
+
+        self.assertEqual(sum(s['records'] for s in stats), self.pdb.count())
+        self.assertEqual(len(os.listdir(self.path)), self.pdb.count())
+        self.assertEqual(MmtfReader.readMmtfFiles(self.path, self.sc).count(), self.pdb.count())
+
+
+    def test_sequence_file_shards(self):
+        stats = MmtfWriter.writeShards(self.path, self.sc, self.pdb)
+
+        self.assertEqual([s['partition'] for s in stats], [0, 1, 2])
+        self.assertEqual(sum(s['records'] for s in stats), self.pdb.count())
+        self.assertEqual(len(hadoopSequenceFile.readIndex(self.path)), self.pdb.count())
+
+        pdbIds = self.pdb.keys().take(2)
+        subset = MmtfReader.readSequenceFile(self.path, self.sc, pdbId=pdbIds)
+        self.assertEqual(sorted(subset.keys().collect()), sorted(pdbIds))
+
+
+    def test_archive_shards(self):
+        stats = MmtfWriter.writeShards(self.path, self.sc, self.pdb, fileFormat='archive')
+
+        self.assertEqual(len(mmtfArchive.readIndex(self.path)), sum(s['records'] for s in stats))
+        self.assertEqual(MmtfReader.readArchive(self.path, self.sc).count(), self.pdb.count())
+
+        with self.assertRaises(Exception):
+            MmtfWriter.writeShards(self.path, self.sc, self.pdb, fileFormat='archive')
+
+
+    def test_reduced(self):
+        stats = MmtfWriter.writeReduced(self.path, self.sc, self.pdb)
+
+        self.assertEqual(sum(s['records'] for s in stats), self.pdb.count())
+
+        reduced = dict(MmtfReader.readSequenceFile(self.path, self.sc).collect())
+        atomIndex = dict(MmtfReader.readAtomIndex(self.path, self.sc).collect())
+        self.assertEqual(sorted(reduced), sorted(atomIndex))
+
+        for key, s in self.pdb.collect():
+            self.assertEqual(reduced[key].atom_id_list.tolist(), s.atom_id_list[atomIndex[key]].tolist())
+
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.path))
+        self.sc.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from mmtfPyspark.io import hadoopSequenceFile
+
+
+class testHadoopSequenceFile(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        for part in ['part-00000', 'part-00001']:
+            shutil.copy(os.path.join('./resources/mmtf_reduced_sample', part), self.path)
+
+
+    def test_read_records(self):
+        records = [r for part in hadoopSequenceFile.getPartFiles(self.path)
+                   for r in hadoopSequenceFile.readRecords(part)]
+
+        self.assertEqual(records[0][0], '1BUJ')
+        self.assertEqual(records[0][1][:2], b'\x1f\x8b')
+
+
+    def test_index(self):
+        self.assertTrue(hadoopSequenceFile.readIndex(self.path) is None)
+
+        entries = hadoopSequenceFile.createIndex(self.path)
+        index = hadoopSequenceFile.readIndex(self.path)
+
+        self.assertEqual(index, entries)
+        self.assertEqual(set(e[1] for e in index), {'part-00000', 'part-00001'})
+        self.assertTrue(all(e[4] > 0 for e in index))
+        self.assertEqual(hadoopSequenceFile.getPartFiles(self.path),
+                         [os.path.join(self.path, 'part-00000'), os.path.join(self.path, 'part-00001')])
+
+
+    def test_indexed_records(self):
+        index = hadoopSequenceFile.createIndex(self.path)
+        records = {key: value for part in hadoopSequenceFile.getPartFiles(self.path)
+                   for key, value, offset in hadoopSequenceFile.readRecords(part)}
+
+        entries = [index[3], index[100], index[-1]]
+        selected = list(hadoopSequenceFile.readIndexedRecords(self.path, entries))
+
+        self.assertEqual([key for key, value in selected], [e[0] for e in entries])
+        for key, value in selected:
+            self.assertEqual(value, records[key])
+
+
+    def test_vint(self):
+        for value in [0, 1, -1, 127, -112, 128, -113, 300, -300, 2 ** 31, -2 ** 40]:
+            f = io.BytesIO()
+            hadoopSequenceFile.writeVInt(f, value)
+            f.seek(0)
+            self.assertEqual(hadoopSequenceFile.readVInt(f), value)
+
+
+    def test_write_records(self):
+        records = [(key, value) for key, value, offset in
+                   hadoopSequenceFile.readRecords(os.path.join(self.path, 'part-00000'))]
+        part = os.path.join(self.path, 'written')
+
+        with hadoopSequenceFile.sequenceFileWriter(part) as writer:
+            offsets = [writer.write(key, value) for key, value in records]
+
+        self.assertEqual(writer.records, len(records))
+        self.assertEqual([(key, value) for key, value, offset in hadoopSequenceFile.readRecords(part)],
+                         records)
+
+        with open(part, 'rb') as f:
+            header = hadoopSequenceFile.readHeader(f)
+        self.assertEqual(header['keyClass'], hadoopSequenceFile.KEY_CLASS)
+        self.assertEqual(header['sync'], writer.sync)
+
+        # Offsets and lengths of written records are valid index entries
+        entries = [(key, 'written', offset, length, 0) for (key, value), (offset, length)
+                   in zip(records, offsets)][::50]
+        self.assertEqual(list(hadoopSequenceFile.readIndexedRecords(part, entries)),
+                         records[::50])
+
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import os
+import shutil
+import tempfile
+from mmtfPyspark.io import mmtfArchive, mmtfCompression, hadoopSequenceFile
+
+
+class testMmtfArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.input = './resources/mmtf_reduced_sample'
+        self.path = tempfile.mkdtemp()
+        self.records = {key: value
+                        for part in hadoopSequenceFile.getPartFiles(self.input)
+                        for key, value, offset in hadoopSequenceFile.readRecords(part)}
+
+
+    def test_convert(self):
+        index = mmtfArchive.convertSequenceFile(self.input, self.path, shardBytes=2**22)
+
+        self.assertEqual(len(index), len(self.records))
+        self.assertTrue(len(set(entry[1] for entry in index)) > 1)
+        self.assertEqual(mmtfArchive.readIndex(self.path), index)
+
+
+    def test_select(self):
+        mmtfArchive.convertSequenceFile(self.input, self.path, shardBytes=2**22)
+        index = mmtfArchive.readIndex(self.path)
+        pdbIds = ['1BUJ', '1BUP', list(self.records)[-1]]
+
+        entries = mmtfArchive.selectEntries(index, pdbIds)
+        records = dict(mmtfArchive.readRecords(self.path, entries))
+
+        self.assertEqual(set(records), set(pdbIds))
+        for key in pdbIds:
+            self.assertEqual(records[key], self.records[key])
+
+
+    def test_chain_keys(self):
+        records = [('4HHB.A', b'chainA'), ('4HHB.B', b'chainB'), ('1STP.A', b'chainC')]
+        mmtfArchive.writeArchive(records, self.path)
+        index = mmtfArchive.readIndex(self.path)
+
+        entries = mmtfArchive.selectEntries(index, ['4HHB'])
+        records = list(mmtfArchive.readRecords(self.path, entries))
+
+        self.assertEqual([key for key, value in records], ['4HHB.A', '4HHB.B'])
+        self.assertEqual(gzip.decompress(records[1][1]), b'chainB')
+
+
+    def test_shard_suffix(self):
+        records = [('4HHB', b'mmtf data')]
+        mmtfArchive.writeArchive(records, self.path)
+        self.assertEqual(mmtfArchive.readIndex(self.path)[0][1], 'shard-00000.mmtf.gz')
+
+        for compression in ['zstd', 'lz4']:
+            if mmtfCompression.isAvailable(compression):
+                path = os.path.join(self.path, compression)
+                mmtfArchive.writeArchive(records, path, compression=compression)
+                shard = mmtfArchive.readIndex(path)[0][1]
+
+                self.assertEqual(shard, 'shard-00000.mmtf' + mmtfCompression.getSuffix(compression))
+                self.assertTrue(os.path.exists(os.path.join(path, shard)))
+
+
+    def test_recompress(self):
+        # Records of another compression than the shard suffix are recompressed
+        records = [('4HHB', gzip.compress(b'chainA')), ('1STP', b'chainB')]
+        mmtfArchive.writeArchive(records, self.path, compression=None)
+        index = mmtfArchive.readIndex(self.path)
+
+        self.assertEqual(index[0][1], 'shard-00000.mmtf')
+        self.assertEqual(dict(mmtfArchive.readRecords(self.path, index)),
+                         {'4HHB': b'chainA', '1STP': b'chainB'})
+
+
+    def test_missing_index(self):
+        with self.assertRaises(Exception):
+            mmtfArchive.readIndex(self.path)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import os
+import pickle
+import shutil
+import tempfile
+from mmtfPyspark.io.mmtfCache import mmtfCache
+
+
+class testMmtfCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        with open('./resources/files/4HHB.mmtf.gz', 'rb') as f:
+            self.data = f.read()
+
+
+    def test_get_put(self):
+        cache = mmtfCache(self.path)
+
+        self.assertTrue(cache.get('4HHB') is None)
+        cache.put('4HHB', self.data)
+        self.assertEqual(cache.get('4hhb'), self.data)
+        self.assertEqual(cache.getStatistics(), {"hits": 1, "misses": 1})
+        self.assertEqual(os.listdir(os.path.join(self.path, 'HH')), ['4HHB.mmtf.gz'])
+
+
+    def test_version(self):
+        cache = mmtfCache(self.path)
+        cache.put('4HHB', self.data, version='v1')
+
+        self.assertTrue(cache.get('4HHB') is None)
+        self.assertTrue(cache.get('4HHB', version='v2') is None)
+        self.assertEqual(cache.get('4HHB', version='v1'), self.data)
+
+
+    def test_uncompressed(self):
+        cache = mmtfCache(self.path)
+        cache.put('1STP', b'mmtf data')
+
+        self.assertEqual(gzip.decompress(cache.get('1STP')), b'mmtf data')
+
+
+    def test_lru_eviction(self):
+        cache = mmtfCache(self.path, maxBytes=int(3.5 * len(self.data)))
+
+        for i, pdbId in enumerate(['1AAA', '2AAA', '3AAA']):
+            cache.put(pdbId, self.data)
+            os.utime(cache.getFile(pdbId), (i, i))
+
+        # reading 1AAA makes 2AAA the least recently used entry
+        cache.get('1AAA')
+        cache.put('4AAA', self.data)
+
+        self.assertTrue(cache.get('2AAA') is None)
+        self.assertEqual(cache.get('1AAA'), self.data)
+        self.assertEqual(cache.get('3AAA'), self.data)
+        self.assertEqual(cache.get('4AAA'), self.data)
+
+
+    def test_low_water(self):
+        cache = mmtfCache(self.path, maxBytes=int(5.5 * len(self.data)))
+
+        # Replacing an entry doesn't change the cache size
+        for i in range(3):
+            cache.put('1AAA', self.data)
+        os.utime(cache.getFile('1AAA'), (0, 0))
+        self.assertEqual(cache._size, len(self.data))
+
+        for i, pdbId in enumerate(['2AAA', '3AAA', '4AAA', '5AAA', '6AAA']):
+            cache.put(pdbId, self.data)
+            os.utime(cache.getFile(pdbId), (i + 1, i + 1))
+
+        # Evicted to below 0.9 times the size limit
+        self.assertEqual(cache._size, 4 * len(self.data))
+        self.assertTrue(cache.get('1AAA') is None)
+        self.assertTrue(cache.get('2AAA') is None)
+
+        # The next entry fits without scanning the cache directory
+        cache.getEntries = None
+        cache.put('7AAA', self.data)
+        self.assertEqual(cache._size, 5 * len(self.data))
+
+
+    def test_pickle(self):
+        cache = mmtfCache(self.path, maxBytes=100)
+        cache.get('4HHB')
+        copy = pickle.loads(pickle.dumps(cache))
+
+        self.assertEqual(copy.path, self.path)
+        self.assertEqual(copy.maxBytes, 100)
+        self.assertEqual(copy.getStatistics(), {"hits": 0, "misses": 0})
+
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
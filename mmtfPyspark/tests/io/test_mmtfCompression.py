@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+from mmtfPyspark.io import mmtfCompression
+
+
+class testMmtfCompression(unittest.TestCase):
+
+    def setUp(self):
+        with open('./resources/files/1STP.mmtf', 'rb') as f:
+            self.data = f.read()
+
+
+    def test_gzip(self):
+        compressed = mmtfCompression.compress(self.data, 'gzip', 1)
+
+        self.assertEqual(mmtfCompression.getCompression(compressed), 'gzip')
+        self.assertEqual(gzip.decompress(compressed), self.data)
+        self.assertEqual(mmtfCompression.decompress(compressed), self.data)
+        self.assertTrue(len(mmtfCompression.compress(self.data, 'gzip', 9)) <= len(compressed))
+        # No timestamp in the header
+        self.assertEqual(compressed[4:8], b'\x00\x00\x00\x00')
+        self.assertEqual(mmtfCompression.compress(self.data, 'gzip', 1), compressed)
+
+
+    def test_uncompressed(self):
+        self.assertTrue(mmtfCompression.getCompression(self.data) is None)
+        self.assertEqual(mmtfCompression.decompress(self.data), self.data)
+        self.assertEqual(mmtfCompression.compress(self.data, None), self.data)
+
+
+    def test_optional_compressions(self):
+        for compression in ['zstd', 'lz4']:
+            if mmtfCompression.isAvailable(compression):
+                compressed = mmtfCompression.compress(self.data, compression)
+                self.assertEqual(mmtfCompression.getCompression(compressed), compression)
+                self.assertEqual(mmtfCompression.decompress(compressed), self.data)
+            else:
+                with self.assertRaises(Exception):
+                    mmtfCompression.compress(self.data, compression)
+
+
+    def test_unknown_compression(self):
+        with self.assertRaises(Exception):
+            mmtfCompression.compress(self.data, 'bz2')
+
+
+if __name__ == '__main__':
+    unittest.main()
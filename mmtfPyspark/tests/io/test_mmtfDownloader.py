@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import unittest
+import os
+import shutil
+import tempfile
+from mmtfPyspark.io.mmtfDownloader import mmtfDownloader, unpack, QUEUE_FACTOR
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.io.mmtfCache import mmtfCache
+from mmtfPyspark.tests.io.mmtfServer import mmtfHandler, startServer, stopServer
+
+
+class testMmtfDownloader(unittest.TestCase):
+
+    def setUp(self):
+        self.server, url = startServer()
+        self.downloader = mmtfDownloader(url, numThreads=4, retries=2, backoff=0.01, cache=False)
+
+
+    def test_download(self):
+        results = sorted(self.downloader.download(['4HHB', '1STP']), reverse=True)
+
+        self.assertEqual([r[0] for r in results], ['4HHB', '1STP'])
+        self.assertTrue(all(error is None for pdbId, data, error in results))
+
+        structure = mmtfStructure(unpack(results[0][1]))
+        self.assertEqual(structure.structure_id, '4HHB')
+        self.assertEqual(structure.num_atoms, 4779)
+
+
+    def test_failure(self):
+        results = dict((r[0], r) for r in self.downloader.download(['4HHB', '0XXX']))
+
+        self.assertTrue(results['4HHB'][2] is None)
+        self.assertTrue(results['0XXX'][1] is None)
+        self.assertTrue('404' in results['0XXX'][2])
+        # not found is not retried
+        self.assertEqual(mmtfHandler.requests, 2)
+
+
+    def test_retry(self):
+        pdbId, data, error = next(self.downloader.download(['FLAKY']))
+
+        self.assertTrue(error is None)
+        self.assertEqual(mmtfStructure(unpack(data)).structure_id, '1STP')
+        self.assertEqual(mmtfHandler.requests, 2)
+
+
+    def test_cache(self):
+        path = tempfile.mkdtemp()
+        cache = mmtfCache(path)
+        self.downloader.cache = cache
+
+        first = dict((r[0], r) for r in self.downloader.download(['4HHB', '1STP']))
+        second = dict((r[0], r) for r in self.downloader.download(['4HHB', '1STP']))
+
+        self.assertEqual(mmtfHandler.requests, 2)
+        self.assertEqual(cache.getStatistics(), {"hits": 2, "misses": 2})
+        self.assertEqual(second['4HHB'][1], first['4HHB'][1])
+        self.assertEqual(mmtfStructure(unpack(second['1STP'][1])).structure_id, '1STP')
+
+        shutil.rmtree(path)
+
+
+    def test_default_cache(self):
+        # The default cache is only used if its directory is set
+        original = os.environ.pop('MMTF_CACHE_DIR', None)
+        path = tempfile.mkdtemp()
+        try:
+            self.assertTrue(mmtfDownloader(self.downloader.baseUrl).getCache() is None)
+
+            os.environ['MMTF_CACHE_DIR'] = path
+            self.assertTrue(mmtfDownloader(self.downloader.baseUrl, cache=False).getCache() is None)
+
+            downloader = mmtfDownloader(self.downloader.baseUrl, numThreads=2)
+            first = dict((r[0], r) for r in downloader.download(['4HHB', '1STP']))
+            second = dict((r[0], r) for r in downloader.download(['4HHB', '1STP']))
+            cache = downloader.getCache()
+        finally:
+            os.environ.pop('MMTF_CACHE_DIR', None)
+            if original is not None:
+                os.environ['MMTF_CACHE_DIR'] = original
+
+        self.assertEqual(os.path.dirname(cache.path), path)
+        self.assertEqual(mmtfHandler.requests, 2)
+        self.assertEqual(cache.getStatistics(), {"hits": 2, "misses": 2})
+        self.assertEqual(second['4HHB'][1], first['4HHB'][1])
+
+        shutil.rmtree(path)
+
+
+    def test_bounded_queue(self):
+        # Entries are only submitted while the number in flight is bounded
+        submitted = []
+
+        def pdbIds():
+            for i in range(100):
+                submitted.append(i)
+                yield '0XXX'
+
+        downloader = mmtfDownloader(self.downloader.baseUrl, numThreads=2, retries=0, cache=False)
+        results = downloader.download(pdbIds())
+        next(results)
+
+        self.assertTrue(len(submitted) <= 2 * QUEUE_FACTOR + 1)
+        self.assertEqual(len(list(results)), 99)
+
+
+    def tearDown(self):
+        stopServer(self.server)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import pickle
+import msgpack
+import numpy as np
+from mmtf.api.mmtf_reader import MMTFDecoder
+from mmtfPyspark.io import MmtfWriter
+from mmtfPyspark.io.mmtfStructure import mmtfStructure, stringArray
+from mmtfPyspark.utils import mmtfDecoder
+
+
+class testMmtfStructure(unittest.TestCase):
+
+    def setUp(self):
+        path = './resources/files/4HHB.mmtf.gz'
+        with gzip.open(path, 'rb') as f:
+            self.data = msgpack.unpackb(f.read(), raw=True)
+
+
+    def test_lazy_metadata(self):
+        structure = mmtfStructure(self.data, lazy=True)
+
+        self.assertEqual(structure.resolution, self.data[b'resolution'])
+        self.assertEqual(structure.release_date, '1984-07-17')
+        self.assertFalse('x_coord_list' in structure.__getstate__())
+        self.assertFalse('group_list' in structure.__getstate__())
+
+
+    def test_lazy_matches_eager(self):
+        eager = mmtfStructure(self.data)
+        lazy = mmtfStructure(self.data, lazy=True)
+
+        self.assertTrue(np.array_equal(eager.x_coord_list, lazy.x_coord_list))
+        self.assertTrue(np.array_equal(eager.z_coord_list, lazy.z_coord_list))
+        self.assertTrue(np.array_equal(eager.atom_id_list, lazy.atom_id_list))
+        self.assertEqual(eager.group_list, lazy.group_list)
+        self.assertEqual(eager.chain_id_list, lazy.chain_id_list)
+        self.assertEqual(eager.set_alt_loc_list().alt_loc_list,
+                         lazy.set_alt_loc_list().alt_loc_list)
+
+
+    def test_lazy_memoized(self):
+        structure = mmtfStructure(self.data, lazy=True)
+        x = structure.x_coord_list
+
+        self.assertTrue(structure.x_coord_list is x)
+        self.assertFalse(b'xCoordList' in structure._input_data)
+
+
+    def test_fields(self):
+        fields = ["resolution", "releaseDate", "entityList"]
+        structure = mmtfStructure(self.data, fields=fields)
+
+        self.assertEqual(structure.release_date, '1984-07-17')
+        self.assertEqual(len(structure.entity_list), 5)
+        self.assertFalse('x_coord_list' in structure.__getstate__())
+        with self.assertRaises(AttributeError):
+            structure.x_coord_list
+
+
+    def test_lazy_fields(self):
+        fields = ["xCoordList", "yCoordList", "zCoordList", "groupTypeList", "groupList"]
+        structure = mmtfStructure(self.data, lazy=True, fields=fields)
+
+        self.assertEqual(set(structure._input_data), set(f.encode() for f in fields))
+        self.assertEqual(len(structure.x_coord_list), 4779)
+        with self.assertRaises(AttributeError):
+            structure.resolution
+
+
+    def test_unknown_field(self):
+        with self.assertRaises(Exception):
+            mmtfStructure(self.data, fields=["coordinates"])
+
+
+    def test_float32_coords(self):
+        eager = mmtfStructure(self.data)
+        structure = mmtfStructure(self.data, coord_type='float32')
+
+        self.assertEqual(structure.x_coord_list.dtype, np.float32)
+        self.assertEqual(structure.b_factor_list.dtype, np.float32)
+        self.assertTrue(np.allclose(structure.y_coord_list, eager.y_coord_list, atol=1e-3))
+
+
+    def test_fixed_point_coords(self):
+        eager = mmtfStructure(self.data)
+        structure = mmtfStructure(self.data, coord_type='int32')
+
+        int_array, divisor = structure.get_fixed_point('x_coord_list')
+        self.assertEqual(int_array.dtype, np.int32)
+        self.assertEqual(divisor, 1000)
+        self.assertFalse('x_coord_list' in structure.__getstate__())
+        self.assertTrue(np.allclose(structure.x_coord_list, eager.x_coord_list))
+
+        # converted floats are not pickled
+        copy = pickle.loads(pickle.dumps(structure))
+        self.assertFalse('x_coord_list' in copy.__getstate__())
+        self.assertTrue(np.allclose(copy.x_coord_list, eager.x_coord_list))
+
+
+    def test_string_arrays(self):
+        structure = mmtfStructure(self.data)
+
+        self.assertEqual(structure.chain_id_list.array.dtype, np.dtype('S4'))
+        self.assertEqual(structure.alt_loc_list.array.dtype, np.dtype('S1'))
+        self.assertEqual(structure.chain_id_list[0], 'A')
+        self.assertEqual(structure.chain_id_list[-1], structure.chain_id_list.tolist()[-1])
+        self.assertEqual(structure.ins_code_list[0], '\x00')
+        self.assertEqual(set(structure.alt_loc_list), {'\x00'})
+        self.assertEqual(len(structure.alt_loc_list), structure.num_atoms)
+        self.assertTrue(isinstance(structure.chain_name_list[:2], stringArray))
+        self.assertEqual(structure.chain_name_list[:2], ['A', 'B'])
+
+
+    def test_slots(self):
+        structure = mmtfStructure(self.data)
+
+        with self.assertRaises(AttributeError):
+            structure.unknown_attribute = 1
+
+        copy = pickle.loads(pickle.dumps(structure))
+        self.assertEqual(copy.chain_id_list, structure.chain_id_list)
+        self.assertEqual(copy.alt_loc_list, structure.alt_loc_list)
+        self.assertTrue(np.array_equal(copy.x_coord_list, structure.x_coord_list))
+
+
+    def test_pickle_shared_groups(self):
+        structure = mmtfStructure(self.data)
+        copy1 = pickle.loads(pickle.dumps(structure))
+        copy2 = pickle.loads(pickle.dumps(structure))
+
+        self.assertEqual(copy1.group_list, structure.group_list)
+        self.assertEqual(copy1.entity_list, structure.entity_list)
+        self.assertTrue(copy1.group_list[0] is copy2.group_list[0])
+
+
+    def test_decode_shared_groups(self):
+        mmtfDecoder.clear_group_cache()
+        structure1 = mmtfStructure(self.data)
+        structure2 = mmtfStructure(self.data)
+        numGroups = len(structure1.group_list)
+
+        self.assertTrue(structure1.group_list[0] is structure2.group_list[0])
+        self.assertEqual(structure1.group_list[0]['groupName'], 'VAL')
+
+        stats = mmtfDecoder.group_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (numGroups, numGroups))
+        self.assertEqual(stats['hitRate'], 0.5)
+
+        # Decoded and unpickled groups are shared
+        copy = pickle.loads(pickle.dumps(structure1))
+        self.assertTrue(copy.group_list[0] is structure1.group_list[0])
+
+        # Shared groups are read-only
+        group = structure1.group_list[0]
+        with self.assertRaises(Exception):
+            group['groupName'] = 'ALA'
+        with self.assertRaises(Exception):
+            group.update(groupName='ALA')
+        with self.assertRaises(TypeError):
+            group['atomNameList'][0] = 'CA'
+        self.assertEqual(group['groupName'], 'VAL')
+
+        # Groups unpickled in a new process are read-only as well
+        mmtfDecoder.clear_group_cache()
+        copy = pickle.loads(pickle.dumps(structure1))
+        self.assertTrue(isinstance(copy.group_list[0], mmtfDecoder.FrozenGroup))
+        self.assertTrue(isinstance(copy.group_list[0]['bondOrderList'], tuple))
+        self.assertEqual(msgpack.unpackb(msgpack.packb(group)), msgpack.unpackb(msgpack.packb(dict(group))))
+
+
+    def test_mmtf_serialization(self):
+        structure = mmtfStructure(self.data).set_serialization('mmtf')
+        copy = pickle.loads(pickle.dumps(structure))
+
+        self.assertEqual(copy._serialization, 'mmtf')
+        self.assertFalse('x_coord_list' in copy.__getstate__())
+        self.assertTrue(np.allclose(copy.x_coord_list, structure.x_coord_list))
+        self.assertEqual(copy.group_list, structure.group_list)
+        self.assertEqual(copy.chain_name_list, structure.chain_name_list)
+        self.assertEqual(copy.num_atoms, structure.num_atoms)
+
+
+    def test_mmtf_serialization_fields(self):
+        fields = ["xCoordList", "groupList"]
+        structure = mmtfStructure(self.data, fields=fields, coord_type='int32')
+        copy = pickle.loads(pickle.dumps(structure.set_serialization('mmtf')))
+
+        self.assertEqual(copy.get_fixed_point('x_coord_list')[1], 1000)
+        self.assertEqual(len(copy.group_list), len(structure.group_list))
+        with self.assertRaises(AttributeError):
+            copy.resolution
+
+
+    def test_unknown_serialization(self):
+        with self.assertRaises(Exception):
+            mmtfStructure(self.data).set_serialization('json')
+
+
+    def test_encoded_fields(self):
+        structure = mmtfStructure(self.data, lazy=True)
+        structure.x_coord_list
+        structure.resolution
+        structure.y_coord_list = structure.y_coord_list + 1.0
+
+        encoded = structure.get_encoded_fields()
+        self.assertEqual(encoded[b'xCoordList'], self.data[b'xCoordList'])
+        self.assertEqual(encoded[b'groupList'], self.data[b'groupList'])
+        self.assertFalse(b'yCoordList' in encoded)
+        self.assertFalse(b'resolution' in encoded)
+
+        self.assertEqual(mmtfStructure(self.data).get_encoded_fields(), {})
+        self.assertTrue(b'xCoordList' in mmtfStructure(self.data, keep_encoded=True).get_encoded_fields())
+
+
+    def test_encoded_fields_read_only(self):
+        # In place changes would be written with the stale encoded data
+        structure = mmtfStructure(self.data, lazy=True)
+        with self.assertRaises(ValueError):
+            structure.x_coord_list[0] += 1.0
+        with self.assertRaises(ValueError):
+            structure.chain_id_list.array[0] = b'Z'
+
+        structure = mmtfStructure(self.data, lazy=True, coord_type='int32')
+        with self.assertRaises(ValueError):
+            structure.get_fixed_point('y_coord_list')[0][0] += 1
+        with self.assertRaises(ValueError):
+            structure.z_coord_list[0] += 1.0
+
+        structure = mmtfStructure(self.data)
+        structure.x_coord_list[0] += 1.0
+        self.assertNotEqual(structure.x_coord_list[0], mmtfStructure(self.data).x_coord_list[0])
+
+
+    def test_pass_through(self):
+        structure = mmtfStructure(self.data, lazy=True)
+        structure.z_coord_list = structure.z_coord_list * 2
+        data = msgpack.unpackb(structure.to_mmtf(), raw=False)
+
+        # Strings remain msgpack strings when passed through
+        self.assertEqual(data['groupList'][0]['groupName'], 'VAL')
+        self.assertEqual(data['structureId'], '4HHB')
+
+        copy = mmtfStructure(msgpack.unpackb(structure.to_mmtf(), raw=True))
+        eager = mmtfStructure(self.data)
+        self.assertTrue(np.array_equal(copy.x_coord_list, eager.x_coord_list))
+        self.assertTrue(np.allclose(copy.z_coord_list, eager.z_coord_list * 2))
+        self.assertEqual(copy.group_list, eager.group_list)
+        self.assertEqual(copy.entity_list, eager.entity_list)
+
+
+    def test_eager_round_trip(self):
+        # Fields held as read are written as msgpack strings
+        data = MmtfWriter.toByteArray(mmtfStructure(self.data), True)
+        decoder = MMTFDecoder()
+        decoder.decode_data(msgpack.unpackb(gzip.decompress(data), raw=False))
+
+        self.assertEqual(decoder.space_group, 'P 1 21 1')
+        self.assertEqual(decoder.experimental_methods, ['X-RAY DIFFRACTION'])
+        self.assertEqual(decoder.bio_assembly[0]['name'], '1')
+        self.assertEqual(decoder.structure_id, '4HHB')
+        self.assertEqual(decoder.num_atoms, 4779)
+
+
+if __name__ == '__main__':
+    unittest.main()
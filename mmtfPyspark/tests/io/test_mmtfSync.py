@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+import unittest
+import os
+import shutil
+import tempfile
+from mmtfPyspark.io import mmtfArchive, mmtfCompression, mmtfSync
+from mmtfPyspark.io.mmtfDownloader import unpack
+from mmtfPyspark.tests.io.mmtfServer import startServer, stopServer
+
+SEQUENCE_FILE = './resources/mmtf_reduced_sample/part-00000'
+
+
+class testMmtfSync(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.url = startServer()
+
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'pdb')
+        self.index = mmtfSync.initialize(self.path, SEQUENCE_FILE, shardBytes=100000)
+
+
+    def keys(self):
+        return [entry[0] for entry in mmtfArchive.readIndex(mmtfSync.getCurrent(self.path))]
+
+
+    def test_initialize(self):
+        self.assertEqual(mmtfSync.listGenerations(self.path), ['generation-00000'])
+        self.assertEqual(len(self.keys()), 145)
+
+        with self.assertRaises(Exception):
+            mmtfSync.initialize(self.path, SEQUENCE_FILE)
+
+
+    def test_update(self):
+        first = mmtfSync.getCurrent(self.path)
+        removed = [self.index[0][0], self.index[-1][0]]
+
+        stats = mmtfSync.update(self.path, added=['4HHB'], modified=['1stp'], removed=removed,
+                                baseUrl=self.url, shardBytes=100000)
+
+        self.assertEqual(stats['generation'], 'generation-00001')
+        self.assertEqual((stats['added'], stats['modified'], stats['removed']), (1, 1, 2))
+        self.assertEqual(stats['writtenShards'], 1)
+
+        keys = self.keys()
+        self.assertEqual(len(keys), 145 - 2 + 2)
+        self.assertIn('4HHB', keys)
+        self.assertIn('1STP', keys)
+        self.assertNotIn(removed[0], keys)
+
+        # Unchanged shards are linked, not rewritten
+        current = mmtfSync.getCurrent(self.path)
+        shard = self.index[len(self.index) // 2][1]
+        self.assertTrue(os.path.samefile(os.path.join(first, shard), os.path.join(current, shard)))
+
+        records = dict(mmtfArchive.readRecords(current, mmtfArchive.selectEntries(
+            mmtfArchive.readIndex(current), ['4HHB'])))
+        self.assertEqual(unpack(records['4HHB'])[b'structureId'], b'4HHB')
+
+        # The previous generation is unchanged
+        self.assertEqual(len(mmtfArchive.readIndex(first)), 145)
+
+
+    def test_merge(self):
+        # Removing all but one record of a shard merges the shard
+        shard = self.index[0][1]
+        removed = [entry[0] for entry in self.index if entry[1] == shard][1:]
+
+        stats = mmtfSync.update(self.path, removed=removed, baseUrl=self.url)
+
+        self.assertEqual(stats['mergedShards'], 1)
+        self.assertEqual(len(self.keys()), 145 - len(removed))
+        self.assertNotIn(shard, os.listdir(mmtfSync.getCurrent(self.path)))
+
+
+    def test_compression(self):
+        # Merged and downloaded gzip records are recompressed to the suffix of new shards
+        shard = self.index[0][1]
+        removed = [entry[0] for entry in self.index if entry[1] == shard][1:]
+
+        mmtfSync.update(self.path, added=['4HHB'], removed=removed, baseUrl=self.url,
+                        compression=None)
+
+        current = mmtfSync.getCurrent(self.path)
+        entries = [entry for entry in mmtfArchive.readIndex(current) if entry[1].endswith('.mmtf')]
+        records = dict(mmtfArchive.readRecords(current, entries))
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(unpack(records['4HHB'])[b'structureId'], b'4HHB')
+        self.assertTrue(all(mmtfCompression.getCompression(value) is None
+                            for value in records.values()))
+
+
+    def test_failed_download(self):
+        with self.assertRaises(Exception):
+            mmtfSync.update(self.path, added=['4HHB', '0XXX'], baseUrl=self.url)
+
+        self.assertEqual(mmtfSync.listGenerations(self.path), ['generation-00000'])
+        self.assertEqual(os.path.basename(mmtfSync.getCurrent(self.path)), 'generation-00000')
+
+
+    def test_rollback(self):
+        mmtfSync.update(self.path, added=['4HHB'], baseUrl=self.url)
+        mmtfSync.update(self.path, removed=['4HHB'], baseUrl=self.url)
+        self.assertNotIn('4HHB', self.keys())
+
+        self.assertEqual(mmtfSync.rollback(self.path), 'generation-00001')
+        self.assertIn('4HHB', self.keys())
+
+        self.assertEqual(mmtfSync.prune(self.path, keep=1), ['generation-00000'])
+        self.assertEqual(len(self.keys()), 146)
+
+        with self.assertRaises(Exception):
+            mmtfSync.rollback(self.path)
+
+
+    def test_manifest(self):
+        manifest = os.path.join(self.tmp, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write("# weekly update\nadded 4hhb\nmodified 1STP\n\nobsolete 1BUJ\n")
+
+        self.assertEqual(mmtfSync.readManifest(manifest),
+                         {'added': ['4HHB'], 'modified': ['1STP'], 'removed': ['1BUJ']})
+
+        status = os.path.join(self.tmp, 'status')
+        os.makedirs(status)
+        with open(os.path.join(status, 'added.pdb'), 'w') as f:
+            f.write("4HHB\n1STP\n")
+        with open(os.path.join(status, 'obsolete.pdb'), 'w') as f:
+            f.write("1BUJ\n")
+
+        self.assertEqual(mmtfSync.readManifest(status),
+                         {'added': ['4HHB', '1STP'], 'modified': [], 'removed': ['1BUJ']})
+
+
+    def tearDown(self):
+        stopServer(self.server)
+        shutil.rmtree(self.tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import io
+import msgpack
+import numpy as np
+from mmtfPyspark.io import structureParser
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+
+
+def readMmtf(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.gz'):
+        data = gzip.decompress(data)
+    return mmtfStructure(msgpack.unpackb(data, raw=True))
+
+
+class testStructureParser(unittest.TestCase):
+
+    def assertSameStructure(self, s, mmtf, chainIds=True):
+        for field in ['structure_id', 'num_atoms', 'num_groups', 'num_chains', 'num_models']:
+            self.assertEqual(getattr(s, field), getattr(mmtf, field))
+
+        for field in ['chains_per_model', 'groups_per_chain', 'group_id_list', 'sequence_index_list']:
+            self.assertTrue(np.array_equal(getattr(s, field), getattr(mmtf, field)))
+
+        if chainIds:
+            self.assertEqual(s.chain_id_list, mmtf.chain_id_list)
+        self.assertEqual(s.chain_name_list, mmtf.chain_name_list)
+        self.assertEqual(s.ins_code_list, mmtf.ins_code_list)
+        self.assertEqual([s.group_list[t]['groupName'] for t in s.group_type_list],
+                         [mmtf.group_list[t]['groupName'] for t in mmtf.group_type_list])
+        self.assertEqual([e['chainIndexList'] for e in s.entity_list],
+                         [e['chainIndexList'] for e in mmtf.entity_list])
+
+
+    def bonds(self, s):
+        return set(tuple(sorted(pair)) for pair in s.bond_atom_list.reshape(-1, 2).tolist())
+
+
+    def test_mmcif(self):
+        s = structureParser.readMmcif('./resources/files/1stp.cif.gz')
+        mmtf = readMmtf('./resources/files/1STP.mmtf')
+
+        self.assertSameStructure(s, mmtf)
+        self.assertTrue(np.allclose(s.x_coord_list, mmtf.x_coord_list))
+        self.assertTrue(np.allclose(s.b_factor_list, mmtf.b_factor_list))
+        self.assertEqual(s.alt_loc_list, mmtf.alt_loc_list)
+        self.assertEqual(s.group_list[0]['chemCompType'], 'L-PEPTIDE LINKING')
+        self.assertEqual(s.entity_list[0]['sequence'], mmtf.entity_list[0]['sequence'])
+        self.assertEqual(s.title, mmtf.title)
+        self.assertEqual(s.resolution, 2.6)
+        self.assertEqual(s.release_date, '1992-10-15')
+        # Peptide bonds, bonds within groups require the chemical component dictionary
+        self.assertEqual(self.bonds(s), self.bonds(mmtf))
+        self.assertEqual(s.num_bonds, len(s.bond_order_list))
+
+
+    def test_mmcif_models(self):
+        s = structureParser.readMmcif('./resources/files/test/1hv4.cif')
+        mmtf = readMmtf('./resources/files/test/1HV4.mmtf.gz')
+
+        self.assertSameStructure(s, mmtf)
+        self.assertEqual(self.bonds(s), self.bonds(mmtf))
+
+
+    def test_mmcif_bonds(self):
+        text = "\n".join(["data_TEST",
+                          "loop_",
+                          "_atom_site.group_PDB",
+                          "_atom_site.id",
+                          "_atom_site.type_symbol",
+                          "_atom_site.label_atom_id",
+                          "_atom_site.label_comp_id",
+                          "_atom_site.label_asym_id",
+                          "_atom_site.label_seq_id",
+                          "_atom_site.auth_seq_id",
+                          "_atom_site.Cartn_x",
+                          "_atom_site.Cartn_y",
+                          "_atom_site.Cartn_z",
+                          "ATOM 1 S SG CYS A 1 1 0.0 0.0 0.0",
+                          "ATOM 2 S SG CYS A 2 2 2.0 0.0 0.0",
+                          "HETATM 3 C C1 EOH B . 10 5.0 0.0 0.0",
+                          "HETATM 4 O O EOH B . 10 6.0 0.0 0.0",
+                          "loop_",
+                          "_chem_comp_bond.comp_id",
+                          "_chem_comp_bond.atom_id_1",
+                          "_chem_comp_bond.atom_id_2",
+                          "_chem_comp_bond.value_order",
+                          "EOH C1 O doub",
+                          "loop_",
+                          "_struct_conn.conn_type_id",
+                          "_struct_conn.ptnr1_label_asym_id",
+                          "_struct_conn.ptnr1_auth_seq_id",
+                          "_struct_conn.ptnr1_label_atom_id",
+                          "_struct_conn.ptnr2_label_asym_id",
+                          "_struct_conn.ptnr2_auth_seq_id",
+                          "_struct_conn.ptnr2_label_atom_id",
+                          "disulf A 1 SG A 2 SG",
+                          "metalc A 1 SG B 10 O"])
+        s = structureParser.readMmcif(io.StringIO(text))
+
+        self.assertEqual(s.group_list[s.group_type_list[2]]['bondAtomList'], (0, 1))
+        self.assertEqual(s.group_list[s.group_type_list[2]]['bondOrderList'], (2,))
+        self.assertTrue(np.array_equal(s.bond_atom_list, [0, 1]))
+        self.assertEqual(s.num_bonds, 2)
+
+
+    def test_pdb(self):
+        s = structureParser.readPdb('./resources/files/test/1hv4.pdb')
+        # PDB files have no label chain ids
+        self.assertSameStructure(s, readMmtf('./resources/files/test/1HV4.mmtf.gz'), chainIds=False)
+
+
+    def test_pdb_gzip(self):
+        s = structureParser.readPdb('./resources/files/3hdb.pdb.gz')
+
+        self.assertEqual(s.structure_id, '3HDB')
+        self.assertEqual(s.num_atoms, 3621)
+        self.assertEqual(s.resolution, 2.31)
+        self.assertEqual(s.r_free, 0.249)
+        self.assertEqual(s.deposition_date, '2009-05-07')
+
+
+    def test_pdb_without_header(self):
+        lines = ["ATOM      1  N   GLY A   1      11.104   6.134  -6.504  1.00  0.00           N",
+                 "ATOM      2  CA  GLY A   1      11.639   6.071  -5.147  1.00  0.00           C",
+                 "HETATM    3 ZN    ZN A 101       1.000   2.000   3.000  1.00  0.00          ZN2+",
+                 "HETATM    4  O   HOH B 201       4.000   5.000   6.000  0.50  0.00           O",
+                 "CONECT    2    3",
+                 "CONECT    3    2",
+                 "END"]
+        s = structureParser.readPdb(io.StringIO('\n'.join(lines)), '1abc')
+
+        self.assertEqual(s.structure_id, '1ABC')
+        self.assertEqual(s.num_groups, 3)
+        self.assertEqual(s.chain_name_list, ['A', 'B'])
+        self.assertTrue(np.array_equal(s.sequence_index_list, [0, -1, -1]))
+        self.assertEqual(s.group_list[1]['elementList'], ('Zn',))
+        self.assertEqual(s.group_list[1]['formalChargeList'], (2,))
+        self.assertEqual([e['type'] for e in s.entity_list], ['polymer', 'water'])
+        self.assertTrue(np.allclose(s.occupancy_list, [1.0, 1.0, 1.0, 0.5]))
+        self.assertTrue(np.array_equal(s.bond_atom_list, [1, 2]))
+
+
+    def test_cif_tokens(self):
+        text = "\n".join(["data_TEST",
+                          "_struct.title 'A title with spaces'",
+                          "_exptl.method",
+                          ";SOLUTION NMR",
+                          ";",
+                          "loop_",
+                          "_chem_comp.id",
+                          "_chem_comp.type",
+                          "ALA 'L-peptide linking'",
+                          "\"O5'\" ?"])
+        block, categories = structureParser.readCif(io.StringIO(text))
+
+        self.assertEqual(block, 'TEST')
+        self.assertEqual(categories['struct']['title'], ['A title with spaces'])
+        self.assertEqual(categories['exptl']['method'], ['SOLUTION NMR'])
+        self.assertEqual(categories['chem_comp']['id'], ['ALA', "O5'"])
+        self.assertEqual(categories['chem_comp']['type'], ['L-peptide linking', '?'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import msgpack
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.mappers import structureToInteractingResidues
+from mmtfPyspark.utils.structureToAllInteractions import structureToAllInteractions
+
+
+class testStructureToInteractingResidues(unittest.TestCase):
+
+    def setUp(self):
+        with gzip.open('./resources/files/4HHB.mmtf.gz', 'rb') as f:
+            self.structure = mmtfStructure(msgpack.unpackb(f.read(), raw=True))
+
+
+    def test_minimum_distance(self):
+        rows = structureToInteractingResidues('HEM', 4.0)(('4HHB', self.structure))
+
+        # Minimum distances of the atom interactions of each residue pair
+        expected = {}
+        for row in structureToAllInteractions('HEM', 4.0)(('4HHB', self.structure)):
+            key = (row[4], row[8])
+            expected[key] = min(expected.get(key, row[9]), row[9])
+
+        self.assertEqual(len(rows), 73)
+        self.assertEqual([(row[2], row[4]) for row in rows], sorted(expected))
+        for row in rows:
+            self.assertAlmostEqual(row[5], expected[(row[2], row[4])], places=5)
+
+        self.assertEqual(tuple(rows[0][:5]), ('4HHB', 'HEM', 574, 'TYR', 41))
+
+
+    def test_multiple_groups(self):
+        hem = structureToInteractingResidues('HEM', 5.0)(('4HHB', self.structure))
+        po4 = structureToInteractingResidues(['PO4'], 5.0)(('4HHB', self.structure))
+        both = structureToInteractingResidues('HEM,PO4', 5.0)(('4HHB', self.structure))
+
+        self.assertEqual(len(po4), 13)
+        self.assertEqual(sorted(both, key=lambda r: (r[2], r[4])),
+                         sorted(hem + po4, key=lambda r: (r[2], r[4])))
+
+
+    def test_query_pairs(self):
+        # Contacts of two specified groups are returned once
+        rows = structureToInteractingResidues('HOH', 3.5)(('4HHB', self.structure))
+        waters = [(row[2], row[4]) for row in rows if row[3] == 'HOH']
+
+        expected = set()
+        for row in structureToAllInteractions('HOH', 3.5)(('4HHB', self.structure)):
+            if row[5] == 'HOH':
+                expected.add((min(row[4], row[8]), max(row[4], row[8])))
+
+        self.assertTrue(len(waters) > 0)
+        self.assertEqual(len(waters), len(set(waters)))
+        self.assertEqual(set(waters), expected)
+        self.assertTrue(all(index1 < index2 for index1, index2 in waters))
+
+
+    def test_exclude(self):
+        water = structureToInteractingResidues('HOH', 4.0)(('4HHB', self.structure))
+        otherResidues = structureToInteractingResidues('HOH', 4.0, excludeSameResidue=True)(('4HHB', self.structure))
+        otherChains = structureToInteractingResidues('HEM', 4.0, excludeSameChain=True)(('4HHB', self.structure))
+
+        self.assertTrue(any(row[3] == 'HOH' for row in water))
+        self.assertFalse(any(row[3] == 'HOH' for row in otherResidues))
+        self.assertEqual(len(otherResidues), len([row for row in water if row[3] != 'HOH']))
+
+        # Hemes only contact residues of their own chain
+        self.assertEqual(otherChains, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
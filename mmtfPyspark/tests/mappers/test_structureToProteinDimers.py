@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import msgpack
+import numpy as np
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.mappers import structureToProteinDimers
+
+
+class testStructureToProteinDimers(unittest.TestCase):
+
+    def setUp(self):
+        with gzip.open('./resources/files/4HHB.mmtf.gz', 'rb') as f:
+            self.structure = mmtfStructure(msgpack.unpackb(f.read(), raw=True))
+
+
+    def bruteForce(self, cutoffDistance, contacts):
+        # Greedy contact count of all chain pairs from the C-beta atom distances
+        cs = self.structure.get_columnar_structure()
+        cb = cs.get_atom_names() == 'CB'
+        coords, chains = cs.get_coords()[cb], cs.get_atom_to_chain_indices()[cb]
+
+        dimers = []
+        for i in range(4):
+            for j in range(i):
+                d = np.linalg.norm(coords[chains == i][:, np.newaxis] - coords[chains == j][np.newaxis], axis=2)
+                used = set()
+                num = 0
+                for row in d < cutoffDistance:
+                    for k in np.flatnonzero(row):
+                        if k not in used:
+                            used.add(k)
+                            num += 1
+                            break
+                if num > contacts:
+                    dimers.append((i, j))
+        return dimers
+
+
+    def test_dimers(self):
+        dimers = structureToProteinDimers(8, 5)(('4HHB', self.structure))
+
+        self.assertEqual([d[0] for d in dimers], ['4HHB.B.B.2_append_4HHB.A.A.1',
+                                                  '4HHB.C.C.1_append_4HHB.B.B.2',
+                                                  '4HHB.D.D.2_append_4HHB.A.A.1',
+                                                  '4HHB.D.D.2_append_4HHB.C.C.1'])
+
+        dimer = dimers[0][1]
+        self.assertEqual(dimer.chain_name_list, ['B', 'A'])
+        self.assertEqual(dimer.num_atoms, len(dimer.x_coord_list))
+        self.assertEqual(dimer.num_groups, len(dimer.group_type_list))
+        self.assertEqual(dimer.num_atoms, 2192)
+
+
+    def test_contacts(self):
+        cs = self.structure.get_columnar_structure()
+
+        for cutoffDistance, contacts in [(8, 0), (8, 5), (10, 15), (6, 2)]:
+            mapper = structureToProteinDimers(cutoffDistance, contacts)
+            self.assertEqual(mapper._getContactPairs(cs, np.arange(4)),
+                             self.bruteForce(cutoffDistance, contacts))
+
+
+    def test_all_atoms(self):
+        self.assertEqual(len(structureToProteinDimers(8, 20)(('4HHB', self.structure))), 0)
+        self.assertEqual(len(structureToProteinDimers(5, 10, True)(('4HHB', self.structure))), 5)
+
+
+    def test_exclusive(self):
+        mapper = structureToProteinDimers(exclusive = True)
+        rng = np.random.RandomState(0)
+
+        # Vectors between chain centers close to the ones of earlier dimers,
+        # also in reverse order
+        vectors = rng.uniform(-20, 20, (300, 3))
+        vectors = np.concatenate((vectors, vectors[:200] + rng.uniform(-0.08, 0.08, (200, 3))))
+        vectors[-100:] *= -1
+        entities = [tuple(e) for e in rng.randint(0, 2, (500, 2)).tolist()]
+
+        exclusiveHashSet, unique = {}, []
+        for vec, e in zip(vectors, entities):
+            expected = any(np.linalg.norm(v - p) < 0.1 and mapper._angle(v, p) < 0.1
+                           for p, f in unique for v, g in ((vec, e), (-vec, e[::-1])) if f == g)
+
+            self.assertEqual(mapper._checkList(vec, e, exclusiveHashSet), expected)
+            if not expected:
+                mapper._addToList(vec, e, exclusiveHashSet)
+                unique.append((vec, e))
+
+        self.assertTrue(300 < len(unique) < 500)
+        self.assertEqual(len(structureToProteinDimers(8, 5, exclusive = True)(('4HHB', self.structure))), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import msgpack
+import numpy as np
+from mmtfPyspark.io import MmtfWriter, hadoopSequenceFile
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.mappers import structureToReducedStructure
+from mmtfPyspark.mappers.structureToReducedStructure import reduceStructure, getReducedAtomIndices
+from mmtfPyspark.utils import mmtfCodec
+
+
+class structureToReducedStructureTest(unittest.TestCase):
+
+    def setUp(self):
+        with gzip.open('./resources/files/4HHB.mmtf.gz', 'rb') as f:
+            self.structure = mmtfStructure(msgpack.unpackb(f.read(), raw=True))
+
+        part = hadoopSequenceFile.getPartFiles('./resources/mmtf_reduced_sample')[0]
+        self.reduced = []
+        for key, value, offset in hadoopSequenceFile.readRecords(part):
+            self.reduced.append(mmtfStructure(msgpack.unpackb(gzip.decompress(value), raw=True)))
+            if len(self.reduced) == 20:
+                break
+
+
+    def test_selection(self):
+        # 4HHB: 4 hemoglobin chains (141 + 146 + 141 + 146 CA atoms), 4 HEM,
+        # 2 PO4 and water
+        r, indices = reduceStructure(self.structure, returnAtomIndices=True)
+
+        self.assertEqual(r.num_chains, self.structure.num_chains)
+        self.assertEqual(list(r.groups_per_chain[:4]), [141, 146, 141, 146])
+        self.assertEqual(r.num_atoms, 574 + 4 * 43 + 2 * 1)
+        self.assertTrue(np.array_equal(indices, getReducedAtomIndices(self.structure)))
+
+        groupNames = [g['groupName'] for g in r.group_list]
+        self.assertNotIn('HOH', groupNames)
+        for group in r.group_list:
+            if 'PEPTIDE' in group['chemCompType'].upper():
+                self.assertEqual(group['atomNameList'], ('CA',))
+
+        self.assertTrue(np.array_equal(r.atom_id_list, self.structure.atom_id_list[indices]))
+        self.assertTrue(np.allclose(r.x_coord_list, self.structure.x_coord_list[indices], atol=0.05))
+
+
+    def test_precision(self):
+        data = MmtfWriter.toByteArray(reduceStructure(self.structure), False)
+        encoded = msgpack.unpackb(data, raw=True)
+
+        for key in [b'xCoordList', b'yCoordList', b'zCoordList', b'bFactorList']:
+            codec, length, param, body = mmtfCodec.parse_header(encoded[key])
+            self.assertEqual((codec, param), (10, 10))
+
+        self.assertLess(len(data), len(MmtfWriter.toByteArray(self.structure, False)) / 2)
+
+
+    def test_reduced_input(self):
+        # Reduced structures are their own reduced representation
+        for s in self.reduced:
+            r = reduceStructure(s)
+            self.assertEqual(r.num_atoms, s.num_atoms)
+            self.assertEqual(r.num_groups, s.num_groups)
+            self.assertTrue(np.array_equal(r.atom_id_list, s.atom_id_list))
+
+
+    def test_mapper(self):
+        key, r = structureToReducedStructure()(('4HHB', self.structure))
+
+        self.assertEqual(key, '4HHB')
+        self.assertEqual(r.structure_id, self.structure.structure_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+import unittest
+import numpy as np
+from pyspark import SparkConf, SparkContext
+from pyspark.sql.types import StringType, IntegerType, FloatType, ArrayType, DoubleType
+from pyspark.ml.linalg import Vectors, VectorUDT
+from mmtfPyspark.ml import pythonRDDToDataset
+
+
+class pythonRDDToDatasetTest(unittest.TestCase):
+
+    def setUp(self):
+        conf = SparkConf().setMaster("local[*]").setAppName('pythonRDDToDataset')
+        self.sc = SparkContext(conf=conf)
+
+        self.colNames = ["id", "count", "value", "values", "features"]
+        types = [StringType(), IntegerType(), FloatType(), ArrayType(DoubleType()), VectorUDT()]
+        self.schema = pythonRDDToDataset.getSchema(self.colNames, types,
+                                                   [False, True, False, True, False])
+
+        self.rows = self.sc.parallelize([("1STP", 1, 0.5, [1.0, 2.0], Vectors.dense([1.0, 2.0])),
+                                         ("4HHB", None, 1.5, None, Vectors.dense([3.0, 4.0]))], 2)
+
+
+    def test_rows(self):
+        ds = pythonRDDToDataset.getDataset(self.rows, self.colNames, self.schema)
+
+        self.assertEqual(ds.schema, self.schema)
+        rows = sorted(ds.collect())
+        self.assertEqual(rows[0]['values'], [1.0, 2.0])
+        self.assertEqual(rows[1]['count'], None)
+        self.assertEqual(rows[1]['features'], Vectors.dense([3.0, 4.0]))
+
+
+    def test_batches(self):
+        # Column batches with numpy columns, and two dimensional vector columns
+        batches = self.sc.parallelize([[["1STP", "4HHB"], np.array([1, 2]), np.array([0.5, 1.5]),
+                                        np.array([[1.0, 2.0], [3.0, 4.0]]),
+                                        np.array([[1.0, 2.0], [3.0, 4.0]])]], 1)
+
+        for useArrow in [None, False, True] if pythonRDDToDataset.ARROW_AVAILABLE else [None, False]:
+            ds = pythonRDDToDataset.getDatasetFromBatches(batches, self.schema, useArrow)
+            rows = sorted(ds.collect())
+
+            self.assertEqual(ds.columns, self.colNames)
+            self.assertEqual(rows[1]['count'], 2)
+            self.assertEqual(rows[1]['values'], [3.0, 4.0])
+            self.assertEqual(rows[1]['features'], Vectors.dense([3.0, 4.0]))
+
+
+    def test_arrow_batches(self):
+        # Several batches per partition, with None values in nullable columns
+        if not pythonRDDToDataset.ARROW_AVAILABLE:
+            self.skipTest("pyarrow or mapInArrow is not available")
+
+        batches = self.sc.parallelize([[["1STP"], [None], [0.5], [None], [Vectors.dense([1.0, 2.0])]],
+                                       [["4HHB"], [2], [1.5], [[3.0]], [Vectors.dense([3.0, 4.0])]]], 1)
+
+        ds = pythonRDDToDataset.getDatasetFromBatches(batches, self.schema, True)
+        rows = sorted(ds.collect())
+
+        self.assertEqual(ds.schema, self.schema)
+        self.assertEqual(rows[0]['count'], None)
+        self.assertEqual(rows[0]['values'], None)
+        self.assertEqual(rows[1]['values'], [3.0])
+        self.assertEqual(rows[1]['features'], Vectors.dense([3.0, 4.0]))
+
+
+    def test_inferred_schema(self):
+        rows = self.sc.parallelize([("1STP", 1, 0.5)])
+        ds = pythonRDDToDataset.getDataset(rows, ["id", "count", "value"])
+
+        self.assertEqual([f.dataType for f in ds.schema.fields], [StringType(), IntegerType(), FloatType()])
+
+
+    def tearDown(self):
+        self.sc.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import pickle
+import msgpack
+import numpy as np
+from mmtfPyspark.io import hadoopSequenceFile
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.utils import ColumnarStructure, ColumnarStructureX, getColumnarStructure
+
+
+class testColumnarStructure(unittest.TestCase):
+
+    def setUp(self):
+        with gzip.open('./resources/files/4HHB.mmtf.gz', 'rb') as f:
+            self.structure = mmtfStructure(msgpack.unpackb(f.read(), raw=True))
+
+        # 1BUJ: NMR structure, 20 models of one chain
+        part = hadoopSequenceFile.getPartFiles('./resources/mmtf_reduced_sample')[0]
+        for key, value, offset in hadoopSequenceFile.readRecords(part):
+            if key == '1BUJ':
+                self.nmr = mmtfStructure(msgpack.unpackb(gzip.decompress(value), raw=True))
+                break
+
+
+    def test_atom_columns(self):
+        cs = ColumnarStructure(self.structure)
+
+        self.assertEqual(cs.get_num_atoms(), 4779)
+        self.assertEqual(cs.get_num_chains(), 14)
+        self.assertEqual(cs.get_atom_names()[:4].tolist(), ['N', 'CA', 'C', 'O'])
+        self.assertEqual(cs.get_elements()[:4].tolist(), ['N', 'C', 'C', 'O'])
+        self.assertEqual(cs.get_group_names()[0], 'VAL')
+        self.assertEqual(cs.get_group_numbers()[0], '1')
+        self.assertEqual(cs.get_chain_ids()[0], 'A')
+        self.assertEqual(cs.get_atom_names().dtype.kind, 'U')
+
+        groups = cs.get_atom_to_group_indices()
+        self.assertEqual(len(groups), 4779)
+        self.assertTrue(np.all(np.diff(groups) >= 0))
+        self.assertEqual(cs.get_group_to_atom_indices()[-1], 4779)
+
+
+    def test_entity_types(self):
+        cs = ColumnarStructure(self.structure)
+        entityTypes = cs.get_entity_types()
+        groupNames = cs.get_group_names()
+
+        self.assertEqual(set(entityTypes[cs.is_polymer()]), {'PRO'})
+        self.assertEqual(set(entityTypes[groupNames == 'HOH']), {'WAT'})
+        self.assertEqual(set(entityTypes[groupNames == 'HEM']), {'LGO'})
+        self.assertEqual(set(entityTypes[groupNames == 'PO4']), {'LGI'})
+
+
+    def test_models(self):
+        first = ColumnarStructure(self.nmr)
+        models = ColumnarStructure(self.nmr, firstModelOnly=False)
+
+        self.assertEqual(first.get_num_models(), 1)
+        self.assertEqual(models.get_num_models(), 20)
+        self.assertEqual(models.get_num_atoms(), self.nmr.num_atoms)
+        self.assertEqual(first.get_num_atoms() * 20, self.nmr.num_atoms)
+        self.assertEqual(len(first.get_x_coords()), first.get_num_atoms())
+
+        self.assertEqual(set(models.get_entity_types()), {'PRO'})
+        self.assertEqual(models.get_atom_to_model_indices()[-1], 19)
+        self.assertEqual(np.bincount(models.get_atom_to_model_indices()).tolist(),
+                         [first.get_num_atoms()] * 20)
+
+
+    def test_hierarchy_index(self):
+        cs = getColumnarStructure(self.structure)
+        models = ColumnarStructure(self.nmr, firstModelOnly=False)
+
+        self.assertIs(getColumnarStructure(self.structure), cs)
+        self.assertEqual(cs.get_model_to_chain_indices().tolist(), [0, 14])
+        self.assertEqual(models.get_model_to_chain_indices()[-1], models.get_num_chains())
+        self.assertEqual(len(models.get_model_to_chain_indices()), 21)
+
+        # 4 hemoglobin chains, followed by ligand and water chains
+        self.assertEqual(cs.is_polymer_chain().tolist(), [True] * 4 + [False] * 10)
+        self.assertEqual(cs.get_chain_to_entity_index()[:4].tolist(), [0, 1, 0, 1])
+        self.assertTrue(np.all(models.is_polymer_chain()))
+
+        groupNames = cs.get_group_property('groupName')
+        self.assertEqual(len(groupNames), cs.get_num_groups())
+        self.assertEqual(groupNames[0], 'VAL')
+        self.assertEqual(groupNames[cs.get_atom_to_group_indices()].tolist(),
+                         cs.get_group_names().tolist())
+
+
+    def test_calpha(self):
+        csx = ColumnarStructureX(self.structure)
+
+        self.assertEqual(len(csx.get_calpha_atom_indices()), 574)
+        self.assertEqual(csx.get_calpha_coordinates().shape, (574, 3))
+
+
+    def test_cache(self):
+        cs = self.structure.get_columnar_structure()
+
+        self.assertIs(self.structure.get_columnar_structure(), cs)
+        self.assertIsNot(self.structure.get_columnar_structure(False), cs)
+
+        cs.get_atom_names()
+        copy = pickle.loads(pickle.dumps(self.structure))
+        self.assertIsNot(copy.get_columnar_structure(), cs)
+
+
+if __name__ == '__main__':
+    unittest.main()
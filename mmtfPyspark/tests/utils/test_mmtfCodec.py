@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import unittest
+import numpy as np
+from mmtf.codecs import default_codec
+from mmtfPyspark.utils import mmtfCodec
+
+
+def getTestData(n, seed=7):
+    # Returns a dictionary of codec -> (decoded array, parameter)
+    rng = np.random.RandomState(seed)
+    runs = np.repeat(rng.randint(0, 100, n // 10 + 1), 10)[:n]
+
+    return {
+        1: (rng.normal(0, 10, n).astype(np.float32), 0),
+        2: (rng.randint(-1, 8, n), 0),
+        3: (rng.randint(-1000, 1000, n), 0),
+        4: (rng.randint(0, 100000, n), 0),
+        5: (np.array(['A', 'BB', 'CCC', 'DDDD'] * (n // 4 + 1))[:n], 4),
+        6: (np.array(['\x00'] * (n - n // 20) + ['A'] * (n // 20)), 0),
+        7: (runs, 0),
+        8: (np.arange(1, n + 1), 0),
+        9: (runs / 100, 100),
+        10: (np.cumsum(rng.normal(0, 1.5, n)).round(3), 1000),
+        11: (rng.randint(-1000, 1000, n) / 100, 100),
+        12: (rng.randint(-40000, 40000, n) / 1000, 1000),
+        13: (rng.randint(-500, 500, n) / 10, 10),
+        14: (rng.randint(-40000, 40000, n), 0),
+        15: (rng.randint(-500, 500, n), 0),
+    }
+
+
+class testMmtfCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.data = getTestData(1000)
+
+
+    def test_header(self):
+        encoded = mmtfCodec.encode_array([1, 1, 2], 7, 0)
+        codec, length, param, body = mmtfCodec.parse_header(encoded)
+
+        self.assertEqual((codec, length, param), (7, 3, 0))
+        self.assertEqual(len(body), 16)
+
+
+    def test_round_trip(self):
+        for codec, (array, param) in self.data.items():
+            decoded = mmtfCodec.decode_array(mmtfCodec.encode_array(array, codec, param))
+
+            if codec == 5:
+                self.assertEqual([x.decode() for x in decoded], list(array))
+            elif codec == 6:
+                self.assertEqual([chr(x) for x in decoded.view(np.uint8)],
+                                 [c or '\x00' for c in array])
+            else:
+                self.assertTrue(np.allclose(decoded, array), codec)
+
+
+    def test_reference_decoder(self):
+        for codec in [2, 4, 8, 9, 10]:
+            array, param = self.data[codec]
+            encoded = mmtfCodec.encode_array(array, codec, param)
+
+            self.assertTrue(np.allclose(mmtfCodec.decode_array(encoded),
+                                        default_codec.decode_array(encoded)), codec)
+
+
+    def test_integer_dtypes(self):
+        for codec, dtype in [(2, np.int8), (3, np.int16), (4, np.int32),
+                             (7, np.int32), (8, np.int32), (14, np.int32), (15, np.int32)]:
+            array, param = self.data[codec]
+            decoded = mmtfCodec.decode_array(mmtfCodec.encode_array(array, codec, param))
+
+            self.assertEqual(decoded.dtype, dtype)
+
+
+    def test_recursive_index(self):
+        array = np.array([0, 32767, -32768, 32768, -65537, 100000, -1, 1])
+        encoded = mmtfCodec.recursive_index_encode(array)
+
+        self.assertEqual(list(encoded[:5]), [0, 32767, 0, -32768, 0])
+        self.assertTrue(np.array_equal(mmtfCodec.recursive_index_decode(encoded), array))
+
+
+    def test_run_length(self):
+        encoded = mmtfCodec.run_length_encode([1, 1, 1, 4, 4, 2])
+
+        self.assertEqual(list(encoded), [1, 3, 4, 2, 2, 1])
+        self.assertEqual(list(mmtfCodec.run_length_decode(encoded)), [1, 1, 1, 4, 4, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
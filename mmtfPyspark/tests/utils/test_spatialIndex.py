@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+from collections import namedtuple
+import msgpack
+import numpy as np
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.utils import SpatialIndex, distanceBox
+
+
+class testSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        with gzip.open('./resources/files/4HHB.mmtf.gz', 'rb') as f:
+            structure = mmtfStructure(msgpack.unpackb(f.read(), raw=True))
+
+        self.coords = structure.get_columnar_structure().get_coords()
+
+        rng = np.random.RandomState(0)
+        self.points = rng.uniform(-20, 20, (300, 3))
+        self.queries = rng.uniform(-25, 25, (200, 3))
+
+
+    def bruteForce(self, queries, points, radius):
+        d = np.sqrt(((queries[:, np.newaxis] - points[np.newaxis]) ** 2).sum(axis=2))
+        return np.nonzero(d <= radius)
+
+
+    def test_query_radius(self):
+        for radius, cellSize in [(4.0, 4.0), (4.0, 2.5), (6.5, 10.0)]:
+            index = SpatialIndex(self.points, cellSize)
+            q, i, d = index.query_radius(self.queries, radius, return_distance=True)
+            expected = self.bruteForce(self.queries, self.points, radius)
+
+            self.assertTrue(np.array_equal(q, expected[0]))
+            self.assertTrue(np.array_equal(i, expected[1]))
+            self.assertTrue(np.allclose(d, np.linalg.norm(self.queries[q] - self.points[i], axis=1)))
+
+        counts = index.count_neighbors(self.queries, 6.5)
+        self.assertEqual(counts.tolist(), np.bincount(expected[0], minlength=200).tolist())
+
+
+    def test_query_index(self):
+        index = SpatialIndex(self.points, 5.0)
+        i, j = index.query_index(SpatialIndex(self.queries, 5.0), 5.0)
+        q, p = self.bruteForce(self.queries, self.points, 5.0)
+
+        self.assertTrue(np.all(np.diff(i) >= 0))
+        self.assertEqual(set(zip(i.tolist(), j.tolist())), set(zip(p.tolist(), q.tolist())))
+
+
+    def test_query_pairs(self):
+        index = SpatialIndex(self.coords, 4.0)
+        i, j = index.query_pairs(4.0)
+
+        first, second = self.bruteForce(self.coords[:500], self.coords, 4.0)
+        upper = first < second
+
+        self.assertTrue(np.all(i < j))
+        self.assertEqual(len(set(zip(i.tolist(), j.tolist()))), len(i))
+        self.assertTrue(np.array_equal(i[i < 500], first[upper]))
+        self.assertTrue(np.array_equal(j[i < 500], second[upper]))
+
+
+    def test_empty(self):
+        index = SpatialIndex(np.zeros((0, 3)), 5.0)
+
+        self.assertEqual(len(index.query_radius(self.queries, 5.0)[0]), 0)
+        self.assertEqual(len(index.query_pairs(5.0)[0]), 0)
+        self.assertEqual(len(SpatialIndex(self.points, 5.0).query_radius(np.zeros((0, 3)), 5.0)[0]), 0)
+
+        with self.assertRaises(Exception):
+            SpatialIndex(self.points, 0.0)
+
+
+    def test_distance_box(self):
+        Point = namedtuple('Point', ['x', 'y', 'z'])
+        box1, box2 = distanceBox(5.0), distanceBox(5.0)
+        box1.addPoints(self.points, list(range(len(self.points))))
+        for i, p in enumerate(self.queries + 30.0):
+            box2.addPoint(Point(*p), i)
+
+        intersection = box1.getIntersection(box2)
+        close = SpatialIndex(self.points, 5.0).count_neighbors(self.queries + 30.0, 5.0)
+
+        # Points within the distance are in the intersection
+        near = np.unique(SpatialIndex(self.queries + 30.0, 5.0).query_radius(self.points, 5.0)[0])
+        self.assertTrue(set(near.tolist()) <= set(intersection))
+        self.assertTrue(close.sum() > 0)
+        self.assertEqual(sorted(box1.hashMap[box1.locations[0]])[0], 0)
+        self.assertIs(box1.hashMap, box1.hashMap)
+        self.assertEqual(sum(len(names) for names in box1.hashMap.values()), len(self.points))
+
+        # Points are returned by box, in the order of the neighbor offsets
+        # of the boxes in the order they were added to
+        box1, box2 = distanceBox(1.0), distanceBox(1.0)
+        box1.addPoints([[5, 0, 0], [1, 0, 0], [0, 0, 0], [2, 0, 0], [1, 0, 0], [-1, 0, 0], [0, 0, 0]],
+                       list(range(7)))
+        box2.addPoint(Point(1, 1, 0), 'a')
+        self.assertEqual(box1.getIntersection(box2), [1, 4, 2, 6, 3, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+import unittest
+import gzip
+import msgpack
+import numpy as np
+from mmtfPyspark.io.mmtfStructure import mmtfStructure
+from mmtfPyspark.utils.structureToAllInteractions import structureToAllInteractions
+
+
+class testStructureToAllInteractions(unittest.TestCase):
+
+    def setUp(self):
+        with gzip.open('./resources/files/4HHB.mmtf.gz', 'rb') as f:
+            self.structure = mmtfStructure(msgpack.unpackb(f.read(), raw=True))
+
+
+    def test_interactions(self):
+        rows = structureToAllInteractions('HEM', 4.0)(('4HHB', self.structure))
+
+        self.assertEqual(len(rows), 337)
+        self.assertEqual(tuple(rows[0][:9]), ('4HHB', 'HEM', 'CMD', 'C', 574, 'TYR', 'O', 'O', 41))
+        self.assertTrue(all(row[9] <= 4.0 for row in rows))
+        self.assertTrue(all(row[4] != row[8] for row in rows))
+
+        # Rows are ordered by group indices
+        pairs = [(row[4], row[8]) for row in rows]
+        self.assertEqual(pairs, sorted(pairs))
+
+
+    def test_distances(self):
+        batch = structureToAllInteractions('PO4', 5.0).getBatch(('4HHB', self.structure))
+        cs = self.structure.get_columnar_structure()
+        coords = cs.get_coords()
+
+        # Brute force distances of all atoms to the atoms of the PO4 groups
+        po4 = np.flatnonzero(cs.get_group_names() == 'PO4')
+        d = np.linalg.norm(coords[po4][:, np.newaxis] - coords[np.newaxis], axis=2)
+        group = cs.get_atom_to_group_indices()
+        expected = np.sum((d <= 5.0) & (group[po4][:, np.newaxis] != group[np.newaxis]))
+
+        self.assertEqual(len(batch[0]), expected)
+        self.assertEqual(set(batch[1]), {'PO4'})
+        self.assertEqual(batch[9].dtype, np.float32)
+
+
+    def test_no_group(self):
+        mapper = structureToAllInteractions('XXX', 4.0)
+
+        self.assertEqual(mapper(('4HHB', self.structure)), [])
+        self.assertEqual(mapper.getBatches(('4HHB', self.structure)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,2 +1,5 @@
 from .dsspSecondaryStructure import dsspSecondaryStructure
 from .distanceBox import distanceBox
+from .columnarStructure import ColumnarStructure, getColumnarStructure
+from .columnarStructureX import ColumnarStructureX
+from .spatialIndex import SpatialIndex
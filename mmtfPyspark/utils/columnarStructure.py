@@ -0,0 +1,440 @@
+#!/user/bin/env python
+'''
+columnarStructure.py
+
+Provides efficient access to structure information in the form of atom-based arrays.
+Data are lazily initialized as needs.
+
+Atom columns are built from group, chain and group type tables with
+np.repeat and fancy indexing, without loops over atoms or groups. String
+columns are fixed width numpy unicode arrays.
+
+The group, chain and model offsets of a structure are its hierarchy index,
+which filters and mappers share through getColumnarStructure instead of
+walking chains_per_model and groups_per_chain themselves.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+import numpy as np
+
+# Groups without carbon atoms are inorganic ligands, except these organic
+# looking ones, which are inorganic despite their carbon atom
+_INORGANIC = frozenset(["CO2", "CMO", "CYN"])
+_WATER = frozenset(["HOH", "DOD"])
+
+
+def getColumnarStructure(structure, firstModelOnly = True):
+    '''Returns the columnar view of a structure. Views of an mmtfStructure
+    are created once and cached by the structure, views of other structures,
+    e.g. MMTFEncoder objects created by mappers, are created on each call
+
+    Attributes:
+        structure (mmtfStructure): mmtf structure
+        firstModelOnly (bool): use only the first model in a structure if True
+    '''
+
+    if hasattr(structure, 'get_columnar_structure'):
+        return structure.get_columnar_structure(firstModelOnly)
+
+    return ColumnarStructure(structure, firstModelOnly)
+
+
+class ColumnarStructure(object):
+    '''Column based data structure to efficiently access structure information
+
+    Attributes:
+        structure (mmtfStructure): mmtf structure
+        firstModelOnly (bool): use only the first model in a structure if True
+    '''
+
+    def __init__(self, structure, firstModelOnly = True):
+
+        # Set class variables
+        self.numAtoms = 0
+        self.numChains = 0
+        self.numGroups = 0
+        self.numModels = 0
+
+
+        self.atomNames = None
+        self.atomToChainIndices = None
+        self.atomToGroupIndices = None
+        self.atomToModelIndices = None
+        self.chainPolymer = None
+        self.chainIds = None
+        self.chainNames = None
+        self.chemCompType = None
+        self.elements = None
+        self.entityTypes = None
+        self.entityChainIndex = None
+        self.entityIndices = None
+        self.groupNames = None
+        self.groupNumbers = None
+        self.groupToAtomIndices = None
+        self.groupToChainIndices = None
+        self.groupTypeAtomOffsets = None
+        self.polymer = None
+        self.sequencePositions = None
+        self.structure = structure
+
+        if firstModelOnly:
+            self.numModels = min(1, structure.num_models)
+        else:
+            self.numModels = structure.num_models
+
+
+    def get_group_to_atom_indices(self):
+        '''Returns the index of the first atom of each group, and the
+        number of atoms as the last element
+        '''
+        self.get_indices()
+        return self.groupToAtomIndices
+
+
+    def get_chain_to_atom_indices(self):
+        '''Returns the index of the first atom of each chain, and the
+        number of atoms as the last element
+        '''
+        self.get_indices()
+        return self.chainToAtomIndices
+
+
+    def get_chain_to_group_indices(self):
+        '''Returns the index of the first group of each chain, and the
+        number of groups as the last element
+        '''
+        self.get_indices()
+        return self.chainToGroupIndices
+
+
+    def get_model_to_chain_indices(self):
+        '''Returns the index of the first chain of each model, and the
+        number of chains as the last element
+        '''
+        self.get_indices()
+        return self.modelToChainIndices
+
+
+    def get_num_atoms(self):
+        self.get_indices()
+        return self.numAtoms
+
+
+    def get_num_groups(self):
+        self.get_indices()
+        return self.numGroups
+
+
+    def get_num_chains(self):
+        self.get_indices()
+        return self.numChains
+
+
+    def get_num_models(self):
+        self.get_indices()
+        return self.numModels
+
+
+    def get_x_coords(self):
+        return self.structure.x_coord_list[:self.get_num_atoms()]
+
+
+    def get_y_coords(self):
+        return self.structure.y_coord_list[:self.get_num_atoms()]
+
+
+    def get_z_coords(self):
+        return self.structure.z_coord_list[:self.get_num_atoms()]
+
+
+    def get_coords(self):
+        '''Returns the coordinates as an array of shape (number of atoms, 3)
+        '''
+        return np.column_stack((self.get_x_coords(), self.get_y_coords(), self.get_z_coords()))
+
+
+    def get_occupancies(self):
+        return self.structure.occupancy_list[:self.get_num_atoms()]
+
+
+    def get_b_factors(self):
+        return self.structure.b_factor_list[:self.get_num_atoms()]
+
+
+    def get_alt_loc_list(self):
+        if not self.structure.alt_loc_set:
+            self.structure = self.structure.set_alt_loc_list()
+        return np.asarray(self.structure.alt_loc_list)[:self.get_num_atoms()].astype(str)
+
+
+    def get_group_types(self):
+        return np.asarray(self.structure.group_type_list)[:self.get_num_groups()]
+
+
+    def get_group_property(self, key):
+        '''Returns a property of the group types for each group, one value
+        per group rather than per atom
+
+        Attributes:
+            key (str): group type property, e.g. 'groupName' or 'chemCompType'
+        '''
+        return self._group_type_table(key)[self.get_group_types()]
+
+
+    def get_atom_to_group_indices(self):
+
+        if self.atomToGroupIndices is None:
+            counts = np.diff(self.get_group_to_atom_indices())
+            self.atomToGroupIndices = np.repeat(np.arange(self.numGroups, dtype=np.int32), counts)
+
+        return self.atomToGroupIndices
+
+
+    def get_group_to_chain_indices(self):
+
+        if self.groupToChainIndices is None:
+            counts = np.diff(self.get_chain_to_group_indices())
+            self.groupToChainIndices = np.repeat(np.arange(self.numChains, dtype=np.int32), counts)
+
+        return self.groupToChainIndices
+
+
+    def get_atom_to_chain_indices(self):
+
+        if self.atomToChainIndices is None:
+            self.atomToChainIndices = self.get_group_to_chain_indices()[self.get_atom_to_group_indices()]
+
+        return self.atomToChainIndices
+
+
+    def get_atom_to_model_indices(self):
+
+        if self.atomToModelIndices is None:
+            chainsPerModel = np.diff(self.get_model_to_chain_indices())
+            chainToModel = np.repeat(np.arange(self.numModels, dtype=np.int32), chainsPerModel)
+            self.atomToModelIndices = chainToModel[self.get_atom_to_chain_indices()]
+
+        return self.atomToModelIndices
+
+
+    def _group_type_table(self, key):
+        # Values of a group type property, as an array over group types
+        return np.array([group[key] for group in self.structure.group_list], dtype=str)
+
+
+    def _atom_table(self, key):
+        # Atom property of group types, expanded to all atoms
+        groupList = self.structure.group_list
+        values = np.array([value for group in groupList for value in group[key]], dtype=str)
+
+        if self.groupTypeAtomOffsets is None:
+            sizes = [len(group['atomNameList']) for group in groupList]
+            self.groupTypeAtomOffsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+
+        groupToAtom = self.get_group_to_atom_indices()
+        atomToGroup = self.get_atom_to_group_indices()
+        atomInGroup = np.arange(self.numAtoms) - groupToAtom[atomToGroup]
+        offsets = self.groupTypeAtomOffsets[self.get_group_types()]
+
+        return values[offsets[atomToGroup] + atomInGroup]
+
+
+    def _group_column(self, groupValues):
+        # Group property expanded to all atoms
+        return groupValues[self.get_atom_to_group_indices()]
+
+
+    def get_chem_comp_types(self):
+
+        if self.chemCompType is None:
+            table = self._group_type_table('chemCompType')
+            self.chemCompType = self._group_column(table[self.get_group_types()])
+
+        return self.chemCompType
+
+
+    def get_elements(self):
+
+        if self.elements is None:
+            self.elements = self._atom_table('elementList')
+
+        return self.elements
+
+
+    def get_atom_names(self):
+
+        if self.atomNames is None:
+            self.atomNames = self._atom_table('atomNameList')
+
+        return self.atomNames
+
+
+    def get_entity_types(self):
+
+        if self.entityTypes is None:
+            groupList = self.structure.group_list
+            numTypes = len(groupList)
+            groupNames = self._group_type_table('groupName')
+            ccTypes = np.char.upper(self._group_type_table('chemCompType'))
+
+            # If a group contains at least one carbon atom, it is considered
+            # organic, except carbon dioxide, carbon monoxide and cyanide ion
+            organic = np.array([name not in _INORGANIC and 'C' in group['elementList']
+                                for name, group in zip(groupNames.tolist(), groupList)], dtype=bool)
+
+            def contains(text):
+                return np.char.find(ccTypes, text) >= 0
+
+            # Entity type of each group type in polymer and non-polymer chains
+            polymerTypes = np.select([contains("PEPTIDE"), contains("DNA"), contains("RNA"),
+                                      contains("SACCHARIDE")],
+                                     ["PRO", "DNA", "RNA", "PSR"], "UNK")
+            otherTypes = np.select([np.isin(groupNames, list(_WATER)), contains("SACCHARIDE"), organic],
+                                   ["WAT", "SAC", "LGO"], "LGI")
+            table = np.concatenate((otherTypes, polymerTypes)).astype('U3')
+
+            groupPolymer = self.is_polymer_chain()[self.get_group_to_chain_indices()]
+            groupTypes = self.get_group_types() + numTypes * groupPolymer
+
+            self.entityTypes = self._group_column(table[groupTypes])
+
+        return self.entityTypes
+
+
+    def get_group_names(self):
+
+        if self.groupNames is None:
+            table = self._group_type_table('groupName')
+            self.groupNames = self._group_column(table[self.get_group_types()])
+
+        return self.groupNames
+
+
+    def get_group_numbers(self):
+
+        if self.groupNumbers is None:
+            numGroups = self.get_num_groups()
+            groupIds = np.asarray(self.structure.group_id_list)[:numGroups].astype(str)
+            # Missing insertion codes are null characters, which numpy strips
+            insCodes = np.asarray(self.structure.ins_code_list)[:numGroups].astype('U1')
+            self.groupNumbers = self._group_column(np.char.add(groupIds, insCodes))
+
+        return self.groupNumbers
+
+
+    def get_chain_ids(self):
+
+        if self.chainIds is None:
+            chainIds = np.asarray(self.structure.chain_id_list)[:self.get_num_chains()].astype(str)
+            self.chainIds = chainIds[self.get_atom_to_chain_indices()]
+
+        return self.chainIds
+
+
+    def get_chain_names(self):
+
+        if self.chainNames is None:
+            chainNames = np.asarray(self.structure.chain_name_list)[:self.get_num_chains()].astype(str)
+            self.chainNames = chainNames[self.get_atom_to_chain_indices()]
+
+        return self.chainNames
+
+
+    def is_polymer_chain(self):
+        '''Returns true for chains of polymer entities
+        '''
+
+        if self.chainPolymer is None:
+            # The last element is used for chains without entity (-1)
+            entityPolymer = np.array([entity['type'] == 'polymer' for entity in self.structure.entity_list]
+                                     + [False], dtype=bool)
+            self.chainPolymer = entityPolymer[self.get_chain_to_entity_index()]
+
+        return self.chainPolymer
+
+
+    def is_polymer(self):
+
+        if self.polymer is None:
+            self.polymer = self.is_polymer_chain()[self.get_atom_to_chain_indices()]
+
+        return self.polymer
+
+
+    def get_entity_indices(self):
+
+        if self.entityIndices is None:
+            self.entityIndices = self.get_chain_to_entity_index()[self.get_atom_to_chain_indices()]
+
+        return self.entityIndices
+
+
+    def get_sequence_positions(self):
+
+        if self.sequencePositions is None:
+            sequenceIndices = np.asarray(self.structure.sequence_index_list, dtype=np.int32)
+            self.sequencePositions = self._group_column(sequenceIndices[:self.get_num_groups()])
+
+        return self.sequencePositions
+
+
+    def get_chain_to_entity_index(self):
+        '''
+        Returns an array that maps a chain index to an entity index. Chains
+        of later models have the entity of the same chain of the first
+        model. Chains without entity are mapped to -1
+        :return:
+            entityChainIndex [np.array] : index that maps chain index to an entity index
+        '''
+
+        if self.entityChainIndex is None:
+
+            numChains = self.get_num_chains()
+            entityChainIndex = np.full(numChains, -1, dtype=np.int32)
+
+            for i, entity in enumerate(self.structure.entity_list):
+                chainIndexList = np.asarray(entity['chainIndexList'], dtype=np.int64)
+                entityChainIndex[chainIndexList[chainIndexList < numChains]] = i
+
+            # Entities usually only list the chains of the first model
+            if self.numModels > 1:
+                chainsPerModel = np.diff(self.get_model_to_chain_indices())
+                chainInModel = np.arange(numChains) - np.repeat(np.cumsum(chainsPerModel) - chainsPerModel,
+                                                                chainsPerModel)
+                missing = entityChainIndex < 0
+                entityChainIndex[missing] = entityChainIndex[chainInModel[missing]]
+
+            self.entityChainIndex = entityChainIndex
+
+        return self.entityChainIndex
+
+
+    def get_indices(self):
+
+        if self.groupToAtomIndices is None:
+
+            structure = self.structure
+            chainsPerModel = np.asarray(structure.chains_per_model, dtype=np.int64)
+            groupsPerChain = np.asarray(structure.groups_per_chain, dtype=np.int64)
+            groupTypes = np.asarray(structure.group_type_list, dtype=np.int64)
+
+            # Chains and groups of the selected models
+            numChains = int(chainsPerModel[:self.numModels].sum())
+            numGroups = int(groupsPerChain[:numChains].sum())
+
+            atomsPerType = np.array([len(group['atomNameList']) for group in structure.group_list],
+                                    dtype=np.int64)
+            atomsPerGroup = atomsPerType[groupTypes[:numGroups]]
+
+            self.modelToChainIndices = np.concatenate(([0], np.cumsum(chainsPerModel[:self.numModels]))).astype(np.int32)
+            self.groupToAtomIndices = np.concatenate(([0], np.cumsum(atomsPerGroup))).astype(np.int32)
+            self.chainToGroupIndices = np.concatenate(([0], np.cumsum(groupsPerChain[:numChains]))).astype(np.int32)
+            self.chainToAtomIndices = self.groupToAtomIndices[self.chainToGroupIndices]
+
+            self.numAtoms = int(self.groupToAtomIndices[-1])
+            self.numGroups = numGroups
+            self.numChains = numChains
@@ -8,11 +8,10 @@ Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
     __maintainer__ = "Mars (Shih-Cheng) Huang"
     __email__ = "marshuang80@gmail.com:
-    __status__ = "dev"
+    __status__ = "Done"
 '''
 import numpy as np
-from mmtfPyspark.dev import ColumnarStructure
-from sympy import Point3D
+from mmtfPyspark.utils.columnarStructure import ColumnarStructure
 
 class ColumnarStructureX(ColumnarStructure):
     '''Inheritance of class ColumnarStructure with additional functions
@@ -39,7 +38,7 @@ class ColumnarStructureX(ColumnarStructure):
             self.get_entity_types()
             self.bFactors = self.get_b_factors()
             # Filter out DOD and HOH
-            stats = self.bFactors[self.entityTypes == 'WAT']
+            stats = self.bFactors[self.entityTypes != 'WAT']
             # Define normalize function
             normalize = lambda x: (x - stats.mean()) / stats.std()
             self.normalizedbFactors = normalize(self.bFactors)
@@ -84,10 +83,7 @@ class ColumnarStructureX(ColumnarStructure):
         y = self.get_y_coords()
         z = self.get_z_coords()
 
-        # TODO: Point3D extremely slow, only use if nessassary
-        #calpha_coords_list = [Point3D(x[i], y[i], z[i]) for i in self.caIndices]
-        calpha_coords_list = [[x[i], y[i], z[i]] for i in self.caIndices]
-        self.calpha_coords = np.array(calpha_coords_list)
+        self.calpha_coords = np.column_stack((x[self.caIndices], y[self.caIndices], z[self.caIndices]))
 
         return self.calpha_coords
 
@@ -99,10 +95,6 @@ class ColumnarStructureX(ColumnarStructure):
         self.get_entity_types()
         self.get_atom_names()
 
-        caIndices_list = [i for i in range(self.get_num_atoms()) \
-                          if (self.atomNames[i] == "CA" \
-                          and self.entityTypes[i] == "PRO")]
-
-        self.caIndices = np.array(caIndices_list)
+        self.caIndices = np.flatnonzero((self.atomNames == "CA") & (self.entityTypes == "PRO"))
 
         return self.caIndices
@@ -2,6 +2,10 @@
 '''
 distanceBox.py:
 
+Bins points into boxes for a quick test of which points are close to
+another set of points. New code should use utils.spatialIndex, which finds
+the pairs of points within a distance.
+
 Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
     __maintainer__ = "Mars (Shih-Cheng) Huang"
@@ -47,57 +51,62 @@ class distanceBox(object):
 
         self.inverseBinWidth = 1.0/binWidth
         self.hashMap = defaultdict(list)
+        # Box location and name of each point in the order they were added
+        self.locations = []
+        self.pointNames = []
 
 
     def addPoint(self, point, pointName):
 
-        i = np.rint(float(point.x) * self.inverseBinWidth)
-        j = np.rint(float(point.y) * self.inverseBinWidth)
-        k = np.rint(float(point.z) * self.inverseBinWidth)
-        location = i + (j*10000) + (k*1000000000)
-
-        #print(location, pointName)
+        self.addPoints([[float(point.x), float(point.y), float(point.z)]], [pointName])
 
-        #if location in self.hashMap:
-        #    print(location)
-        #    print(self.hashMap[location])
-        #self.hashMap[location] = self.hashMap[location].append(pointName)
-        self.hashMap[location].append(pointName)
 
-        #else:
-        #    self.hashMap[location] = [pointName]
+    def addPoints(self, coords, pointNames):
+        '''Adds an array of points of shape (number of points, 3)
+        '''
 
+        ijk = np.rint(np.asarray(coords, dtype=np.float64).reshape(-1, 3) * self.inverseBinWidth)
+        location = ijk[:, 0] + (ijk[:, 1]*10000) + (ijk[:, 2]*1000000000)
 
+        location = location.tolist()
+        pointNames = list(pointNames)
 
-    def getIntersection(self, distanceBox):
-
-        intersection = []
-        checkedLocations = set()
+        for loc, pointName in zip(location, pointNames):
+            self.hashMap[loc].append(pointName)
 
-        for location in self.hashMap.keys():
+        self.locations.extend(location)
+        self.pointNames.extend(pointNames)
 
-            overlap = False
 
-            for off in self.offset:
-
-                loc = location + off
-
-                if loc in distanceBox.hashMap:
-                    overlap = True
+    def getIntersection(self, distanceBox):
+        '''Returns the points in the boxes next to boxes that have a
+        neighbor box in the other distance box. Boxes are visited in the
+        order they were first added to, and the neighbor boxes of each box
+        in the order of the offsets, with the points of a box in the order
+        they were added
+        '''
 
-                    break
+        if len(self.locations) == 0 or len(distanceBox.locations) == 0:
+            return []
 
-            if overlap:
+        locations = np.array(self.locations)
+        boxes, first = np.unique(locations, return_index=True)
+        boxes = boxes[np.argsort(first)]
+        neighbors = boxes[:, np.newaxis] + np.array(self.offset, dtype=np.float64)
 
-                for off in self.offset:
+        overlap = np.isin(neighbors, np.unique(distanceBox.locations)).any(axis=1)
 
-                    loc = location + off
+        if not overlap.any():
+            return []
 
-                    if loc in checkedLocations:
-                        continue
+        # Neighbor boxes of the overlapping boxes, in the order of their
+        # first visit
+        visited, first = np.unique(neighbors[overlap].ravel(), return_index=True)
+        visitOrder = np.empty(len(visited), dtype=np.int64)
+        visitOrder[np.argsort(first)] = np.arange(len(visited))
 
-                    checkedLocations.add(loc)
-                    if loc in self.hashMap:
-                        intersection += self.hashMap[loc]
+        position = np.clip(np.searchsorted(visited, locations), 0, len(visited) - 1)
+        selected = np.flatnonzero(visited[position] == locations)
+        selected = selected[np.argsort(visitOrder[position[selected]], kind='stable')]
 
-        return intersection
+        return [self.pointNames[i] for i in selected]
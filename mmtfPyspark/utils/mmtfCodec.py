@@ -0,0 +1,288 @@
+'''
+mmtfCodec.py
+
+Vectorized implementations of the MMTF encoding strategies. Encoded arrays
+start with a 12-byte big-endian header (codec id, array length, parameter),
+which is used to dispatch to the matching codec.
+
+See <a href="https://github.com/rcsb/mmtf/blob/master/spec.md#codecs">MMTF codecs</a>
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+
+import struct
+import numpy as np
+
+HEADER_SIZE = 12
+
+INT8_MAX, INT8_MIN = 127, -128
+INT16_MAX, INT16_MIN = 32767, -32768
+
+
+def parse_header(data):
+    """
+    Parse the 12-byte header of an encoded array.
+    :param data the encoded byte array
+    :return codec id, array length, parameter and the encoded body
+    """
+
+    codec, length, param = struct.unpack('>iii', data[:HEADER_SIZE])
+    return codec, length, param, data[HEADER_SIZE:]
+
+
+def add_header(body, codec, length, param):
+    """
+    Prepend the 12-byte header to an encoded body.
+    :param body the encoded byte array
+    :param codec the codec id
+    :param length the length of the decoded array
+    :param param the codec parameter
+    :return the encoded byte array with header
+    """
+
+    return struct.pack('>iii', codec, length, param) + body
+
+
+def run_length_decode(in_array):
+    """
+    Decode an array of (value, length) pairs.
+    :param in_array the run length encoded integer array
+    :return the decoded int32 array
+    """
+
+    in_array = np.asarray(in_array, dtype=np.int32)
+    return np.repeat(in_array[0::2], in_array[1::2])
+
+
+def run_length_encode(in_array):
+    """
+    Encode an array as (value, length) pairs.
+    :param in_array the integer array
+    :return the run length encoded int32 array
+    """
+
+    in_array = np.asarray(in_array, dtype=np.int32)
+    if len(in_array) == 0:
+        return np.empty(0, dtype=np.int32)
+
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(in_array)) + 1))
+    lengths = np.diff(np.append(starts, len(in_array)))
+
+    out_array = np.empty(2 * len(starts), dtype=np.int32)
+    out_array[0::2] = in_array[starts]
+    out_array[1::2] = lengths
+    return out_array
+
+
+def delta_decode(in_array):
+    """
+    Decode a delta encoded array.
+    :param in_array the delta encoded integer array
+    :return the decoded int32 array
+    """
+
+    return np.cumsum(in_array, dtype=np.int32)
+
+
+def delta_encode(in_array):
+    """
+    Delta encode an array.
+    :param in_array the integer array
+    :return the delta encoded int32 array
+    """
+
+    in_array = np.asarray(in_array, dtype=np.int32)
+    return np.diff(np.concatenate(([0], in_array))).astype(np.int32)
+
+
+def recursive_index_decode(in_array, maximum=INT16_MAX, minimum=INT16_MIN):
+    """
+    Unpack an array of small integers using recursive indexing. Values equal
+    to the maximum or minimum are summed with the following value.
+    :param in_array the recursive index encoded array
+    :param maximum the maximum integer size
+    :param minimum the minimum integer size
+    :return the decoded int32 array
+    """
+
+    in_array = np.asarray(in_array)
+    sums = np.cumsum(in_array, dtype=np.int64)
+    terminal = (in_array != maximum) & (in_array != minimum)
+    return np.diff(np.concatenate(([0], sums[terminal]))).astype(np.int32)
+
+
+def recursive_index_encode(in_array, maximum=INT16_MAX, minimum=INT16_MIN):
+    """
+    Pack an array of integers into a smaller integer size using recursive
+    indexing.
+    :param in_array the integer array
+    :param maximum the maximum integer size
+    :param minimum the minimum integer size
+    :return the recursive index encoded int32 array
+    """
+
+    in_array = np.asarray(in_array, dtype=np.int64)
+    positive = in_array >= 0
+    fill = np.where(positive, maximum, minimum)
+    repeats = np.where(positive, in_array // maximum, in_array // minimum)
+    counts = repeats + 1
+
+    out_array = np.repeat(fill, counts)
+    out_array[np.cumsum(counts) - 1] = in_array - repeats * fill
+    return out_array.astype(np.int32)
+
+
+def _delta_recursive_index_decode(in_array):
+    # The running sum at the end of each recursive index run equals the
+    # delta decoded value
+    in_array = np.asarray(in_array)
+    terminal = (in_array != INT16_MAX) & (in_array != INT16_MIN)
+    return np.cumsum(in_array, dtype=np.int64)[terminal]
+
+
+def _to_fixed_bytes(in_array, width):
+    # Converts strings to a (n, width) array of null padded character codes.
+    # Unicode arrays are converted through their UCS4 code points, which is
+    # much faster than a numpy string type conversion
+    in_array = np.ascontiguousarray(in_array)
+    if in_array.dtype.kind != 'U' or len(in_array) == 0:
+        return np.asarray(in_array, dtype=f'S{width}').view(np.uint8).reshape(len(in_array), width)
+
+    codes = in_array.view(np.uint32).reshape(len(in_array), -1)
+    out_array = np.zeros((len(in_array), width), dtype=np.uint8)
+    columns = min(width, codes.shape[1])
+    out_array[:, :columns] = codes[:, :columns]
+    return out_array
+
+
+# Integer decoders of the float codecs, each takes the encoded body and
+# returns the values before division by the parameter
+_FIXED_POINT_DECODERS = {
+    9: lambda b: run_length_decode(np.frombuffer(b, '>i4')),
+    10: lambda b: _delta_recursive_index_decode(np.frombuffer(b, '>i2')).astype(np.int32),
+    11: lambda b: np.frombuffer(b, '>i2').astype(np.int32),
+    12: lambda b: recursive_index_decode(np.frombuffer(b, '>i2')),
+    13: lambda b: recursive_index_decode(np.frombuffer(b, '>i1'), INT8_MAX, INT8_MIN),
+}
+
+
+def _float_decoder(codec):
+    decode = _FIXED_POINT_DECODERS[codec]
+    return lambda b, p, f: decode(b).astype(f) / f(p)
+
+
+# Decoders by codec id, each takes the encoded body, the parameter and the
+# float type used for the output of float codecs
+_DECODERS = {
+    1: lambda b, p, f: np.frombuffer(b, '>f4').astype(f),
+    2: lambda b, p, f: np.frombuffer(b, '>i1').astype(np.int8),
+    3: lambda b, p, f: np.frombuffer(b, '>i2').astype(np.int16),
+    4: lambda b, p, f: np.frombuffer(b, '>i4').astype(np.int32),
+    5: lambda b, p, f: np.frombuffer(b, f'S{p}'),
+    6: lambda b, p, f: run_length_decode(np.frombuffer(b, '>i4')).astype(np.uint8).view('S1'),
+    7: lambda b, p, f: run_length_decode(np.frombuffer(b, '>i4')),
+    8: lambda b, p, f: delta_decode(run_length_decode(np.frombuffer(b, '>i4'))),
+    9: _float_decoder(9),
+    10: _float_decoder(10),
+    11: _float_decoder(11),
+    12: _float_decoder(12),
+    13: _float_decoder(13),
+    14: lambda b, p, f: recursive_index_decode(np.frombuffer(b, '>i2')),
+    15: lambda b, p, f: recursive_index_decode(np.frombuffer(b, '>i1'), INT8_MAX, INT8_MIN),
+}
+
+
+def _to_int(in_array, param):
+    return np.rint(np.asarray(in_array, dtype=np.float64) * param).astype(np.int64)
+
+
+# Encoders by codec id, each takes the decoded array and the parameter and
+# returns the encoded body
+_ENCODERS = {
+    1: lambda a, p: np.asarray(a, dtype='>f4').tobytes(),
+    2: lambda a, p: np.asarray(a, dtype='>i1').tobytes(),
+    3: lambda a, p: np.asarray(a, dtype='>i2').tobytes(),
+    4: lambda a, p: np.asarray(a, dtype='>i4').tobytes(),
+    5: lambda a, p: _to_fixed_bytes(a, p).tobytes(),
+    6: lambda a, p: run_length_encode(_to_fixed_bytes(a, 1)[:, 0]).astype('>i4').tobytes(),
+    7: lambda a, p: run_length_encode(a).astype('>i4').tobytes(),
+    8: lambda a, p: run_length_encode(delta_encode(a)).astype('>i4').tobytes(),
+    9: lambda a, p: run_length_encode(_to_int(a, p)).astype('>i4').tobytes(),
+    10: lambda a, p: recursive_index_encode(delta_encode(_to_int(a, p))).astype('>i2').tobytes(),
+    11: lambda a, p: _to_int(a, p).astype('>i2').tobytes(),
+    12: lambda a, p: recursive_index_encode(_to_int(a, p)).astype('>i2').tobytes(),
+    13: lambda a, p: recursive_index_encode(_to_int(a, p), INT8_MAX, INT8_MIN).astype('>i1').tobytes(),
+    14: lambda a, p: recursive_index_encode(a).astype('>i2').tobytes(),
+    15: lambda a, p: recursive_index_encode(a, INT8_MAX, INT8_MIN).astype('>i1').tobytes(),
+}
+
+# Codec and parameter used for each MMTF array field when encoding
+DEFAULT_CODECS = {
+    'xCoordList': (10, 1000),
+    'yCoordList': (10, 1000),
+    'zCoordList': (10, 1000),
+    'bFactorList': (10, 100),
+    'occupancyList': (9, 100),
+    'atomIdList': (8, 0),
+    'altLocList': (6, 0),
+    'insCodeList': (6, 0),
+    'groupIdList': (8, 0),
+    'groupTypeList': (4, 0),
+    'sequenceIndexList': (8, 0),
+    'chainNameList': (5, 4),
+    'chainIdList': (5, 4),
+    'bondAtomList': (4, 0),
+    'bondOrderList': (2, 0),
+    'secStructList': (2, 0),
+}
+
+
+def decode_array(data, float_type=np.float64):
+    """
+    Decode an encoded array using the codec given in its header.
+    :param data the encoded byte array including the header
+    :param float_type the dtype returned by float codecs
+    :return the decoded numpy array
+    """
+
+    codec, length, param, body = parse_header(data)
+
+    if codec not in _DECODERS:
+        raise Exception(f"Unknown MMTF codec: {codec}")
+
+    return _DECODERS[codec](body, param, float_type)
+
+
+def decode_fixed_point(data):
+    """
+    Decode an array encoded with a float codec into its integer values,
+    without dividing by the codec parameter.
+    :param data the encoded byte array including the header
+    :return the decoded int32 array and the divisor
+    """
+
+    codec, length, param, body = parse_header(data)
+
+    if codec not in _FIXED_POINT_DECODERS:
+        raise Exception(f"MMTF codec {codec} is not a fixed point codec")
+
+    return _FIXED_POINT_DECODERS[codec](body), param
+
+
+def encode_array(in_array, codec, param=0):
+    """
+    Encode an array with the given codec and prepend the header.
+    :param in_array the array to encode
+    :param codec the codec id
+    :param param the codec parameter
+    :return the encoded byte array including the header
+    """
+
+    if codec not in _ENCODERS:
+        raise Exception(f"Unknown MMTF codec: {codec}")
+
+    return add_header(_ENCODERS[codec](in_array, param), codec, len(in_array), param)
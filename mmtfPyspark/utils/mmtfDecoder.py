@@ -11,6 +11,38 @@ Authorship information:
 '''
 
 import numpy as np
+import msgpack
+from mmtfPyspark.utils import mmtfCodec
+
+# Process-wide table of shared group dictionaries, keyed by their msgpack
+# serialization, and the reverse lookup by object id
+_SHARED_GROUPS = {}
+_SHARED_GROUP_KEYS = {}
+
+# Shared group dictionaries keyed by the msgpack serialization of the raw
+# (undecoded) group entries of mmtf files, and the lookup statistics
+_RAW_GROUPS = {}
+_GROUP_STATS = {'hits': 0, 'misses': 0}
+
+# Maximum number of groups in each table, groups beyond are not shared
+MAX_SHARED_GROUPS = 200000
+
+
+class FrozenGroup(dict):
+    """
+    Read-only group dictionary. Decoded groups are shared by all structures
+    in a process, so the dictionary can't be modified and its lists are
+    tuples.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise Exception("decoded groups are shared and can't be modified")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenGroup, (dict(self),))
 
 
 def run_length_decoder_numpy(in_array):
@@ -18,15 +50,7 @@ def run_length_decoder_numpy(in_array):
     Decodes a run length encoded array
     """
 
-    lengths = np.array(in_array[1::2])
-    values = np.array(in_array[0::2])
-    starts = np.insert(np.array([0]),1,np.cumsum(lengths))[:-1]
-    ends = starts + lengths
-    n = ends[-1]
-    x = np.full(n, np.nan)
-    for l,h,v in zip(starts, ends, values):
-        x[l:h] = v
-    return x
+    return mmtfCodec.run_length_decode(in_array)
 
 
 def recursive_index_decode(int_array, decode_num = 1000):
@@ -59,34 +83,131 @@ def decode_entity_list(input_data):
 
 def decode_group_list(input_data):
     """
-    Convert byte strings to strings in the group map.
+    Convert byte strings to strings in the group map. Identical groups of
+    all structures in a process are decoded once and returned as the same
+    shared read-only dictionary (see FrozenGroup).
     :param input_data the list of groups
     :return the decoded group list
     """
 
     out_data = []
     for entry in input_data:
-        out_data.append(convert_group(entry))
+        key = msgpack.packb(entry)
+        group = _RAW_GROUPS.get(key)
+
+        if group is None:
+            _GROUP_STATS['misses'] += 1
+            group = _share_group(convert_group(entry))
+            if len(_RAW_GROUPS) < MAX_SHARED_GROUPS:
+                _RAW_GROUPS[key] = group
+        else:
+            _GROUP_STATS['hits'] += 1
+
+        out_data.append(group)
     return out_data
 
 
+def group_cache_stats():
+    """
+    Return the statistics of the shared group table of this process.
+    :return dictionary of the number of hits and misses of decoded
+            groups, the hit rate and the number of shared groups
+    """
+
+    hits, misses = _GROUP_STATS['hits'], _GROUP_STATS['misses']
+    return {'hits': hits,
+            'misses': misses,
+            'hitRate': hits / (hits + misses) if hits + misses > 0 else 0.0,
+            'size': len(_SHARED_GROUPS)}
+
+
+def clear_group_cache():
+    """
+    Remove all shared groups of this process and reset the statistics.
+    Groups of existing structures are not affected.
+    """
+
+    _SHARED_GROUPS.clear()
+    _SHARED_GROUP_KEYS.clear()
+    _RAW_GROUPS.clear()
+    _GROUP_STATS['hits'] = 0
+    _GROUP_STATS['misses'] = 0
+
+
+def pack_group(group):
+    """
+    Serialize a decoded group with msgpack.
+    :param group the decoded group
+    :return the msgpack bytes of the group
+    """
+
+    key = _SHARED_GROUP_KEYS.get(id(group))
+    if key is not None:
+        return key
+    return msgpack.packb(group)
+
+
+def unpack_group(data):
+    """
+    Return the shared group dictionary of a serialized group. Identical
+    groups of all structures in a process are the same read-only
+    dictionary (see FrozenGroup).
+    :param data the msgpack bytes of the group
+    :return the decoded group
+    """
+
+    group = _SHARED_GROUPS.get(data)
+    if group is None:
+        group = FrozenGroup(msgpack.unpackb(data, raw=False, use_list=False))
+        if len(_SHARED_GROUPS) < MAX_SHARED_GROUPS:
+            _SHARED_GROUPS[data] = group
+            _SHARED_GROUP_KEYS[id(group)] = data
+    return group
+
+
+def share_group(group):
+    """
+    Return the shared read-only dictionary of a decoded group that was not
+    read from an mmtf file, e.g. a group built by a parser, so it is shared
+    like the groups of mmtf files (see FrozenGroup).
+    :param group the group dictionary, with tuples instead of lists
+    :return the shared group
+    """
+
+    return _share_group(FrozenGroup(group))
+
+
+def _share_group(group):
+    # Shared dictionary of a decoded group, registered for pack_group
+    data = msgpack.packb(group)
+    shared = _SHARED_GROUPS.get(data)
+    if shared is not None:
+        return shared
+    if len(_SHARED_GROUPS) < MAX_SHARED_GROUPS:
+        _SHARED_GROUPS[data] = group
+        _SHARED_GROUP_KEYS[id(group)] = data
+    return group
+
+
 def convert_group(input_group):
     """
     Convert an individual group from byte strings to regula strings.
     :param input_group the input group
-    :return the decoded group
+    :return the decoded group, with tuples instead of lists
     """
 
     output_group = {}
     for key in input_group:
         if key in [b'elementList', b'atomNameList']:
-            output_group[key.decode('ascii')] = [x.decode('ascii')
-                                                 for x in input_group[key]]
+            output_group[key.decode('ascii')] = tuple(x.decode('ascii')
+                                                      for x in input_group[key])
         elif key in [b'chemCompType', b'groupName', b'singleLetterCode']:
             output_group[key.decode('ascii')] = input_group[key].decode('ascii')
+        elif isinstance(input_group[key], list):
+            output_group[key.decode('ascii')] = tuple(input_group[key])
         else:
             output_group[key.decode('ascii')] = input_group[key]
-    return output_group
+    return FrozenGroup(output_group)
 
 
 def convert_entity(input_entity):
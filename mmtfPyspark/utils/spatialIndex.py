@@ -0,0 +1,250 @@
+#!/user/bin/env python
+'''
+spatialIndex.py:
+
+Cell list spatial index of 3D coordinates for radius queries and neighbor
+searches between atom sets.
+
+Points are binned into cubic cells and sorted by cell in one vectorized
+pass. A query visits the cells within the query radius of each query point,
+expands the points of these cells into candidate pairs and keeps the pairs
+within the radius, all with numpy array operations and one loop over the
+cell offsets (27 offsets if the radius is not larger than the cell size).
+
+Results are pairs of index arrays, sorted by the first and then the second
+index.
+
+Authorship information:
+    __author__ = "Mars (Shih-Cheng) Huang"
+    __maintainer__ = "Mars (Shih-Cheng) Huang"
+    __email__ = "marshuang80@gmail.com:
+    __status__ = "Done"
+'''
+import numpy as np
+
+
+class SpatialIndex(object):
+    '''Cell list of a set of points
+
+    Attributes:
+        coords (array): coordinates of shape (number of points, 3)
+        cellSize (float): edge length of the cubic cells, usually the
+                          largest query radius
+    '''
+
+    def __init__(self, coords, cellSize):
+
+        if cellSize <= 0:
+            raise Exception("cellSize must be positive")
+
+        self.coords = _toCoords(coords)
+        self.cellSize = float(cellSize)
+
+        cells = np.floor(self.coords / self.cellSize).astype(np.int64)
+
+        if len(cells) > 0:
+            self.origin = cells.min(axis=0)
+            self.shape = cells.max(axis=0) - self.origin + 1
+        else:
+            self.origin = np.zeros(3, dtype=np.int64)
+            self.shape = np.zeros(3, dtype=np.int64)
+
+        cellIds = self._cellIds(cells)
+
+        # Points sorted by cell, and the first point and number of points
+        # of each occupied cell
+        self.order = np.argsort(cellIds, kind='stable')
+        self.sortedCoords = self.coords[self.order]
+        self.cellIds, self.cellStarts, self.cellCounts = np.unique(cellIds[self.order],
+                                                                   return_index=True,
+                                                                   return_counts=True)
+
+
+    def __len__(self):
+        return len(self.coords)
+
+
+    def _cellIds(self, cells):
+        # Linear cell ids, -1 for cells outside of the grid
+        cells = cells - self.origin
+        valid = np.all((cells >= 0) & (cells < self.shape), axis=1)
+        ids = (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+        return np.where(valid, ids, -1)
+
+
+    def _offsets(self, radius, half=False):
+        # Cell offsets within the radius, if half is True only the zero
+        # offset and the offsets that are lexicographically positive
+        n = int(np.ceil(radius / self.cellSize))
+        r = np.arange(-n, n + 1, dtype=np.int64)
+        offsets = np.stack(np.meshgrid(r, r, r, indexing='ij'), axis=-1).reshape(-1, 3)
+
+        if half:
+            offsets = offsets[len(offsets) // 2:]
+
+        return offsets
+
+
+    def _candidates(self, cells):
+        # Pairs of query index and position in the sorted points for the
+        # points in the cells of the queries, cells outside of the grid
+        # have no points
+        ids = self._cellIds(cells)
+        slot = np.searchsorted(self.cellIds, ids)
+        slot = np.minimum(slot, len(self.cellIds) - 1)
+        found = (ids >= 0) & (self.cellIds[slot] == ids)
+
+        queries = np.flatnonzero(found)
+        starts = self.cellStarts[slot[found]]
+        counts = self.cellCounts[slot[found]]
+
+        total = counts.sum()
+        queryIndices = np.repeat(queries, counts)
+        # Position of each candidate within its cell, added to the cell start
+        ends = np.cumsum(counts)
+        positions = np.arange(total) + np.repeat(starts - ends + counts, counts)
+
+        return queryIndices, positions
+
+
+    def query_radius(self, points, radius, return_distance=False):
+        '''Returns the pairs of query points and indexed points within a
+        radius, as an array of query point indices and an array of indexed
+        point indices
+
+        Attributes:
+            points (array): query coordinates of shape (number of points, 3)
+            radius (float): maximum distance
+            return_distance (bool): also return an array of the distances
+        '''
+
+        points = _toCoords(points)
+        radiusSq = float(radius) * float(radius)
+
+        queryIndices, indices, distances = [], [], []
+
+        if len(points) > 0 and len(self.cellIds) > 0:
+            cells = np.floor(points / self.cellSize).astype(np.int64)
+
+            for offset in self._offsets(radius):
+                q, i = self._candidates(cells + offset)
+                dSq = _distancesSq(points, q, self.sortedCoords, i)
+                within = dSq <= radiusSq
+
+                queryIndices.append(q[within])
+                indices.append(self.order[i[within]])
+                distances.append(dSq[within])
+
+        return _sortedPairs(queryIndices, indices, distances, len(self), return_distance)
+
+
+    def query_index(self, other, radius, return_distance=False):
+        '''Returns the pairs of points of this index and points of another
+        point set within a radius, as an array of indices in this index and
+        an array of indices in the other point set
+
+        Attributes:
+            other (SpatialIndex or array): other point set, or its coordinates
+            radius (float): maximum distance
+            return_distance (bool): also return an array of the distances
+        '''
+
+        if isinstance(other, SpatialIndex):
+            other = other.coords
+        else:
+            other = _toCoords(other)
+
+        result = self.query_radius(other, radius, return_distance)
+        otherIndices, indices = result[0], result[1]
+
+        # Sort by the indices of this index
+        order = np.argsort(indices * max(len(other), 1) + otherIndices)
+        return tuple(r[order] for r in (indices, otherIndices) + result[2:])
+
+
+    def query_pairs(self, radius, return_distance=False):
+        '''Returns the pairs of points of this index within a radius, as
+        arrays of first and second indices, where the first index is less
+        than the second index
+
+        Attributes:
+            radius (float): maximum distance
+            return_distance (bool): also return an array of the distances
+        '''
+
+        radiusSq = float(radius) * float(radius)
+
+        firstIndices, secondIndices, distances = [], [], []
+
+        if len(self.cellIds) > 0:
+            # Queries of the sorted points with half of the cell offsets
+            # find each pair once, pairs in the same cell are found twice
+            # and only kept in one order
+            cells = np.floor(self.sortedCoords / self.cellSize).astype(np.int64)
+
+            for offset in self._offsets(radius, half=True):
+                q, i = self._candidates(cells + offset)
+
+                if not offset.any():
+                    q, i = q[q < i], i[q < i]
+
+                dSq = _distancesSq(self.sortedCoords, q, self.sortedCoords, i)
+                within = dSq <= radiusSq
+
+                first, second = self.order[q[within]], self.order[i[within]]
+                firstIndices.append(np.minimum(first, second))
+                secondIndices.append(np.maximum(first, second))
+                distances.append(dSq[within])
+
+        return _sortedPairs(firstIndices, secondIndices, distances, len(self), return_distance)
+
+
+    def count_neighbors(self, points, radius):
+        '''Returns the number of indexed points within a radius of each
+        query point
+
+        Attributes:
+            points (array): query coordinates of shape (number of points, 3)
+            radius (float): maximum distance
+        '''
+
+        queryIndices = self.query_radius(points, radius)[0]
+        return np.bincount(queryIndices, minlength=len(_toCoords(points)))
+
+
+def _toCoords(coords):
+    # Coordinates as a float64 array of shape (n, 3)
+    coords = np.asarray(coords, dtype=np.float64)
+    return coords.reshape(-1, 3)
+
+
+def _distancesSq(points1, indices1, points2, indices2):
+    # Squared distances of pairs of points
+    dSq = np.zeros(len(indices1), dtype=np.float64)
+
+    for axis in range(3):
+        d = points1[:, axis][indices1] - points2[:, axis][indices2]
+        dSq += d * d
+
+    return dSq
+
+
+def _sortedPairs(queryIndices, indices, distances, size, returnDistance):
+    # Concatenated pairs, sorted by query index and then index, where
+    # size is larger than all indices
+    if queryIndices:
+        queryIndices = np.concatenate(queryIndices)
+        indices = np.concatenate(indices)
+        distances = np.sqrt(np.concatenate(distances))
+    else:
+        queryIndices = np.zeros(0, dtype=np.int64)
+        indices = np.zeros(0, dtype=np.int64)
+        distances = np.zeros(0, dtype=np.float64)
+
+    order = np.argsort(queryIndices * max(size, 1) + indices)
+    result = (queryIndices[order], indices[order])
+
+    if returnDistance:
+        result += (distances[order],)
+
+    return result
@@ -5,163 +5,101 @@ structureToAllInteractions.py:
 Finds interactions of a specified group within a specified
 cutoff distance
 
+The atoms of all matching groups are queried at once against a spatial
+index of the structure (see utils.spatialIndex), and the interactions are
+returned as a column batch (see ml.pythonRDDToDataset), or as rows.
+
 Authorship information:
     __author__ = "Mars (Shih-Cheng) Huang"
     __maintainer__ = "Mars (Shih-Cheng) Huang"
     __email__ = "marshuang80@gmail.com:
     __status__ = "Done"
 '''
+import numpy as np
 from pyspark.sql import Row
+from mmtfPyspark.utils.columnarStructure import getColumnarStructure
+from mmtfPyspark.utils.spatialIndex import SpatialIndex
 
 class structureToAllInteractions(object):
+    '''Finds all atoms of other groups within a cutoff distance of the
+    atoms of the specified group, for the first model of a structure.
+    Interactions are ordered by the group indices, then by the atoms of
+    the other group, then by the atoms of the specified group.
+
+    Attributes:
+        groupName (str): name of the group, e.g. "ZN", "ATP"
+        cutoffDistance (float): cutoff distance
+    '''
+
     def __init__(self, groupName, cutoffDistance):
         self.groupName = groupName
         self.cutoffDistance = cutoffDistance
 
 
     def __call__(self, t):
-        structureId = t[0]
-        structure = t[1]
-
-        groupIndices, groupNames = self._getGroupIndices(structure)
-        interactions = []
-
-        for i in range(len(groupNames)):
-
-            if groupNames[i] == self.groupName:
-                matches = []
-                boundingBox = self._calcBondingBox(structure, groupIndices, i,
-                                                   self.cutoffDistance)
-                matches += self._findNeighbors(structure, i, boundingBox, groupIndices)
-                interactions += self._getDistanceProfile(structureId, matches, i, groupIndices, groupNames, structure)
-
-        return interactions
-
-
-    def _getDistanceProfile(self, structureId, matches, index, groupIndices, groupNames, structure):
-        cutoffDistanceSq = self.cutoffDistance * self.cutoffDistance
-
-        x = structure.x_coord_list
-        y = structure.y_coord_list
-        z = structure.z_coord_list
-
-        first = groupIndices[index]
-        last = groupIndices[index + 1]
-
-        groupIndex1 = structure.group_type_list[index]
-
-        rows = []
-
-        for i in matches:
-            if i == index: continue
-
-            for j in range(groupIndices[i], groupIndices[i+1]):
-
-                for k in range(first, last):
-                    dx = x[j] - x[k]
-                    dy = y[j] - y[k]
-                    dz = z[j] - z[k]
-                    dSq = dx*dx + dy*dy + dz*dz
-
-                    if (dSq <= cutoffDistanceSq):
-                        aIndex1 = k-first
-                        atomName1 = structure.group_list[groupIndex1]['atomNameList'][aIndex1]
-                        element1 = structure.group_list[groupIndex1]['elementList'][aIndex1]
-
-                        groupIndex2 = structure.group_type_list[i]
-                        aIndex2 = j - groupIndices[i]
-                        atomName2 = structure.group_list[groupIndex2]['atomNameList'][aIndex2]
-                        element2 = structure.group_list[groupIndex2]['elementList'][aIndex2]
-
-                        d = dSq ** 0.5
-                        row = Row(structureId,
-                                  groupNames[index],
-                                  atomName1,
-                                  element1,
-                                  index,
-                                  groupNames[i],
-                                  atomName2,
-                                  element2,
-                                  i,
-                                  float(d))
-                        rows.append(row)
-        return rows
-
-
-    def _findNeighbors(self, structure, index, boundingBox, groupIndices):
-        x = structure.x_coord_list
-        y = structure.y_coord_list
-        z = structure.z_coord_list
-
-        matches = []
-        for i in range(len(groupIndices) - 1):
-
-            for j in range(groupIndices[i], groupIndices[i+1]):
-
-                if (x[j] >= boundingBox[0] and x[j] <= boundingBox[1] and
-                    y[j] >= boundingBox[2] and y[j] <= boundingBox[3] and
-                    z[j] >= boundingBox[4] and z[j] <= boundingBox[5]):
-                    matches.append(i)
-                    break
-
-        return matches
-
-
-    def _calcBondingBox(self, structure, groupIndices, i, cutoffDistance):
-        x = structure.x_coord_list
-        y = structure.y_coord_list
-        z = structure.z_coord_list
-
-        xMin = -float('inf')
-        xMax = float('inf')
-        yMin = -float('inf')
-        yMax = float('inf')
-        zMin = -float('inf')
-        zMax = float('inf')
-
-        first = groupIndices[i]
-        last = groupIndices[i+1]
-
-        for i in range(first, last):
-            xMin = min(xMin, x[i])
-            xMax = max(xMax, x[i])
-            yMin = min(yMin, y[i])
-            yMax = max(yMax, y[i])
-            zMin = min(zMin, z[i])
-            zMax = max(zMax, z[i])
-
-        boundingBox = [0]*6
-        boundingBox[0] = float(xMin - cutoffDistance)
-        boundingBox[1] = float(xMax + cutoffDistance)
-        boundingBox[2] = float(yMin - cutoffDistance)
-        boundingBox[3] = float(yMax + cutoffDistance)
-        boundingBox[4] = float(zMin - cutoffDistance)
-        boundingBox[5] = float(zMax + cutoffDistance)
-
-        return boundingBox
+        '''Returns the interactions of a structure as a list of rows
+        '''
+        batch = self.getBatch(t)
 
+        return [Row(*row) for row in zip(batch[0], batch[1], batch[2], batch[3],
+                                         batch[4].tolist(), batch[5], batch[6],
+                                         batch[7], batch[8].tolist(), batch[9].tolist())]
 
-    def _getGroupIndices(self, structure):
-        '''Creates an atom index to the first atom of each group
 
-        Attributes:
-            structure
+    def getBatches(self, t):
+        '''Returns the interactions of a structure as a list of one column
+        batch, or an empty list if there are no interactions, for use with
+        flatMap and pythonRDDToDataset.getDatasetFromBatches
         '''
-        groupIndices, groupNames = [0], [] # Start index for first group
-        atomCounter, groupCounter = 0, 0
-
-        # Consider only the first model
-        numChains = structure.chains_per_model[0]
+        batch = self.getBatch(t)
 
-        # Loop over all chains
-        for i in range(numChains):
+        return [batch] if len(batch[0]) > 0 else []
 
-            # Loop over all groups in chains
-            for j in range(structure.groups_per_chain[i]):
-                groupIndex = structure.group_type_list[groupCounter]
-                groupNames.append(structure.group_list[groupIndex]['groupName'])
-                atomCounter += len(structure.group_list[groupIndex]['atomNameList'])
-                groupIndices.append(atomCounter)
-                groupCounter += 1
 
-        return groupIndices, groupNames
+    def getBatch(self, t):
+        '''Returns the interactions of a structure as a column batch of
+        structureId, residue1, atom1, element1, index1, residue2, atom2,
+        element2, index2 and distance
+        '''
+        structureId = t[0]
+        cs = getColumnarStructure(t[1])
+
+        groupNames = cs.get_group_names()
+        queryAtoms = np.flatnonzero(groupNames == self.groupName)
+
+        if len(queryAtoms) == 0:
+            return _emptyBatch()
+
+        index = SpatialIndex(cs.get_coords(), self.cutoffDistance)
+        q, atoms2, distances = index.query_radius(index.coords[queryAtoms], self.cutoffDistance,
+                                                  return_distance=True)
+        atoms1 = queryAtoms[q]
+
+        # Interactions with other groups
+        atomToGroup = cs.get_atom_to_group_indices()
+        groups1, groups2 = atomToGroup[atoms1], atomToGroup[atoms2]
+        other = groups1 != groups2
+
+        order = np.lexsort((atoms1[other], atoms2[other], groups2[other], groups1[other]))
+        atoms1, atoms2 = atoms1[other][order], atoms2[other][order]
+        distances = distances[other][order]
+
+        atomNames = cs.get_atom_names()
+        elements = cs.get_elements()
+
+        return [[structureId] * len(atoms1),
+                groupNames[atoms1].tolist(),
+                atomNames[atoms1].tolist(),
+                elements[atoms1].tolist(),
+                atomToGroup[atoms1].astype(np.int32),
+                groupNames[atoms2].tolist(),
+                atomNames[atoms2].tolist(),
+                elements[atoms2].tolist(),
+                atomToGroup[atoms2].astype(np.int32),
+                distances.astype(np.float32)]
+
+
+def _emptyBatch():
+    # Column batch without interactions
+    return [[], [], [], [], np.zeros(0, dtype=np.int32),
+            [], [], [], np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)]
@@ -2,6 +2,7 @@ from setuptools import setup
 
 mmtfPyspark_packages = ['mmtfPyspark',
                         'mmtfPyspark.analysis',
+                        'mmtfPyspark.benchmarks',
                         'mmtfPyspark.datasets',
                         'mmtfPyspark.filters',
                         'mmtfPyspark.inputFunction',
@@ -23,6 +24,11 @@ mmtfPyspark_dependencies = ['pyspark',
                             'requests'
                             ]
 
+# Optional dependencies, e.g. pip install mmtfPyspark[compression]
+mmtfPyspark_extras = {'compression': ['zstandard', 'lz4'],
+                      'arrow': ['pyarrow']}
+mmtfPyspark_extras['complete'] = sorted(set(sum(mmtfPyspark_extras.values(), [])))
+
 setup(name='mmtfPyspark',
       version='0.1',
       description='Methods for parallel and distributed analysis and mining of the Protein Data Bank using MMTF and Apache Spark',
@@ -33,6 +39,7 @@ setup(name='mmtfPyspark',
       keywords='mmtf spark pyspark protein PDB',
       packages=mmtfPyspark_packages,
       install_requires=mmtfPyspark_dependencies,
+      extras_require=mmtfPyspark_extras,
       include_package_data=True,
       test_suite='nose.collector',
       test_require=['nose'],